@@ -0,0 +1,115 @@
+# server/admin_routes.py
+import os
+import sys
+from functools import wraps
+
+from flask import Blueprint, Response, jsonify
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from db import index_usage_stats
+from extensions import (
+    analysis_jobs, get_db, market_refresher, ohlcv_store, password_hasher, price_hub, quote_cache, search_upstream,
+    symbol_index, yahoo_upstream
+)
+from metrics import register_collector, render_prometheus
+
+admin_bp = Blueprint('admin', __name__)
+
+# Accounts allowed to use /api/admin/* routes; none unless configured
+ADMIN_EMAILS = {email.strip().lower() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()}
+
+def admin_required(view):
+    """Serve a diagnostics route only to the accounts in ADMIN_EMAILS."""
+    @wraps(view)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if get_jwt_identity().lower() not in ADMIN_EMAILS:
+            return jsonify({"error": "Admin access required"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+# Database diagnostics
+@admin_bp.route('/api/admin/db/index-stats', methods=['GET'])
+@admin_required
+def db_index_stats():
+    return jsonify(index_usage_stats(get_db())), 200
+
+# Quote cache diagnostics
+@admin_bp.route('/api/quotes/cache-stats', methods=['GET'])
+@admin_required
+def quote_cache_stats():
+    return jsonify({
+        **quote_cache.stats(),
+        "refresher": market_refresher.stats(),
+        "symbol_index": symbol_index.stats(),
+        "price_history": ohlcv_store.stats()
+    }), 200
+
+@admin_bp.route('/api/upstream/stats', methods=['GET'])
+@admin_required
+def upstream_stats():
+    return jsonify({guard.name: guard.stats() for guard in (yahoo_upstream, search_upstream)}), 200
+
+@admin_bp.route('/api/auth/stats', methods=['GET'])
+@admin_required
+def auth_stats():
+    return jsonify({"password_hasher": password_hasher.stats()}), 200
+
+@admin_bp.route('/api/agents/pool-stats', methods=['GET'])
+@admin_required
+def agent_pool_stats():
+    # Don't load the crew stack just to report on it
+    analysis = sys.modules.get('analysis')
+    if analysis is None:
+        return jsonify({"loaded": False}), 200
+    return jsonify({"loaded": True, **analysis.agent_pool.stats()}), 200
+
+@admin_bp.route('/api/search/cache-stats', methods=['GET'])
+@admin_required
+def search_cache_stats():
+    analysis = sys.modules.get('analysis')
+    if analysis is None:
+        return jsonify({"loaded": False}), 200
+    return jsonify({"loaded": True, **analysis.search_cache.stats()}), 200
+
+@admin_bp.route('/api/stream/stats', methods=['GET'])
+@admin_required
+def price_stream_stats():
+    return jsonify(price_hub.stats()), 200
+
+# Prometheus scrape endpoint
+@register_collector
+def cache_metrics():
+    quotes = quote_cache.stats()
+    families = [
+        ("quote_cache_lookups_total", "counter", "Quote cache lookups by result",
+         [({"result": "hit"}, quotes["hits"]), ({"result": "miss"}, quotes["misses"]),
+          ({"result": "stale_served"}, quotes["stale_served"])]),
+        ("quote_cache_hit_ratio", "gauge", "Share of quote lookups served from cache",
+         [({}, quotes["hit_ratio"])]),
+        ("quote_cache_entries", "gauge", "Symbols held in the quote cache", [({}, quotes["size"])]),
+        ("upstream_circuit_open", "gauge", "1 while an upstream's circuit breaker is open",
+         [({"upstream": guard.name}, int(guard.breaker.state == "open")) for guard in (yahoo_upstream, search_upstream)]),
+        ("password_hash_rejected_total", "counter", "Auth requests shed because the hashing pool was full",
+         [({}, password_hasher.rejected)]),
+        ("price_stream_subscribers", "gauge", "Connected live price clients", [({}, price_hub.stats()["subscribers"])]),
+        ("analysis_jobs_pending", "gauge", "Analysis jobs queued or running in this process",
+         [({}, analysis_jobs.stats()["pending"])]),
+        ("analysis_jobs_rejected_total", "counter", "Analysis jobs turned away because the queue was full",
+         [({}, analysis_jobs.rejected)]),
+    ]
+    analysis = sys.modules.get('analysis')
+    if analysis is not None:
+        search = analysis.search_cache.stats()
+        families.append(("search_cache_lookups_total", "counter", "Search cache lookups by result",
+                         [({"result": "hit"}, search["hits"]), ({"result": "miss"}, search["misses"])]))
+        families.append(("search_cache_hit_ratio", "gauge", "Share of searches served from cache",
+                         [({}, search["hit_rate"])]))
+        pool = analysis.agent_pool.stats()
+        families.append(("agent_pool_sets", "gauge", "Agent sets by state",
+                         [({"state": key}, value) for key, value in pool.items() if isinstance(value, (int, float))]))
+    return families
+
+@admin_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,74 @@
+# server/agent_pool.py
+import threading
+import time
+from contextlib import contextmanager
+
+
+class AgentPoolExhausted(Exception):
+    """Raised when no agent set became free within the checkout timeout."""
+
+
+class AgentPool:
+    """Pool of reusable CrewAI agent sets.
+
+    Building agents is comparatively expensive and a set must not be shared
+    by two crews at the same time (a run mutates its agents' callbacks and
+    executors), so each analysis checks a set out for the duration of its
+    run. Sets are created lazily up to `max_size`; callers beyond that wait
+    up to `timeout` seconds for a set to be returned or for room to build
+    one, then get `AgentPoolExhausted`. A set whose run raised is discarded
+    and rebuilt on demand, since its state can't be trusted. `reset(agents)`,
+    if given, runs on every set that is returned to the pool, to clear
+    per-run state such as callbacks.
+    """
+
+    def __init__(self, factory, max_size=4, reset=None):
+        self._factory = factory
+        self._max_size = max_size
+        self._reset = reset
+        self._idle = []
+        self._created = 0
+        self._changed = threading.Condition()
+        self.reused = 0
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        agents = self._acquire(timeout)
+        try:
+            yield agents
+            if self._reset is not None:
+                self._reset(agents)
+        except BaseException:
+            self._discard()
+            raise
+        with self._changed:
+            self._idle.append(agents)
+            self._changed.notify()
+
+    def _discard(self):
+        # Frees room for a waiter to build a replacement set
+        with self._changed:
+            self._created -= 1
+            self._changed.notify()
+
+    def _acquire(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while not self._idle and self._created >= self._max_size:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise AgentPoolExhausted("No analysis agents free, try again later")
+                self._changed.wait(remaining)
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop()
+            self._created += 1
+        try:
+            return self._factory()
+        except BaseException:
+            self._discard()
+            raise
+
+    def stats(self):
+        with self._changed:
+            return {"created": self._created, "idle": len(self._idle), "max_size": self._max_size, "reused": self.reused}
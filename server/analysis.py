@@ -0,0 +1,774 @@
+# server/analysis.py
+"""CrewAI analysis pipeline: agent tools, prefetch, crew runs and the analysis cache.
+
+This module pulls in crewai, langchain and the LLM client, so it is only
+imported when an analysis is requested (or up front with PRELOAD_ANALYSIS=1).
+"""
+import os
+import json
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Import CrewAI components
+from crewai import Agent, Task, Crew
+from crewai.tools import tool
+from langchain_community.tools import DuckDuckGoSearchRun
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_openai import ChatOpenAI
+import httpx
+
+from agent_pool import AgentPool
+from analysis_jobs import ANALYSIS_STAGES
+from extensions import analyses_collection, fundamentals_store, quote_cache, search_upstream
+from metrics import CREW_RUN_DURATION, CREW_TASK_DURATION, LLM_TOKENS, observe_upstream
+from financials import BALANCE_SHEET_ITEMS, INCOME_STATEMENT_ITEMS, compact_statement
+from quote_cache import SingleFlight, current_price_from
+from recommendation_parser import RECOMMENDATION_JSON_INSTRUCTIONS, RecommendationParser, parse_recommendation
+from resilience import UpstreamUnavailable
+from search_cache import SearchBudgetExceeded, SearchCache, search_budget
+
+def today():
+    """Current date as stored with analyses; read per run so long-lived workers roll over at midnight."""
+    return datetime.now().strftime("%d-%b-%Y")
+
+# Financial statements handed to the agents are trimmed to this many periods and tokens
+FINANCIALS_PERIODS = int(os.environ.get('FINANCIALS_PERIODS', 4))
+FINANCIALS_TOKEN_BUDGET = int(os.environ.get('FINANCIALS_TOKEN_BUDGET', 600))
+
+# Market data fetchers - shared by the agent tools and the prefetch stage
+
+def fetch_current_stock_price(symbol):
+    try:
+        current_price = current_price_from(quote_cache.get(symbol, "price"))
+        return f"{current_price:.2f}" if current_price else f"Could not fetch current price for {symbol}"
+    except Exception as e:
+        return f"Error fetching current price for {symbol}: {e}"
+
+def fetch_company_info(symbol):
+    try:
+        company_info_full = fundamentals_store.get_profile(symbol)
+        if not company_info_full:
+            return f"Could not fetch company info for {symbol}"
+        
+        # Overlay a live price if one is already cached, without going upstream
+        live_info, _ = quote_cache.peek(symbol)
+        if live_info:
+            company_info_full = {**company_info_full, **{
+                key: live_info[key] for key in ('regularMarketPrice', 'currentPrice', 'marketCap') if key in live_info
+            }}
+        
+        company_info_cleaned = {
+            "Name": company_info_full.get("shortName"),
+            "Symbol": company_info_full.get("symbol"),
+            "Current Stock Price": f"{company_info_full.get('regularMarketPrice', company_info_full.get('currentPrice'))}",
+            "Market Cap": f"{company_info_full.get('marketCap', company_info_full.get('enterpriseValue'))} {company_info_full.get('currency', 'USD')}",
+            "Sector": company_info_full.get("sector"),
+            "Industry": company_info_full.get("industry"),
+            "City": company_info_full.get("city"),
+            "Country": company_info_full.get("country"),
+            "EPS": company_info_full.get("trailingEps"),
+            "P/E Ratio": company_info_full.get("trailingPE"),
+            "52 Week Low": company_info_full.get("fiftyTwoWeekLow"),
+            "52 Week High": company_info_full.get("fiftyTwoWeekHigh"),
+            "50 Day Average": company_info_full.get("fiftyDayAverage"),
+            "200 Day Average": company_info_full.get("twoHundredDayAverage"),
+            "Employees": company_info_full.get("fullTimeEmployees"),
+            "Total Cash": company_info_full.get("totalCash"),
+            "Free Cash Flow": company_info_full.get("freeCashflow"),
+            "Operating Cash Flow": company_info_full.get("operatingCashflow"),
+            "EBITDA": company_info_full.get("ebitda"),
+            "Revenue Growth": company_info_full.get("revenueGrowth"),
+            "Gross Margins": company_info_full.get("grossMargins"),
+            "Ebitda Margins": company_info_full.get("ebitdaMargins"),
+        }
+        return json.dumps(company_info_cleaned)
+    except Exception as e:
+        return f"Error fetching company profile for {symbol}: {e}"
+
+def fetch_income_statements(symbol):
+    try:
+        return compact_statement(
+            fundamentals_store.get_statement(symbol, "income_statement"), INCOME_STATEMENT_ITEMS,
+            periods=FINANCIALS_PERIODS, token_budget=FINANCIALS_TOKEN_BUDGET
+        )
+    except Exception as e:
+        return f"Error fetching income statements for {symbol}: {e}"
+
+def fetch_balance_sheet(symbol):
+    try:
+        return compact_statement(
+            fundamentals_store.get_statement(symbol, "balance_sheet"), BALANCE_SHEET_ITEMS,
+            periods=FINANCIALS_PERIODS, token_budget=FINANCIALS_TOKEN_BUDGET
+        )
+    except Exception as e:
+        return f"Error fetching balance sheet for {symbol}: {e}"
+
+def fetch_news_articles(symbol, limit=10):
+    return fundamentals_store.get_news(symbol, limit)
+
+def fetch_news(symbol):
+    try:
+        return json.dumps(fetch_news_articles(symbol, 10))  # Limit to 10 most recent articles
+    except Exception as e:
+        return f"Error fetching news for {symbol}: {e}"
+
+# Long-lived clients shared by every analysis: one search wrapper and one LLM client
+# whose HTTP connection pool keeps TLS sessions to the model provider alive
+search_runner = DuckDuckGoSearchRun()
+llm_http_client = httpx.Client(
+    limits=httpx.Limits(
+        max_connections=int(os.environ.get('LLM_MAX_CONNECTIONS', 20)),
+        max_keepalive_connections=int(os.environ.get('LLM_MAX_KEEPALIVE', 10))
+    ),
+    timeout=float(os.environ.get('LLM_TIMEOUT', 120))
+)
+
+class CrewRunMetrics:
+    """Wall time and token usage per task of one crew run."""
+    
+    def __init__(self):
+        self.started = self.stage_started = time.perf_counter()
+        self.stage = ANALYSIS_STAGES[0]
+        self.tasks = {stage: {"agent": None, "duration_seconds": None, "prompt_tokens": 0, "completion_tokens": 0}
+                      for stage in ANALYSIS_STAGES}
+        self._lock = threading.Lock()
+    
+    def add_tokens(self, prompt_tokens, completion_tokens):
+        with self._lock:
+            task = self.tasks[self.stage]
+            task["prompt_tokens"] += prompt_tokens
+            task["completion_tokens"] += completion_tokens
+    
+    def complete_stage(self, stage, agent, next_stage=None):
+        now = time.perf_counter()
+        with self._lock:
+            duration = now - self.stage_started
+            self.tasks[stage].update(agent=agent, duration_seconds=round(duration, 3))
+            self.stage_started = now
+            if next_stage:
+                self.stage = next_stage
+        CREW_TASK_DURATION.observe(duration, stage=stage, agent=agent)
+    
+    def summary(self, usage_metrics=None):
+        return {
+            "duration_seconds": round(time.perf_counter() - self.started, 3),
+            "tasks": self.tasks,
+            "usage_metrics": dict(usage_metrics) if isinstance(usage_metrics, dict) else None,
+        }
+
+# The crew run whose LLM calls are being made in this context
+_current_run = ContextVar("crew_run", default=None)
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Times every LLM call and attributes its token usage to the running crew task."""
+    
+    def __init__(self, model):
+        self.model = model
+        self._started = {}
+    
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+    
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            observe_upstream("llm", self.model, time.perf_counter() - started)
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        run = _current_run.get()
+        stage = run.stage if run else "none"
+        LLM_TOKENS.inc(prompt_tokens, model=self.model, stage=stage, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, model=self.model, stage=stage, kind="completion")
+        if run:
+            run.add_tokens(prompt_tokens, completion_tokens)
+    
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            observe_upstream("llm", self.model, time.perf_counter() - started, "error")
+
+llm_model = os.environ.get('OPENAI_MODEL_NAME', 'gpt-4')
+llm = ChatOpenAI(model=llm_model, http_client=llm_http_client, callbacks=[LLMMetricsHandler(llm_model)])
+
+# Agents repeat near-identical searches within and across runs; results are shared for SEARCH_CACHE_TTL
+search_cache = SearchCache(
+    search=lambda query: search_upstream.call(search_runner.run, query),
+    ttl=float(os.environ.get('SEARCH_CACHE_TTL', 3600)),
+    max_size=int(os.environ.get('SEARCH_CACHE_SIZE', 1000))
+)
+# Upstream searches one crew run may make; cache hits don't count
+SEARCH_BUDGET_PER_ANALYSIS = int(os.environ.get('SEARCH_BUDGET_PER_ANALYSIS', 8))
+
+# Define tools for CrewAI agents
+
+@tool("DuckDuckGo Search")
+def search_tool(search_query: str):
+    """Search the internet for information on a given topic"""
+    try:
+        return search_cache.search(search_query)
+    except SearchBudgetExceeded:
+        return "The web search budget for this analysis is used up. Continue with the information you already have."
+    except UpstreamUnavailable:
+        return "Web search is temporarily unavailable. Continue with the information you already have."
+    except Exception as e:
+        return f"Search failed for '{search_query}': {e}. Continue with the information you already have."
+
+@tool("Get current stock price")
+def get_current_stock_price(symbol: str) -> str:
+    """Use this function to get the current stock price for a given symbol.
+    
+    Args:
+        symbol (str): The stock symbol.
+        
+    Returns:
+        str: The current stock price or error message.
+    """
+    return fetch_current_stock_price(symbol)
+
+@tool
+def get_company_info(symbol: str):
+    """Use this function to get company information and current financial snapshot for a given stock symbol.
+    
+    Args:
+        symbol (str): The stock symbol.
+        
+    Returns:
+        JSON containing company profile and current financial snapshot.
+    """
+    return fetch_company_info(symbol)
+
+@tool
+def get_income_statements(symbol: str):
+    """Use this function to get income statements for a given stock symbol.
+    
+    Args:
+        symbol (str): The stock symbol.
+        
+    Returns:
+        Table of key income statement line items for the most recent periods.
+    """
+    return fetch_income_statements(symbol)
+
+@tool
+def get_balance_sheet(symbol: str):
+    """Use this function to get balance sheet data for a given stock symbol.
+    
+    Args:
+        symbol (str): The stock symbol.
+        
+    Returns:
+        Table of key balance sheet line items for the most recent periods.
+    """
+    return fetch_balance_sheet(symbol)
+
+@tool
+def get_news(symbol: str):
+    """Use this function to get recent news about a given stock symbol.
+    
+    Args:
+        symbol (str): The stock symbol.
+        
+    Returns:
+        JSON containing news articles or an empty array.
+    """
+    return fetch_news(symbol)
+
+# Deterministic prefetch of everything the data collector needs, run before the crew starts
+prefetch_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('PREFETCH_WORKERS', 10)), thread_name_prefix="prefetch"
+)
+PREFETCH_TIMEOUT = float(os.environ.get('PREFETCH_TIMEOUT', 20))
+
+PREFETCH_SECTIONS = (
+    ("Current Stock Price", fetch_current_stock_price),
+    ("Company Profile", fetch_company_info),
+    ("Income Statements", fetch_income_statements),
+    ("Balance Sheet", fetch_balance_sheet),
+)
+
+def prefetch_market_data(symbol):
+    """Fetch price, profile, statements and news for a symbol concurrently.
+    
+    Returns a dict with the tool-formatted text of each section under
+    "sections" and the raw article list under "news_articles".
+    """
+    return prefetch_market_data_many([symbol])[symbol.upper()]
+
+def prefetch_market_data_many(symbols):
+    """Prefetch every section of every symbol in one concurrent pass, keyed by symbol.
+    
+    The whole pass shares one PREFETCH_TIMEOUT deadline; sections still
+    fetching when it passes are reported as not available.
+    """
+    symbols = list(dict.fromkeys(s.upper() for s in symbols))
+    deadline = time.monotonic() + PREFETCH_TIMEOUT
+    # Warm all quotes with one batched lookup before the per-section fetchers read them
+    quote_cache.get_many(symbols, "price", deadline=PREFETCH_TIMEOUT)
+    
+    futures = {
+        symbol: (
+            {title: prefetch_pool.submit(fetcher, symbol) for title, fetcher in PREFETCH_SECTIONS},
+            prefetch_pool.submit(fetch_news_articles, symbol, 10)
+        )
+        for symbol in symbols
+    }
+    pending = [future for sections, news in futures.values() for future in (*sections.values(), news)]
+    done, not_done = wait(pending, timeout=max(0.0, deadline - time.monotonic()))
+    for future in not_done:
+        future.cancel()  # not started yet: don't let it occupy the pool after the deadline
+    
+    def outcome(future):
+        if future not in done:
+            return None, "timed out"
+        if future.exception() is not None:
+            return None, future.exception() or "failed"
+        return future.result(), None
+    
+    snapshot = {}
+    for symbol, (section_futures, news_future) in futures.items():
+        sections = {}
+        for title, future in section_futures.items():
+            value, error = outcome(future)
+            sections[title] = value if error is None else f"Not available ({error})"
+        news_articles, error = outcome(news_future)
+        if error is None:
+            sections["Recent News"] = json.dumps(news_articles)
+        else:
+            news_articles = []
+            sections["Recent News"] = f"Not available ({error})"
+        snapshot[symbol] = {"symbol": symbol, "sections": sections, "news_articles": news_articles}
+    
+    return snapshot
+
+def format_market_data(market_data):
+    return "\n\n".join(f"### {title}\n{text}" for title, text in market_data["sections"].items())
+
+# Define CrewAI Agents
+def create_agents(llm=llm):
+    data_collector = Agent(
+        role="Financial Data Collector",
+        goal="Collect comprehensive and accurate financial data for the target company.",
+        backstory="""You are an expert at gathering financial data from various sources.
+        You know how to retrieve and organize financial statements, stock prices, market data,
+        and company information efficiently and accurately.""",
+        tools=[search_tool, get_current_stock_price, get_company_info, get_income_statements, get_balance_sheet, get_news],
+        llm=llm
+    )
+    
+    financial_analyst = Agent(
+        role="Financial Analyst",
+        goal="Analyze financial data and identify key insights, trends, and risks.",
+        backstory="""You are a seasoned financial analyst with decades of experience in
+        evaluating companies across multiple sectors. You have a keen eye for identifying
+        financial strengths and weaknesses from balance sheets and income statements.""",
+        tools=[search_tool],
+        llm=llm
+    )
+    
+    investment_advisor = Agent(
+        role="Investment Advisor",
+        goal="Provide actionable investment recommendations based on financial analysis.",
+        backstory="""You have advised numerous clients on investment decisions and portfolio
+        management. You understand risk profiles, time horizons, and how to translate complex
+        financial analysis into clear investment recommendations with solid reasoning.""",
+        tools=[search_tool],
+        llm=llm
+    )
+    
+    return data_collector, financial_analyst, investment_advisor
+
+def clear_agent_callbacks(agents):
+    # Crew only fills in step_callback on agents that have none, so a pooled agent
+    # would otherwise keep reporting its first run's progress to that run's job
+    for agent in agents:
+        agent.step_callback = None
+
+# Agent sets are built once and reused across analyses
+agent_pool = AgentPool(create_agents, max_size=int(os.environ.get('AGENT_POOL_SIZE', 4)), reset=clear_agent_callbacks)
+# Seconds a run waits for a free agent set before giving up with AgentPoolExhausted
+AGENT_POOL_TIMEOUT = float(os.environ.get('AGENT_POOL_TIMEOUT', 120))
+
+# Define CrewAI Tasks
+def create_tasks(data_collector, financial_analyst, investment_advisor, company_symbol, callback=None, market_data=None):
+    prefetched_context = ""
+    if market_data:
+        prefetched_context = f"""
+        The following data for {company_symbol} has already been retrieved for you.
+        Use it directly; only call your tools for information that is missing below.
+        
+        {format_market_data(market_data)}
+        """
+    
+    data_collection_task = Task(
+        description=f"""
+        Collect all relevant financial information for {company_symbol}.
+        This should include:
+        1. Current stock price and recent price movements
+        2. Company profile and basic information
+        3. Key financial metrics from income statements and balance sheets
+        4. Recent news and significant events
+        
+        Organize this information in a clear, structured format.
+        {prefetched_context}""",
+        agent=data_collector,
+        callback=callback
+    )
+    
+    financial_analysis_task = Task(
+        description=f"""
+        Analyze the financial data collected for {company_symbol}.
+        Your analysis should include:
+        1. Assessment of financial health and stability
+        2. Evaluation of growth trends and profitability
+        3. Comparison to industry benchmarks
+        4. Identification of key risks and strengths
+        5. Valuation assessment (e.g., P/E ratio analysis)
+        
+        Provide a comprehensive analysis with clear insights.
+        """,
+        agent=financial_analyst,
+        dependencies=[data_collection_task],
+        callback=callback
+    )
+    
+    investment_recommendation_task = Task(
+        description=f"""
+        Based on the financial analysis of {company_symbol}, provide:
+        1. A clear investment recommendation (Buy, Hold, or Sell)
+        2. Target price range
+        3. Recommended time horizon
+        4. Risk assessment
+        5. Key factors supporting your recommendation
+        6. Potential catalysts and risks to monitor
+        
+        Your recommendation should be well-reasoned and actionable.
+        State the recommendation, target price range, time horizon and risk level
+        on their own labelled lines ("Recommendation:", "Target Price:", "Time Horizon:", "Risk Level:").
+        {RECOMMENDATION_JSON_INSTRUCTIONS}""",
+        agent=investment_advisor,
+        dependencies=[financial_analysis_task],
+        callback=callback
+    )
+    
+    return data_collection_task, financial_analysis_task, investment_recommendation_task
+def describe_agent_step(step):
+    """Render a CrewAI step callback payload as readable text for progress streams."""
+    if hasattr(step, 'return_values'):
+        return str(step.return_values.get('output', ''))
+    if isinstance(step, list):
+        lines = []
+        for action, observation in step:
+            lines.append(f"{getattr(action, 'tool', 'action')}({getattr(action, 'tool_input', '')}) -> {str(observation)[:500]}")
+        return "\n".join(lines)
+    return str(step)
+
+def agent_final_answer(step):
+    """The agent's own final answer from a CrewAI step callback payload, or None for a tool step."""
+    if hasattr(step, 'return_values'):
+        return str(step.return_values.get('output', ''))
+    return None
+
+def run_analysis(symbol, emit=None, market_data=None):
+    """Run the full crew analysis for a symbol and return the API payload.
+    
+    `emit(event_type, data)` receives "stage" events as each task starts and
+    completes and "output" events with intermediate agent output. Pass
+    `market_data` (from `prefetch_market_data`) to skip the prefetch stage.
+    """
+    emit = emit or (lambda event_type, data: None)
+    symbol = symbol.upper()
+    current = {"stage": 0}
+    run_metrics = CrewRunMetrics()
+    stage_agents = {}
+    # Extracts the recommendation from the advisor's streamed output as it arrives
+    recommendation_parser = RecommendationParser()
+    
+    def on_task_complete(output):
+        stage = ANALYSIS_STAGES[current["stage"]]
+        emit("stage", {"stage": stage, "status": "completed", "output": str(output)})
+        current["stage"] += 1
+        next_stage = ANALYSIS_STAGES[current["stage"]] if current["stage"] < len(ANALYSIS_STAGES) else None
+        run_metrics.complete_stage(stage, stage_agents.get(stage), next_stage)
+        if next_stage:
+            emit("stage", {"stage": next_stage, "status": "running"})
+    
+    def on_agent_step(step):
+        stage = ANALYSIS_STAGES[min(current["stage"], len(ANALYSIS_STAGES) - 1)]
+        text = describe_agent_step(step)
+        emit("output", {"stage": stage, "text": text})
+        # Only the advisor's own answer; tool observations (search snippets, scraped
+        # pages) may quote someone else's "Recommendation: Sell"
+        answer = agent_final_answer(step) if stage == "recommendation" else None
+        if answer is not None:
+            before = recommendation_parser.result
+            if recommendation_parser.feed(answer + "\n") != before:
+                emit("recommendation", recommendation_parser.result)
+    
+    # Pull all datasets up front so the data collector doesn't spend an LLM turn per fetch
+    emit("stage", {"stage": ANALYSIS_STAGES[0], "status": "running"})
+    if market_data is None:
+        market_data = prefetch_market_data(symbol)
+    emit("output", {"stage": ANALYSIS_STAGES[0], "text": f"Prefetched: {', '.join(market_data['sections'])}"})
+    
+    # Searches naming the company share cache entries with searches naming its symbol
+    company_info = quote_cache.peek(symbol)[0] or {}
+    aliases = {company_info[key]: symbol for key in ('shortName', 'longName') if company_info.get(key)}
+    
+    # Reuse a pooled agent set; only the per-symbol tasks are built per run
+    with agent_pool.checkout(AGENT_POOL_TIMEOUT) as (data_collector, financial_analyst, investment_advisor), \
+            search_budget(SEARCH_BUDGET_PER_ANALYSIS, aliases):
+        stage_agents.update(zip(ANALYSIS_STAGES, (data_collector.role, financial_analyst.role, investment_advisor.role)))
+        # Bind this run's progress callback explicitly rather than relying on Crew to set it
+        for agent in (data_collector, financial_analyst, investment_advisor):
+            agent.step_callback = on_agent_step
+        # Create tasks
+        data_task, analysis_task, recommendation_task = create_tasks(
+            data_collector, financial_analyst, investment_advisor, symbol,
+            callback=on_task_complete, market_data=market_data
+        )
+        
+        # Create and run crew
+        crew = Crew(
+            agents=[data_collector, financial_analyst, investment_advisor],
+            tasks=[data_task, analysis_task, recommendation_task],
+            verbose=True,
+            step_callback=on_agent_step
+        )
+        
+        run_token = _current_run.set(run_metrics)
+        try:
+            result = crew.kickoff()
+        except Exception:
+            CREW_RUN_DURATION.observe(time.perf_counter() - run_metrics.started, outcome="error")
+            raise
+        finally:
+            _current_run.reset(run_token)
+        CREW_RUN_DURATION.observe(time.perf_counter() - run_metrics.started, outcome="ok")
+    
+    # Parse and structure the results
+    structured_result = {
+        "symbol": symbol,
+        "analysis_date": today(),
+        "data": {},
+        "analysis": {},
+        "recommendation": {}
+    }
+    
+    # Get basic stock data directly
+    try:
+        info = quote_cache.get(symbol, "price")
+        
+        structured_result["data"] = {
+            "company_name": info.get("shortName", ""),
+            "symbol": info.get("symbol", symbol),
+            "current_price": current_price_from(info, 0),
+            "price_change": info.get("regularMarketChange", 0),
+            "price_change_percent": info.get("regularMarketChangePercent", 0),
+            "market_cap": info.get("marketCap", 0),
+            "sector": info.get("sector", ""),
+            "industry": info.get("industry", ""),
+            "pe_ratio": info.get("trailingPE", 0),
+            "dividend_yield": info.get("dividendYield", 0),
+            "52_week_low": info.get("fiftyTwoWeekLow", 0),
+            "52_week_high": info.get("fiftyTwoWeekHigh", 0)
+        }
+        
+        # Reuse the prefetched news
+        news = market_data["news_articles"][:5]  # Limit to 5 most recent articles
+        structured_result["data"]["news"] = []
+        for article in news:
+            structured_result["data"]["news"].append({
+                "title": article.get("title"),
+                "publisher": article.get("publisher"),
+                "link": article.get("link"),
+                "published_date": article.get("publishedDate", "")[:10]
+            })
+    except Exception as e:
+        print(f"Error fetching direct stock data: {e}")
+    
+    # Extract the structured recommendation from the final advisor output
+    structured_result["recommendation"] = parse_recommendation(result)
+    
+    # Return both the structured result and the full text analysis
+    return {
+        "structured_data": structured_result,
+        "full_analysis": result,
+        "run_metrics": run_metrics.summary(getattr(crew, "usage_metrics", None))
+    }
+
+# Cached analyses are reused for the same symbol and analysis date within this window
+ANALYSIS_CACHE_MAX_AGE = timedelta(minutes=float(os.environ.get('ANALYSIS_CACHE_MAX_AGE_MINUTES', 60)))
+
+analysis_flight = SingleFlight()
+# Progress callbacks of every caller waiting on an in-flight analysis, by symbol
+analysis_listeners = {}
+analysis_listeners_lock = threading.Lock()
+
+def find_cached_analysis(symbol):
+    cached = analyses_collection.find_one({
+        "symbol": symbol,
+        "analysis_date": today(),
+        "created_at": {"$gte": datetime.now() - ANALYSIS_CACHE_MAX_AGE}
+    })
+    if not cached:
+        return None
+    return {**cached["payload"], "cached": True, "generated_at": cached["created_at"].isoformat()}
+
+def run_and_store_analysis(symbol, market_data=None):
+    def broadcast(event_type, data):
+        with analysis_listeners_lock:
+            listeners = list(analysis_listeners.get(symbol, []))
+        for listener in listeners:
+            listener(event_type, data)
+    
+    payload = run_analysis(symbol, broadcast, market_data)
+    created_at = datetime.now()
+    # Stored under the date the run reported, so the cache key matches the payload
+    analysis_date = payload["structured_data"]["analysis_date"]
+    analyses_collection.replace_one(
+        {"symbol": symbol, "analysis_date": analysis_date},
+        {"symbol": symbol, "analysis_date": analysis_date, "payload": payload, "created_at": created_at},
+        upsert=True
+    )
+    return {**payload, "cached": False, "generated_at": created_at.isoformat()}
+
+def get_or_run_analysis(symbol, emit=None, refresh=False, market_data=None):
+    """Return a fresh cached analysis for today, or run one.
+    
+    Concurrent requests for the same symbol share a single cache lookup and
+    crew run; each caller's `emit` still receives the progress events of that
+    run. Refreshes fly separately, so they never get a cached result.
+    """
+    symbol = symbol.upper()
+    
+    def load():
+        if not refresh:
+            cached = find_cached_analysis(symbol)
+            if cached:
+                return cached
+        return run_and_store_analysis(symbol, market_data)
+    
+    listener = emit or (lambda event_type, data: None)
+    with analysis_listeners_lock:
+        analysis_listeners.setdefault(symbol, []).append(listener)
+    try:
+        return analysis_flight.do((symbol, refresh), load)
+    finally:
+        with analysis_listeners_lock:
+            analysis_listeners[symbol].remove(listener)
+            if not analysis_listeners[symbol]:
+                del analysis_listeners[symbol]
+
+# Batch analyses share one crew pool; each batch also caps its own concurrency
+BATCH_MAX_SYMBOLS = int(os.environ.get('BATCH_MAX_SYMBOLS', 50))
+BATCH_MAX_CONCURRENCY = int(os.environ.get('BATCH_MAX_CONCURRENCY', 4))
+BATCH_HEARTBEAT = 15
+batch_pool = ThreadPoolExecutor(max_workers=BATCH_MAX_CONCURRENCY, thread_name_prefix="batch-analysis")
+# Batches streaming at once per process; more are turned away instead of queueing behind batch_pool
+batch_slots = threading.BoundedSemaphore(int(os.environ.get('BATCH_MAX_ACTIVE', 2)))
+
+def summarize_analysis(symbol, payload):
+    """One row of the batch comparison table."""
+    structured = payload.get("structured_data", {})
+    data = structured.get("data", {})
+    recommendation = structured.get("recommendation", {})
+    current_price = data.get("current_price")
+    target_price = recommendation.get("target_price")
+    upside = None
+    if current_price and target_price:
+        upside = round((target_price / current_price - 1) * 100, 2)
+    return {
+        "symbol": symbol,
+        "company_name": data.get("company_name"),
+        "sector": data.get("sector"),
+        "current_price": current_price,
+        "pe_ratio": data.get("pe_ratio"),
+        "market_cap": data.get("market_cap"),
+        "action": recommendation.get("action"),
+        "target_price": target_price,
+        "upside_percent": upside,
+        "time_horizon": recommendation.get("time_horizon"),
+        "risk_level": recommendation.get("risk_level"),
+        "cached": payload.get("cached", False),
+        "generated_at": payload.get("generated_at"),
+    }
+
+def run_batch_analysis(symbols, concurrency=2, refresh=False):
+    """Analyze many symbols, yielding `(event_type, data)` as the batch progresses.
+    
+    Cached analyses are returned straight away. Market data for the rest is
+    prefetched in one snapshot up front, then at most `concurrency` crews of
+    this batch run at a time. Events are "batch" (the plan), "progress"
+    (stage changes), "result" or "error" per symbol as each one finishes, and
+    a final "summary" comparison table in input order. `None` is yielded as a
+    keep-alive while crews are running.
+    """
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+    results = {}
+    errors = {}
+    
+    for symbol in symbols:
+        cached = None if refresh else find_cached_analysis(symbol)
+        if cached:
+            results[symbol] = cached
+    queued = [symbol for symbol in symbols if symbol not in results]
+    yield "batch", {"symbols": symbols, "cached": [s for s in symbols if s in results], "queued": queued, "concurrency": concurrency}
+    for symbol in symbols:
+        if symbol in results:
+            yield "result", {"symbol": symbol, "analysis": results[symbol]}
+    
+    snapshot = prefetch_market_data_many(queued) if queued else {}
+    events = queue.Queue()
+    
+    def run_one(symbol):
+        def emit(event_type, data):
+            if event_type == "stage":
+                events.put(("progress", {"symbol": symbol, "stage": data["stage"], "status": data["status"]}))
+        try:
+            payload = get_or_run_analysis(symbol, emit, refresh=refresh, market_data=snapshot[symbol])
+            events.put(("result", {"symbol": symbol, "analysis": payload}))
+        except Exception as e:
+            events.put(("error", {"symbol": symbol, "error": str(e)}))
+    
+    running = 0
+    while queued or running:
+        while queued and running < concurrency:
+            batch_pool.submit(run_one, queued.pop(0))
+            running += 1
+        try:
+            event_type, data = events.get(timeout=BATCH_HEARTBEAT)
+        except queue.Empty:
+            yield None
+            continue
+        if event_type == "result":
+            results[data["symbol"]] = data["analysis"]
+            running -= 1
+        elif event_type == "error":
+            errors[data["symbol"]] = data["error"]
+            running -= 1
+        yield event_type, data
+    
+    yield "summary", {
+        "completed": len(results),
+        "failed": len(errors),
+        "rows": [
+            summarize_analysis(symbol, results[symbol]) if symbol in results
+            else {"symbol": symbol, "error": errors.get(symbol)}
+            for symbol in symbols
+        ]
+    }
+
+def shutdown():
+    """Stop the prefetch and batch pools and close the LLM connection pool."""
+    batch_pool.shutdown(wait=False, cancel_futures=True)
+    prefetch_pool.shutdown(wait=False, cancel_futures=True)
+    llm_http_client.close()
@@ -0,0 +1,318 @@
+# server/analysis_jobs.py
+import json
+import os
+import socket
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import time
+from datetime import datetime, timedelta
+
+# Stages of a crew run, in execution order
+ANALYSIS_STAGES = ("data_collection", "analysis", "recommendation")
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class JobQueueFull(Exception):
+    """Raised when the manager already has `max_pending` jobs queued or running."""
+
+
+def _owner_alive(owner):
+    """Whether the process that owns a job (\"host:pid\") is still running on this host."""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """SQLite-backed persistence for analysis jobs and their event log.
+
+    Jobs that were queued or running when the process stopped are picked up
+    again on the next start (see `AnalysisJobManager.resume`). Several worker
+    processes may share one database file: it runs in WAL mode, and a write
+    that finds the file locked waits up to `busy_timeout` seconds instead of
+    failing with "database is locked".
+    """
+
+    def __init__(self, path, busy_timeout=30.0):
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=busy_timeout)
+        self._conn.row_factory = sqlite3.Row
+        # Readers don't block the writer (or each other) across processes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        # Identifies this process so several server workers can share one store
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    symbol TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    owner TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS job_events (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    type TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (job_id, seq)
+                );
+                CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+            """)
+
+    def create(self, symbol):
+        now = datetime.now().isoformat()
+        job_id = uuid.uuid4().hex
+        progress = {stage: "pending" for stage in ANALYSIS_STAGES}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, symbol, status, progress, owner, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, symbol, "queued", json.dumps(progress), self.owner, now, now)
+            )
+        return job_id
+
+    def update(self, job_id, status=None, progress=None, result=None, error=None):
+        fields = {"updated_at": datetime.now().isoformat()}
+        if status is not None:
+            fields["status"] = status
+        if progress is not None:
+            fields["progress"] = json.dumps(progress)
+        if result is not None:
+            fields["result"] = json.dumps(result)
+        if error is not None:
+            fields["error"] = error
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row["id"],
+            "symbol": row["symbol"],
+            "status": row["status"],
+            "progress": json.loads(row["progress"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def state(self, job_id):
+        """`(status, owner)` of a job, or None if it doesn't exist."""
+        with self._lock:
+            row = self._conn.execute("SELECT status, owner FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else (row["status"], row["owner"])
+
+    def append_event(self, job_id, event_type, data):
+        with self._lock, self._conn:
+            seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM job_events WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            self._conn.execute(
+                "INSERT INTO job_events (job_id, seq, type, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, seq, event_type, json.dumps(data), datetime.now().isoformat())
+            )
+        return seq
+
+    def events_since(self, job_id, seq):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, type, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, seq)
+            ).fetchall()
+        return [(row["seq"], row["type"], json.loads(row["data"])) for row in rows]
+
+    def prune(self, older_than):
+        """Delete finished jobs (and their events) last updated more than `older_than` ago; returns the count."""
+        cutoff = (datetime.now() - older_than).isoformat()
+        statuses = ", ".join("?" * len(TERMINAL_STATUSES))
+        with self._lock, self._conn:
+            ids = [row[0] for row in self._conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({statuses}) AND updated_at < ?", (*TERMINAL_STATUSES, cutoff)
+            )]
+            self._conn.executemany("DELETE FROM job_events WHERE job_id = ?", [(job_id,) for job_id in ids])
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in ids])
+        return len(ids)
+
+    def claim_orphaned(self):
+        """Take over unfinished jobs whose owning process is gone; return `(id, symbol)` pairs.
+
+        The conditional UPDATE makes the claim atomic, so when several
+        workers start at once each orphaned job is resumed by exactly one.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, symbol, owner FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        claimed = []
+        for row in rows:
+            if row["owner"] == self.owner or _owner_alive(row["owner"]):
+                continue
+            with self._lock, self._conn:
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET owner = ? WHERE id = ? AND owner IS ?", (self.owner, row["id"], row["owner"])
+                )
+            if cursor.rowcount:
+                claimed.append((row["id"], row["symbol"]))
+        return claimed
+
+
+class AnalysisJobManager:
+    """Runs crew analyses on a bounded worker pool and records their progress.
+
+    `runner(symbol, emit)` does the actual work and returns the result
+    payload; it reports progress by calling `emit(event_type, data)`. "stage"
+    events (`{"stage": ..., "status": ...}`) update the per-stage progress,
+    every event is appended to the job's event log for streaming.
+
+    At most `max_pending` jobs may be queued or running in this process;
+    `submit` raises `JobQueueFull` beyond that. Finished jobs are deleted
+    with their events once they are older than `retention`.
+    """
+
+    def __init__(self, runner, store, max_workers=2, max_pending=20, retention=timedelta(days=3)):
+        self._runner = runner
+        self._store = store
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job")
+        self._changed = threading.Condition()
+        self._version = 0  # bumped on every event so waiting streams can't miss a notification
+        self._max_pending = max_pending
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._retention = retention
+        self._pruned_at = 0.0
+        self.rejected = 0
+
+    def submit(self, symbol):
+        with self._pending_lock:
+            if self._pending >= self._max_pending:
+                self.rejected += 1
+                raise JobQueueFull("Too many analyses queued, try again later")
+            self._pending += 1
+        try:
+            job_id = self._store.create(symbol.upper())
+            self._pool.submit(self._run, job_id, symbol.upper())
+        except Exception:
+            with self._pending_lock:
+                self._pending -= 1
+            raise
+        self.prune()
+        return self._store.get(job_id)
+
+    def prune(self, force=False):
+        """Delete expired finished jobs, at most once an hour unless `force` is set."""
+        now = time.monotonic()
+        if not force and now - self._pruned_at < 3600:
+            return 0
+        self._pruned_at = now
+        return self._store.prune(self._retention)
+
+    def get(self, job_id):
+        return self._store.get(job_id)
+
+    def resume(self):
+        """Re-queue jobs left unfinished by a process that is no longer running."""
+        self.prune(force=True)
+        jobs = self._store.claim_orphaned()
+        for job_id, symbol in jobs:
+            self._store.update(job_id, status="queued", progress={stage: "pending" for stage in ANALYSIS_STAGES})
+            with self._pending_lock:
+                self._pending += 1
+            self._pool.submit(self._run, job_id, symbol)
+        return len(jobs)
+
+    def stats(self):
+        with self._pending_lock:
+            return {"pending": self._pending, "max_pending": self._max_pending, "rejected": self.rejected}
+
+    def events(self, job_id, last_seq=0, heartbeat=15, poll_interval=1.0):
+        """Yield `(seq, type, data)` events for a job until it finishes; `None` is yielded as a keep-alive.
+
+        Events of a job run by this process wake the stream at once. A job
+        run by another worker process only shows up in the shared store, so
+        then the store is polled every `poll_interval` seconds.
+        """
+        quiet_since = time.monotonic()
+        while True:
+            with self._changed:
+                version = self._version
+            events = self._store.events_since(job_id, last_seq)
+            for event in events:
+                last_seq = event[0]
+                yield event
+            state = self._store.state(job_id)
+            if state is None or (state[0] in TERMINAL_STATUSES and not events):
+                return
+            if events:
+                quiet_since = time.monotonic()
+                continue
+            quiet = time.monotonic() - quiet_since
+            if quiet >= heartbeat:
+                quiet_since = time.monotonic()
+                yield None
+                continue
+            wait = heartbeat - quiet
+            if state[1] != self._store.owner:
+                wait = min(wait, poll_interval)
+            with self._changed:
+                self._changed.wait_for(lambda: self._version != version, timeout=wait)
+
+    def shutdown(self, wait=True):
+        """Stop accepting work, letting running analyses finish when `wait` is set.
+
+        Jobs that have not started yet stay "queued" in the store and are
+        picked up by `resume` on the next start.
+        """
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _emit(self, job_id, event_type, data):
+        self._store.append_event(job_id, event_type, data)
+        with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    def _run(self, job_id, symbol):
+        try:
+            self._execute(job_id, symbol)
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
+
+    def _execute(self, job_id, symbol):
+        progress = {stage: "pending" for stage in ANALYSIS_STAGES}
+
+        def emit(event_type, data):
+            if event_type == "stage":
+                progress[data["stage"]] = data["status"]
+                self._store.update(job_id, progress=progress)
+            self._emit(job_id, event_type, data)
+
+        self._store.update(job_id, status="running")
+        self._emit(job_id, "status", {"status": "running"})
+        try:
+            result = self._runner(symbol, emit)
+        except Exception as e:
+            self._store.update(job_id, status="failed", error=f"Analysis failed: {e}")
+            self._emit(job_id, "status", {"status": "failed", "error": f"Analysis failed: {e}"})
+            return
+        self._store.update(job_id, status="completed", result=result)
+        self._emit(job_id, "status", {"status": "completed"})
@@ -0,0 +1,109 @@
+# server/analysis_routes.py
+"""Analysis routes. The crew stack (`analysis`) is imported by the handlers that run
+an analysis, so workers that never serve one don't pay for loading it."""
+import json
+
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required
+
+from agent_pool import AgentPoolExhausted
+from analysis_jobs import JobQueueFull
+from extensions import analysis_jobs
+
+analysis_bp = Blueprint('analysis', __name__)
+
+@analysis_bp.route('/api/analyze/<symbol>', methods=['GET'])
+@jwt_required()
+def analyze_stock(symbol):
+    from analysis import get_or_run_analysis
+    
+    try:
+        refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+        return jsonify(get_or_run_analysis(symbol, refresh=refresh)), 200
+    except AgentPoolExhausted as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+    except Exception as e:
+        return jsonify({"error": f"Analysis failed: {str(e)}"}), 500
+
+@analysis_bp.route('/api/analyze/<symbol>', methods=['POST'])
+@jwt_required()
+def create_analysis_job(symbol):
+    try:
+        job = analysis_jobs.submit(symbol)
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+    return jsonify({
+        "job_id": job["job_id"],
+        "symbol": job["symbol"],
+        "status": job["status"],
+        "status_url": f"/api/analyze/jobs/{job['job_id']}",
+        "events_url": f"/api/analyze/jobs/{job['job_id']}/events"
+    }), 202
+
+@analysis_bp.route('/api/analyze/batch', methods=['POST'])
+@jwt_required()
+def analyze_batch():
+    from analysis import BATCH_MAX_SYMBOLS, batch_slots, run_batch_analysis
+    
+    data = request.get_json()
+    
+    # Validate input
+    symbols = (data or {}).get('symbols')
+    if not isinstance(symbols, list) or not symbols or not all(isinstance(s, str) for s in symbols):
+        return jsonify({"error": "A non-empty list of symbols is required"}), 400
+    if len(symbols) > BATCH_MAX_SYMBOLS:
+        return jsonify({"error": f"At most {BATCH_MAX_SYMBOLS} symbols per batch"}), 400
+    try:
+        concurrency = int(data.get('concurrency', 2))
+    except (TypeError, ValueError):
+        return jsonify({"error": "concurrency must be an integer"}), 400
+    refresh = bool(data.get('refresh', False))
+    if not batch_slots.acquire(blocking=False):
+        return jsonify({"error": "Too many batch analyses running, try again later"}), 503, {"Retry-After": "30"}
+    
+    def generate():
+        for event in run_batch_analysis(symbols, concurrency=concurrency, refresh=refresh):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            event_type, payload = event
+            yield f"event: {event_type}\ndata: {json.dumps(payload)}\n\n"
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+    # Released when the stream ends or the client goes away
+    response.call_on_close(batch_slots.release)
+    return response
+
+@analysis_bp.route('/api/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    job = analysis_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+@analysis_bp.route('/api/analyze/jobs/<job_id>/events', methods=['GET'])
+def stream_analysis_job(job_id):
+    if not analysis_jobs.get(job_id):
+        return jsonify({"error": "Job not found"}), 404
+    
+    # Resume after the last event the client saw when EventSource reconnects
+    try:
+        last_seq = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id', 0))
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be an integer"}), 400
+    
+    def generate():
+        for event in analysis_jobs.events(job_id, last_seq):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            seq, event_type, data = event
+            yield f"id: {seq}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
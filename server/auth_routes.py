@@ -0,0 +1,102 @@
+# server/auth_routes.py
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import create_access_token
+from pymongo.errors import DuplicateKeyError
+
+from db import create_user_documents
+from extensions import get_db, password_hasher, transactions_supported, users_collection
+from password_hasher import HasherBusy
+
+auth_bp = Blueprint('auth', __name__)
+
+def busy_response(e):
+    return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+
+@auth_bp.route('/api/auth/register', methods=['POST'])
+def register():
+    data = request.get_json()
+    
+    # Validate input
+    if not data or not data.get('email') or not data.get('password') or not data.get('name'):
+        return jsonify({"error": "Missing required fields"}), 400
+    
+    # Hash off the request thread
+    try:
+        password_hash = password_hasher.hash(data['password'])
+    except HasherBusy as e:
+        return busy_response(e)
+    
+    now = datetime.now()
+    user = {
+        "name": data['name'],
+        "email": data['email'],
+        "password": password_hash,
+        "created_at": now
+    }
+    
+    # Create the user with an empty portfolio and watchlist in one write (a transaction
+    # where the deployment supports it) - the unique email index rejects duplicates atomically
+    owned = {"user_email": data['email'], "stocks": [], "created_at": now, "updated_at": now}
+    try:
+        create_user_documents(
+            get_db(), user, {"portfolios": owned, "watchlists": owned},
+            use_transaction=transactions_supported()
+        )
+    except DuplicateKeyError:
+        return jsonify({"error": "User already exists"}), 409
+    
+    # Generate token
+    access_token = create_access_token(identity=data['email'])
+    
+    return jsonify({
+        "message": "User registered successfully",
+        "token": access_token,
+        "user": {
+            "name": user["name"],
+            "email": user["email"]
+        }
+    }), 201
+
+@auth_bp.route('/api/auth/login', methods=['POST'])
+def login():
+    data = request.get_json()
+    
+    # Validate input
+    if not data or not data.get('email') or not data.get('password'):
+        return jsonify({"error": "Missing email or password"}), 400
+    
+    # Find user
+    user = users_collection.find_one({"email": data['email']}, {"name": 1, "email": 1, "password": 1})
+    if not user:
+        return jsonify({"error": "Invalid credentials"}), 401
+    
+    try:
+        matches, needs_rehash = password_hasher.verify(user['password'], data['password'])
+    except HasherBusy as e:
+        return busy_response(e)
+    if not matches:
+        return jsonify({"error": "Invalid credentials"}), 401
+    
+    # Upgrade hashes made with older parameters; only if the stored hash hasn't changed meanwhile
+    if needs_rehash:
+        try:
+            users_collection.update_one(
+                {"_id": user['_id'], "password": user['password']},
+                {"$set": {"password": password_hasher.hash(data['password'])}}
+            )
+        except HasherBusy:
+            pass  # upgraded on a later login
+    
+    # Generate token
+    access_token = create_access_token(identity=data['email'])
+    
+    return jsonify({
+        "message": "Login successful",
+        "token": access_token,
+        "user": {
+            "name": user["name"],
+            "email": user["email"]
+        }
+    }), 200
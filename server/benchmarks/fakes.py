@@ -0,0 +1,266 @@
+# server/benchmarks/fakes.py
+"""Local stand-ins for the server's upstreams, so benchmarks run offline and deterministically.
+
+- `FakeYFinance` replays recorded `yf.Ticker` payloads (see `record_fixtures`)
+  and synthesizes stable data for unrecorded symbols, with configurable latency.
+- `scripted_chat_model()` answers every CrewAI agent with a canned final answer.
+- `FakeSearch` replaces the DuckDuckGo wrapper.
+"""
+import json
+import random
+import sys
+import time
+import types
+import zlib
+from datetime import datetime, timedelta
+
+SECTORS = ("Technology", "Healthcare", "Financial Services", "Energy", "Consumer Cyclical", "Industrials")
+# Business days of synthetic daily bars per symbol (about ten years)
+SYNTHETIC_HISTORY_DAYS = 2520
+
+
+class Latency:
+    """Sleeps `base` seconds plus uniform jitter of +/- `jitter` seconds per call."""
+
+    def __init__(self, base=0.0, jitter=0.0, seed=None):
+        self.base = base
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+    def wait(self):
+        delay = self.base + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _seed(symbol):
+    return zlib.crc32(symbol.upper().encode())
+
+
+def synthetic_info(symbol):
+    symbol = symbol.upper()
+    rng = random.Random(_seed(symbol))
+    price = round(rng.uniform(10, 500), 2)
+    change = round(price * rng.uniform(-0.03, 0.03), 2)
+    return {
+        "symbol": symbol,
+        "shortName": f"{symbol} Corp",
+        "longName": f"{symbol} Corporation",
+        "currency": "USD",
+        "regularMarketPrice": price,
+        "currentPrice": price,
+        "regularMarketChange": change,
+        "regularMarketChangePercent": round(change / (price - change) * 100, 2),
+        "marketCap": int(price * rng.uniform(1e8, 1e10)),
+        "sector": SECTORS[_seed(symbol) % len(SECTORS)],
+        "industry": "Diversified",
+        "trailingPE": round(rng.uniform(8, 60), 2),
+        "trailingEps": round(price / rng.uniform(8, 60), 2),
+        "dividendYield": round(rng.uniform(0, 0.04), 4),
+        "fiftyTwoWeekLow": round(price * 0.7, 2),
+        "fiftyTwoWeekHigh": round(price * 1.3, 2),
+        "fullTimeEmployees": rng.randint(100, 200000),
+    }
+
+
+def synthetic_statement(symbol, items, periods=4):
+    rng = random.Random(_seed(symbol) + len(items))
+    today = datetime.now()
+    return {
+        (today - timedelta(days=365 * i)).strftime("%Y-%m-%d"): {item: rng.uniform(1e6, 1e10) for item in items}
+        for i in range(periods)
+    }
+
+
+def synthetic_news(symbol, count=10):
+    now = int(time.time())
+    return [
+        {
+            "title": f"{symbol.upper()} headline {i}",
+            "publisher": "Benchmark Wire",
+            "link": f"https://example.com/{symbol.lower()}/{i}",
+            "providerPublishTime": now - i * 3600,
+            "type": "STORY",
+            "relatedTickers": [symbol.upper()],
+        }
+        for i in range(count)
+    ]
+
+
+class FakeTicker:
+    def __init__(self, responder, symbol):
+        self._responder = responder
+        self.ticker = symbol.upper()
+
+    @property
+    def info(self):
+        return self._responder.payload(self.ticker, "info")
+
+    @property
+    def financials(self):
+        import pandas as pd
+        return pd.DataFrame(self._responder.payload(self.ticker, "income_statement"))
+
+    @property
+    def balance_sheet(self):
+        import pandas as pd
+        return pd.DataFrame(self._responder.payload(self.ticker, "balance_sheet"))
+
+    @property
+    def news(self):
+        return self._responder.payload(self.ticker, "news")
+
+
+class FakeYFinance:
+    """Replays recorded payloads by symbol, falling back to synthetic data, after `latency`."""
+
+    def __init__(self, fixtures=None, latency=None):
+        self._fixtures = fixtures or {}
+        self.latency = latency or Latency()
+        self.calls = 0
+
+    @classmethod
+    def from_file(cls, path, latency=None):
+        with open(path) as f:
+            return cls(json.load(f), latency)
+
+    def payload(self, symbol, kind):
+        from financials import BALANCE_SHEET_ITEMS, INCOME_STATEMENT_ITEMS
+
+        self.calls += 1
+        self.latency.wait()
+        recorded = self._fixtures.get(symbol, {}).get(kind)
+        if recorded is not None:
+            return recorded
+        if kind == "info":
+            return synthetic_info(symbol)
+        if kind == "income_statement":
+            return synthetic_statement(symbol, INCOME_STATEMENT_ITEMS)
+        if kind == "balance_sheet":
+            return synthetic_statement(symbol, BALANCE_SHEET_ITEMS)
+        return synthetic_news(symbol)
+
+    def download(self, tickers, period="1y", start=None, **kwargs):
+        import numpy as np
+        import pandas as pd
+
+        self.calls += 1
+        self.latency.wait()
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        # Every symbol has one fixed ten-year path, so overlapping downloads agree bar for bar
+        index = pd.bdate_range(end=datetime.now().date(), periods=SYNTHETIC_HISTORY_DAYS)
+        if start is not None:
+            keep = index >= pd.Timestamp(start)
+        else:
+            days = {"1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260}.get(period, SYNTHETIC_HISTORY_DAYS)
+            keep = np.arange(len(index)) >= len(index) - days
+        columns = {}
+        for symbol in tickers:
+            rng = np.random.default_rng(_seed(symbol))
+            start_price = synthetic_info(symbol)["regularMarketPrice"]
+            close = start_price * np.cumprod(1 + rng.normal(0.0003, 0.015, len(index)))
+            spread = np.abs(rng.normal(0, 0.01, len(index)))
+            columns[("Open", symbol)] = close * (1 + rng.normal(0, 0.005, len(index)))
+            columns[("High", symbol)] = close * (1 + spread)
+            columns[("Low", symbol)] = close * (1 - spread)
+            columns[("Close", symbol)] = close
+            columns[("Volume", symbol)] = rng.integers(100_000, 10_000_000, len(index)).astype(float)
+        return pd.DataFrame(columns, index=index)[keep]
+
+    def module(self):
+        """A stand-in `yfinance` module backed by this responder."""
+        module = types.ModuleType("yfinance")
+        module.Ticker = lambda symbol: FakeTicker(self, symbol)
+        module.download = self.download
+        return module
+
+    def install(self):
+        """Make every `import yfinance` in the server resolve to this responder."""
+        sys.modules["yfinance"] = self.module()
+        return self
+
+
+def record_fixtures(symbols, path):
+    """Record live yfinance payloads for `symbols` into a replay file (needs network access)."""
+    import yfinance as yf
+
+    fixtures = {}
+    for symbol in symbols:
+        ticker = yf.Ticker(symbol)
+        statements = {}
+        for kind, frame in (("income_statement", ticker.financials), ("balance_sheet", ticker.balance_sheet)):
+            statements[kind] = {
+                str(column)[:10]: {str(item): (None if value != value else float(value)) for item, value in frame[column].items()}
+                for column in frame.columns
+            }
+        fixtures[symbol.upper()] = {"info": ticker.info, "news": ticker.news, **statements}
+    with open(path, "w") as f:
+        json.dump(fixtures, f, default=str)
+    return fixtures
+
+
+def scripted_answer(role, symbol="the company"):
+    """Canned final answer for a CrewAI agent role, in the ReAct format the agents parse."""
+    if "Advisor" in role:
+        body = (
+            f"Recommendation: Buy\nTarget Price: $120 - $140\nTime Horizon: Long-term\nRisk Level: Medium\n"
+            f"{symbol} shows steady growth.\n"
+            '```json\n{"action": "Buy", "target_price_low": 120, "target_price_high": 140, '
+            '"time_horizon": "long-term", "risk_level": "medium"}\n```'
+        )
+    elif "Analyst" in role:
+        body = f"{symbol} is financially healthy with stable margins and moderate valuation."
+    else:
+        body = f"Collected price, profile, statements and news for {symbol}."
+    return f"Thought: I now know the final answer\nFinal Answer: {body}"
+
+
+def scripted_chat_model(latency=None, tokens=(800, 200)):
+    """Build a chat model that answers every agent immediately with `scripted_answer`.
+
+    The langchain import is deferred so the rest of this module works without it.
+    """
+    from typing import Any
+
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class ScriptedChatModel(BaseChatModel):
+        latency: Any = None
+        prompt_tokens: int = 800
+        completion_tokens: int = 200
+
+        @property
+        def _llm_type(self):
+            return "scripted"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            prompt = "\n".join(str(message.content) for message in messages)
+            role = next((r for r in ("Investment Advisor", "Financial Analyst", "Financial Data Collector") if r in prompt), "")
+            if self.latency is not None:
+                self.latency.wait()
+            message = AIMessage(content=scripted_answer(role))
+            return ChatResult(
+                generations=[ChatGeneration(message=message)],
+                llm_output={"token_usage": {
+                    "prompt_tokens": self.prompt_tokens,
+                    "completion_tokens": self.completion_tokens,
+                    "total_tokens": self.prompt_tokens + self.completion_tokens,
+                }},
+            )
+
+    return ScriptedChatModel(latency=latency, prompt_tokens=tokens[0], completion_tokens=tokens[1])
+
+
+class FakeSearch:
+    """Drop-in for `DuckDuckGoSearchRun` with fixed latency and canned results."""
+
+    def __init__(self, latency=None):
+        self.latency = latency or Latency()
+        self.calls = 0
+
+    def run(self, query):
+        self.calls += 1
+        self.latency.wait()
+        return f"Benchmark search results for '{query}'."
@@ -0,0 +1,93 @@
+# server/benchmarks/load_test.py
+"""Closed-loop HTTP load generator for comparing serving modes.
+
+Example - dev server vs gunicorn against the same MongoDB/yfinance:
+
+    python app.py                                   # terminal 1
+    python benchmarks/load_test.py --token $TOKEN   # terminal 2
+    gunicorn -c gunicorn.conf.py wsgi:app           # then re-run the benchmark
+
+benchmarks/serve_offline.py serves the app with offline fakes instead of live
+MongoDB and yfinance.
+"""
+import argparse
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(base_url, paths, token, concurrency, duration):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(offset):
+        nonlocal errors
+        i = offset
+        while time.monotonic() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            req = urllib.request.Request(base_url + path)
+            if token:
+                req.add_header('Authorization', f'Bearer {token}')
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=60) as resp:
+                    resp.read()
+                ok = True
+            except (urllib.error.URLError, TimeoutError):
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors += 1
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--path', action='append', dest='paths',
+                        help='Path to request (repeatable), default: /api/portfolio and /api/watchlist')
+    parser.add_argument('--token', help='JWT for the authenticated routes')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+    args = parser.parse_args()
+
+    paths = args.paths or ['/api/portfolio', '/api/watchlist']
+    result = run(args.base_url.rstrip('/'), paths, args.token, args.concurrency, args.duration)
+    for key, value in result.items():
+        print(f"{key:>15}: {value:.2f}" if isinstance(value, float) else f"{key:>15}: {value}")
+
+
+if __name__ == '__main__':
+    main()
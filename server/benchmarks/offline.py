@@ -0,0 +1,345 @@
+# server/benchmarks/offline.py
+"""Offline scenario benchmarks for the API, with fakes for yfinance, MongoDB and the LLM.
+
+The app is driven in-process through Flask's test client, so results reflect
+the server code rather than the network. yfinance is replaced by a replay /
+synthetic responder with configurable latency, MongoDB by mongomock (or a
+throwaway database on a local server with --mongo-uri), and the CrewAI
+agents by a scripted chat model.
+
+    python benchmarks/offline.py                                  # all scenarios
+    python benchmarks/offline.py --scenario portfolio --positions 200
+    python benchmarks/offline.py --save-baseline                  # record benchmarks/baseline.json
+    python benchmarks/offline.py --baseline benchmarks/baseline.json --tolerance 0.2   # exit 1 on regression
+
+Record a replay file from live Yahoo (needs network) with
+    python benchmarks/offline.py --record-fixtures AAPL MSFT --fixtures benchmarks/yfinance_fixtures.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, SERVER_DIR)
+
+from fakes import FakeSearch, FakeYFinance, Latency, record_fixtures, scripted_chat_model  # noqa: E402
+from load_test import percentile  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+BENCH_PASSWORD = 'benchmark-password'
+# Compared against the baseline: (metric, True if higher is better)
+GATED_METRICS = (("throughput_rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False))
+
+
+def configure_environment(args):
+    """Server settings for an isolated run; anything already set in the environment wins."""
+    os.environ.setdefault('MARKET_REFRESHER_ENABLED', '0')
+    os.environ.setdefault('SYMBOL_INDEX_REFRESH_HOURS', '0')
+    scratch = tempfile.mkdtemp(prefix='bench-')
+    os.environ.setdefault('ANALYSIS_JOBS_DB', os.path.join(scratch, 'jobs.sqlite3'))
+    os.environ.setdefault('PRICE_HISTORY_DIR', os.path.join(scratch, 'history'))
+    # The fakes are not rate limited, so don't let the client-side limiters dominate the numbers
+    os.environ.setdefault('YFINANCE_RATE_LIMIT', '100000')
+    os.environ.setdefault('YFINANCE_BURST', '100000')
+    os.environ.setdefault('SEARCH_RATE_LIMIT', '100000')
+    os.environ.setdefault('SEARCH_BURST', '100000')
+    os.environ.setdefault('QUOTE_PRICE_TTL', str(args.quote_ttl))
+
+
+def connect_database(mongo_uri):
+    """Point the server's lazy MongoDB handle at mongomock or a scratch database; returns a cleanup function."""
+    import extensions
+    from db import ensure_indexes
+
+    if mongo_uri:
+        from db import create_client
+        client = create_client(mongo_uri)
+        name = f"investment_advisor_bench_{os.getpid()}"
+        cleanup = lambda: client.drop_database(name)  # noqa: E731
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("mongomock is not installed: pip install -r requirements-dev.txt, or pass --mongo-uri for a local MongoDB")
+        client = mongomock.MongoClient()
+        name = "investment_advisor_bench"
+        cleanup = lambda: None  # noqa: E731
+
+    extensions._client = client
+    extensions._db = client[name]
+    ensure_indexes(extensions._db)
+    return cleanup
+
+
+def seed(db, users, positions, watchlist_size):
+    from werkzeug.security import generate_password_hash
+
+    from extensions import password_hasher
+
+    # Hash once, with the server's parameters so logins don't upgrade it: seeding shouldn't take longer than the benchmark
+    password = generate_password_hash(BENCH_PASSWORD, method=password_hasher.method)
+    now = datetime.now()
+    db.users.insert_many([
+        {"name": f"Bench {i}", "email": f"bench{i}@example.com", "password": password, "created_at": now}
+        for i in range(users)
+    ])
+    db.portfolios.insert_one({
+        "user_email": "bench0@example.com",
+        "stocks": [
+            {"symbol": f"P{i:04d}", "shares": 10 + i % 7, "purchase_price": 50.0 + i % 100}
+            for i in range(positions)
+        ],
+    })
+    db.watchlists.insert_one({
+        "user_email": "bench0@example.com",
+        "stocks": [f"W{i:04d}" for i in range(watchlist_size)],
+    })
+
+
+def run_scenario(app, make_request, concurrency, duration=None, total=None):
+    """Closed loop: `concurrency` clients issue requests until `duration` passes or `total` are done."""
+    latencies = []
+    errors = 0
+    issued = 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration if duration else None
+
+    def worker():
+        nonlocal errors, issued
+        client = app.test_client()
+        while True:
+            with lock:
+                if (total is not None and issued >= total) or (deadline and time.monotonic() >= deadline):
+                    return
+                i = issued
+                issued += 1
+            start = time.perf_counter()
+            response = make_request(client, i)
+            response.get_data()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    errors += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def login_storm(app, args, token):
+    def request(client, i):
+        return client.post('/api/auth/login', json={
+            "email": f"bench{i % args.users}@example.com", "password": BENCH_PASSWORD
+        })
+    return run_scenario(app, request, args.concurrency, duration=args.duration)
+
+
+def portfolio(app, args, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    return run_scenario(app, lambda client, i: client.get('/api/portfolio', headers=headers),
+                        args.concurrency, duration=args.duration)
+
+
+def portfolio_during_logins(app, args, token):
+    """Portfolio latency while half as many clients run a login storm on the same worker."""
+    stop = threading.Event()
+
+    def storm(offset):
+        client = app.test_client()
+        i = offset
+        while not stop.is_set():
+            client.post('/api/auth/login', json={
+                "email": f"bench{i % args.users}@example.com", "password": BENCH_PASSWORD
+            })
+            i += 1
+
+    stormers = [threading.Thread(target=storm, args=(n,)) for n in range(max(1, args.concurrency // 2))]
+    for t in stormers:
+        t.start()
+    try:
+        return portfolio(app, args, token)
+    finally:
+        stop.set()
+        for t in stormers:
+            t.join()
+
+
+def watchlist(app, args, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    return run_scenario(app, lambda client, i: client.get('/api/watchlist', headers=headers),
+                        args.concurrency, duration=args.duration)
+
+
+def dashboard_polling(app, args, token):
+    """Clients polling /api/dashboard with the version they last saw, as the Dashboard page does."""
+    headers = {"Authorization": f"Bearer {token}"}
+    versions = {}
+
+    def request(client, i):
+        since = versions.get(id(client))
+        response = client.get('/api/dashboard', query_string={"since": since} if since else None, headers=headers)
+        if response.status_code == 200:
+            versions[id(client)] = response.get_json()["version"]
+        return response
+    return run_scenario(app, request, args.concurrency, duration=args.duration)
+
+
+def history(app, args, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    symbols = [f"H{i:03d}" for i in range(args.history_symbols)]
+    # Measure chart loads from the local store; the first full download per symbol happens here
+    client = app.test_client()
+    for i in range(0, len(symbols), 20):
+        client.get(f'/api/history?symbols={",".join(symbols[i:i + 20])}&points=3', headers=headers)
+
+    def request(client, i):
+        if i % 4 == 3:
+            # A comparison chart of several symbols
+            group = ",".join(symbols[(i + j) % len(symbols)] for j in range(4))
+            return client.get(f'/api/history?symbols={group}&range=5y&points=600', headers=headers)
+        return client.get(f'/api/history/{symbols[i % len(symbols)]}?range=10y&points=800', headers=headers)
+    return run_scenario(app, request, args.concurrency, duration=args.duration)
+
+
+def analyze(app, args, token):
+    import analysis
+    from agent_pool import AgentPool
+
+    # Scripted agents and search; everything else (prefetch, pool, parsing, storage) is the real code
+    chat_model = scripted_chat_model(Latency(args.llm_latency, args.llm_latency / 4))
+    analysis.agent_pool = AgentPool(lambda: analysis.create_agents(llm=chat_model),
+                                    max_size=analysis.agent_pool.stats()["max_size"], reset=analysis.clear_agent_callbacks)
+    analysis.search_runner = FakeSearch(Latency(args.upstream_latency))
+
+    symbols = [f"A{i:03d}" for i in range(args.analyze_symbols)]
+    headers = {"Authorization": f"Bearer {token}"}
+    return run_scenario(app, lambda client, i: client.get(f'/api/analyze/{symbols[i % len(symbols)]}?refresh=1', headers=headers),
+                        args.concurrency, total=args.analyze_requests)
+
+
+SCENARIOS = {
+    "login_storm": login_storm,
+    "portfolio": portfolio,
+    "portfolio_during_logins": portfolio_during_logins,
+    "watchlist": watchlist,
+    "dashboard_polling": dashboard_polling,
+    "history": history,
+    "analyze": analyze,
+}
+
+
+def compare(results, baseline, tolerance):
+    """Regressions beyond `tolerance` (a fraction) for every scenario present in both runs."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        for metric, higher_is_better in GATED_METRICS:
+            old, new = reference.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{name}.{metric}: {old:.2f} -> {new:.2f} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append', dest='scenarios')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per timed scenario')
+    parser.add_argument('--users', type=int, default=50, help='Seeded users for the login storm')
+    parser.add_argument('--positions', type=int, default=100, help='Positions in the benchmark portfolio')
+    parser.add_argument('--watchlist-size', type=int, default=200)
+    parser.add_argument('--history-symbols', type=int, default=50, help='Symbols charted by the history scenario')
+    parser.add_argument('--analyze-symbols', type=int, default=8)
+    parser.add_argument('--analyze-requests', type=int, default=32)
+    parser.add_argument('--upstream-latency', type=float, default=0.05, help='Seconds per fake yfinance/search call')
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='Seconds per scripted LLM call')
+    parser.add_argument('--quote-ttl', type=float, default=30, help='QUOTE_PRICE_TTL for the run')
+    parser.add_argument('--fixtures', help='yfinance replay file (default: synthetic data)')
+    parser.add_argument('--record-fixtures', nargs='+', metavar='SYMBOL', help='Record live payloads to --fixtures and exit')
+    parser.add_argument('--mongo-uri', help='Use a scratch database on this MongoDB instead of mongomock')
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, help='Write results as the new baseline')
+    parser.add_argument('--baseline', help='Compare against this baseline and exit 1 on regression')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative regression (0.15 = 15%%)')
+    args = parser.parse_args()
+
+    if args.record_fixtures:
+        if not args.fixtures:
+            parser.error('--record-fixtures needs --fixtures PATH')
+        record_fixtures(args.record_fixtures, args.fixtures)
+        print(f"Recorded {len(args.record_fixtures)} symbols to {args.fixtures}")
+        return
+
+    configure_environment(args)
+    latency = Latency(args.upstream_latency, args.upstream_latency / 4)
+    yahoo = FakeYFinance.from_file(args.fixtures, latency) if args.fixtures else FakeYFinance(latency=latency)
+    yahoo.install()
+
+    import extensions
+    from app import create_app, shutdown_background_workers
+
+    cleanup = connect_database(args.mongo_uri)
+    app = create_app()
+    seed(extensions.get_db(), args.users, args.positions, args.watchlist_size)
+    with app.app_context():
+        from flask_jwt_extended import create_access_token
+        token = create_access_token(identity="bench0@example.com")
+
+    results = {}
+    try:
+        for name in args.scenarios or list(SCENARIOS):
+            result = SCENARIOS[name](app, args, token)
+            results[name] = result
+            print(f"{name}:")
+            for key, value in result.items():
+                print(f"{key:>15}: {value:.2f}" if isinstance(value, float) else f"{key:>15}: {value}")
+    finally:
+        cleanup()
+        shutdown_background_workers()
+
+    for path in filter(None, (args.json, args.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Wrote {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# server/benchmarks/serve_offline.py
+"""Serve the API over HTTP with the offline fakes, as a target for load_test.py.
+
+Uses the same fakes as offline.py (synthetic yfinance with latency, mongomock)
+and seeds one user, bench0@example.com, with a portfolio and a watchlist. Each
+process seeds its own in-memory database, so several gunicorn workers all see
+the same data.
+
+    python benchmarks/serve_offline.py --token                    # print a JWT for load_test.py
+    python benchmarks/serve_offline.py                            # dev server (threaded)
+    python benchmarks/serve_offline.py --no-threads               # dev server, one request at a time
+    gunicorn -c gunicorn.conf.py --pythonpath benchmarks serve_offline:app
+
+Settings come from the environment so they also apply under gunicorn:
+BENCH_UPSTREAM_LATENCY (seconds per fake yfinance call, default 0.05),
+BENCH_POSITIONS and BENCH_WATCHLIST_SIZE (default 20 each), and the usual
+server variables such as QUOTE_PRICE_TTL.
+"""
+import argparse
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import FakeYFinance, Latency  # noqa: E402
+from offline import configure_environment, connect_database, seed  # noqa: E402
+
+configure_environment(argparse.Namespace(quote_ttl=30))
+latency = float(os.environ.get('BENCH_UPSTREAM_LATENCY', 0.05))
+FakeYFinance(latency=Latency(latency, latency / 4)).install()
+
+import extensions  # noqa: E402
+from app import create_app  # noqa: E402
+
+connect_database(None)
+app = create_app()
+seed(extensions.get_db(), 1, int(os.environ.get('BENCH_POSITIONS', 20)), int(os.environ.get('BENCH_WATCHLIST_SIZE', 20)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--token', action='store_true', help='Print a JWT for the seeded user and exit')
+    parser.add_argument('--no-threads', action='store_true', help='Run the dev server single-threaded')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    args = parser.parse_args()
+
+    if args.token:
+        from flask_jwt_extended import create_access_token
+        with app.app_context():
+            print(create_access_token(identity="bench0@example.com"))
+        return
+    app.run(host='127.0.0.1', port=args.port, threaded=not args.no_threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# server/benchmarks/startup.py
+"""Cold-start cost of a worker: import + create_app() time and peak RSS.
+
+Each sample runs in a fresh interpreter, so nothing is warm from a previous
+run. The "analysis" scenario additionally imports the crew/LLM stack, which
+is what an analysis-serving worker pays on its first analysis (or at start
+with PRELOAD_ANALYSIS=1).
+
+    python benchmarks/startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('pymongo', 'numpy', 'pandas', 'yfinance', 'crewai', 'langchain_community', 'langchain_openai')
+
+PROBE = '''
+import json, resource, sys, time
+started = time.perf_counter()
+from app import create_app
+create_app()
+app_ready = time.perf_counter()
+if {load_analysis}:
+    import analysis
+finished = time.perf_counter()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "create_app_ms": (app_ready - started) * 1000,
+    "total_ms": (finished - started) * 1000,
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    "max_rss_mb": rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024,
+    "loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+'''
+
+SCENARIOS = {
+    "app": False,
+    "app+analysis": True,
+}
+
+
+def sample(load_analysis):
+    env = {
+        **os.environ,
+        # Nothing in the measurement should touch the network or MongoDB
+        "MARKET_REFRESHER_ENABLED": "0",
+        "PRELOAD_ANALYSIS": "0",
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+    code = PROBE.format(load_analysis=load_analysis, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=SERVER_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per scenario')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append', dest='scenarios')
+    args = parser.parse_args()
+
+    for name in args.scenarios or list(SCENARIOS):
+        samples = [sample(SCENARIOS[name]) for _ in range(args.runs)]
+        print(f"{name}:")
+        for key in ("create_app_ms", "total_ms", "max_rss_mb"):
+            values = [s[key] for s in samples]
+            print(f"{key:>15}: median {statistics.median(values):.1f}  min {min(values):.1f}  max {max(values):.1f}")
+        print(f"{'loaded':>15}: {', '.join(samples[-1]['loaded']) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
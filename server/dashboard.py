@@ -0,0 +1,69 @@
+# server/dashboard.py
+import threading
+from collections import OrderedDict
+
+from responses import dumps, etag_for
+
+
+def row_hashes(rows, key="symbol"):
+    """`(order, {key: hash})` for a list of rows, used to tell which rows changed between versions."""
+    return tuple(row[key] for row in rows), {row[key]: etag_for(dumps(row)) for row in rows}
+
+
+def row_delta(previous, current, rows, key="symbol"):
+    """Rows changed or added since `previous`, keys removed, and the new order if it was rearranged."""
+    old_order, old_hashes = previous
+    order, hashes = current
+    delta = {
+        "changed": [row for row in rows if old_hashes.get(row[key]) != hashes[row[key]]],
+        "removed": [k for k in old_order if k not in hashes],
+    }
+    # Clients drop removed rows and append new ones; the full order is only sent if that isn't enough
+    expected = tuple(k for k in old_order if k in hashes) + tuple(k for k in order if k not in old_hashes)
+    if order != expected:
+        delta["order"] = list(order)
+    return delta
+
+
+class DashboardSnapshots:
+    """The last few dashboard versions served to each user, as per-row hashes.
+
+    A client that sends the version it already has (`since=`) gets only the
+    rows that changed. Versions are per process, so a client whose version
+    is unknown here (evicted, or served by another worker) gets the full
+    dashboard instead.
+    """
+
+    def __init__(self, versions_per_user=4, max_users=5000):
+        self._versions_per_user = versions_per_user
+        self._max_users = max_users
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self.deltas = 0
+        self.full = 0
+
+    def remember(self, user, version, sections):
+        with self._lock:
+            versions = self._users.setdefault(user, OrderedDict())
+            self._users.move_to_end(user)
+            versions[version] = sections
+            versions.move_to_end(version)
+            while len(versions) > self._versions_per_user:
+                versions.popitem(last=False)
+            while len(self._users) > self._max_users:
+                self._users.popitem(last=False)
+
+    def get(self, user, version):
+        with self._lock:
+            return (self._users.get(user) or {}).get(version)
+
+    def served(self, delta):
+        with self._lock:
+            if delta:
+                self.deltas += 1
+            else:
+                self.full += 1
+
+    def stats(self):
+        with self._lock:
+            return {"users": len(self._users), "deltas": self.deltas, "full": self.full}
@@ -0,0 +1,194 @@
+# server/db.py
+import os
+import socket
+import time
+
+from pymongo import ASCENDING, IndexModel, MongoClient, monitoring
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+# Indexes every deployment needs, by collection
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+    ],
+    "portfolios": [
+        IndexModel([("user_email", ASCENDING)], unique=True, name="user_email_unique"),
+    ],
+    "watchlists": [
+        IndexModel([("user_email", ASCENDING)], unique=True, name="user_email_unique"),
+    ],
+    "analyses": [
+        IndexModel([("symbol", ASCENDING), ("analysis_date", ASCENDING)], unique=True, name="symbol_date_unique"),
+    ],
+    "fundamentals": [
+        IndexModel([("symbol", ASCENDING)], unique=True, name="symbol_unique"),
+    ],
+}
+
+
+def mongo_client_options():
+    """MongoClient pool, timeout and read-preference settings from the environment."""
+    options = {
+        "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', 100)),
+        "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', 0)),
+        "maxIdleTimeMS": int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 60000)),
+        "connectTimeoutMS": int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+        "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        "waitQueueTimeoutMS": int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000)),
+        "readPreference": os.environ.get('MONGO_READ_PREFERENCE', 'primary'),
+        "retryWrites": os.environ.get('MONGO_RETRY_WRITES', '1') == '1',
+    }
+    if os.environ.get('MONGO_SOCKET_TIMEOUT_MS'):
+        options["socketTimeoutMS"] = int(os.environ['MONGO_SOCKET_TIMEOUT_MS'])
+    return options
+
+
+class CommandTimer(monitoring.CommandListener):
+    """Reports every MongoDB command's duration to `observer(upstream, operation, seconds, outcome)`."""
+
+    def __init__(self, observer):
+        self._observer = observer
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._observer("mongodb", event.command_name, event.duration_micros / 1e6, "ok")
+
+    def failed(self, event):
+        self._observer("mongodb", event.command_name, event.duration_micros / 1e6, "error")
+
+
+def create_client(uri, event_listeners=None):
+    return MongoClient(uri, event_listeners=event_listeners or [], **mongo_client_options())
+
+
+def supports_transactions(db):
+    """True on a replica set or sharded cluster; standalone servers can't run multi-document transactions."""
+    try:
+        hello = db.command("hello")
+    except Exception:
+        return False
+    return bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+
+
+def create_user_documents(db, user, owned, use_transaction=True):
+    """Insert a new user together with the documents it owns.
+
+    `owned` maps collection name -> document keyed by `user_email`; those are
+    upserted, so one left behind by an earlier failed registration is
+    adopted rather than colliding. Runs as one transaction when
+    `use_transaction`, otherwise as sequential writes that remove the user
+    again if a later write fails. A duplicate email raises DuplicateKeyError
+    either way.
+    """
+    def write_owned(session=None):
+        for collection_name, document in owned.items():
+            fields = {key: value for key, value in document.items() if key != "user_email"}
+            db[collection_name].update_one(
+                {"user_email": document["user_email"]}, {"$setOnInsert": fields}, upsert=True, session=session
+            )
+
+    if use_transaction:
+        def write(session):
+            db.users.insert_one(user, session=session)
+            write_owned(session)
+
+        with db.client.start_session() as session:
+            session.with_transaction(write)
+        return
+
+    inserted = False
+    try:
+        db.users.insert_one(user)
+        inserted = True
+        write_owned()
+    except Exception:
+        # Any failure after the user was written (including a duplicate key on an owned
+        # document) removes it again, so no user is left without its portfolio/watchlist
+        if inserted:
+            db.users.delete_one({"_id": user["_id"]})
+        raise
+
+
+def ensure_indexes(db):
+    """Create any missing indexes; returns `{collection: [index names]}`.
+
+    Index creation is idempotent. A unique index that cannot be built
+    because of existing duplicates is reported and skipped so the server
+    still starts.
+    """
+    created = {}
+    for collection_name, models in INDEXES.items():
+        try:
+            created[collection_name] = db[collection_name].create_indexes(models)
+        except OperationFailure as e:
+            print(f"Could not create indexes on {collection_name}: {e}")
+            created[collection_name] = []
+    return created
+
+
+class Lease:
+    """A named lease in `collection`, held by at most one process at a time.
+
+    `acquire()` takes the lease when it is free or has lapsed, and extends
+    it when this process already holds it; the holder must call it again
+    within `ttl` seconds to keep it. A process that dies simply lets its
+    lease lapse, so another one takes over after at most `ttl` seconds.
+    """
+
+    def __init__(self, collection, name, ttl=60):
+        self._collection = collection
+        self.name = name
+        self.ttl = ttl
+
+    @property
+    def owner(self):
+        # Evaluated on use, so forked workers never share an identity
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def acquire(self):
+        """True if this process now holds the lease."""
+        now = time.time()
+        try:
+            self._collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + self.ttl}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Held by another live process (the upsert collided with its document)
+            return False
+        return True
+
+    def release(self):
+        self._collection.delete_one({"_id": self.name, "owner": self.owner})
+
+    def holder(self):
+        lease = self._collection.find_one({"_id": self.name})
+        if lease is None or lease["expires_at"] < time.time():
+            return None
+        return lease["owner"]
+
+
+def index_usage_stats(db):
+    """Per-index access counters from `$indexStats`, by collection."""
+    stats = {}
+    for collection_name in INDEXES:
+        stats[collection_name] = [
+            {
+                "name": entry["name"],
+                "key": dict(entry["key"]),
+                "ops": entry["accesses"]["ops"],
+                "since": entry["accesses"]["since"].isoformat(),
+            }
+            for entry in db[collection_name].aggregate([{"$indexStats": {}}])
+        ]
+    return stats
+
+
+if __name__ == '__main__':
+    # python db.py - bootstrap indexes without starting the server
+    client = create_client(os.environ.get('MONGO_URI', 'mongodb://localhost:27017/'))
+    for name, indexes in ensure_indexes(client.investment_advisor_db).items():
+        print(f"{name}: {', '.join(indexes) or 'failed'}")
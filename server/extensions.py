@@ -0,0 +1,214 @@
+# server/extensions.py
+"""Process-wide clients, caches and background workers shared by the route modules.
+
+Everything here is cheap to construct: the MongoDB client is only created
+on first use, and nothing imports yfinance, pandas or the LLM stack until a
+request actually needs them. The analysis pipeline lives in `analysis` and
+is imported on demand.
+"""
+import os
+import threading
+from datetime import timedelta
+
+from flask import request
+from flask_jwt_extended import JWTManager
+from pymongo.errors import PyMongoError
+
+from analysis_jobs import AnalysisJobManager, JobStore
+from db import CommandTimer, Lease, create_client, ensure_indexes, supports_transactions
+from fundamentals_store import FundamentalsStore
+from market_refresher import MarketRefresher, symbol_universe
+from metrics import observe_upstream, span
+from ohlcv_store import OHLCVStore
+from password_hasher import PasswordHasher
+from price_stream import PriceHub
+from quote_cache import QuoteCache, SharedQuotes
+from resilience import TokenBucket, UpstreamGuard
+from symbol_index import SymbolIndex
+
+jwt = JWTManager()
+
+# MongoDB setup - the client is created (and indexes bootstrapped) on first use
+mongo_uri = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
+_client = None
+_db = None
+_db_lock = threading.Lock()
+
+
+def get_db():
+    global _client, _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _client = create_client(mongo_uri, event_listeners=[CommandTimer(observe_upstream)])
+                database = _client.investment_advisor_db
+                # Make sure lookup/uniqueness indexes exist before serving traffic
+                if os.environ.get('MONGO_ENSURE_INDEXES', '1') == '1':
+                    try:
+                        ensure_indexes(database)
+                    except PyMongoError as e:
+                        print(f"Index bootstrap failed, continuing without it: {e}")
+                _db = database
+    return _db
+
+
+def close_db():
+    global _client, _db
+    with _db_lock:
+        if _client is not None:
+            _client.close()
+        _client = _db = None
+
+
+_transactions = None
+
+
+def transactions_supported():
+    """Whether the connected deployment runs multi-document transactions (checked once)."""
+    global _transactions
+    if _transactions is None:
+        _transactions = os.environ.get('MONGO_TRANSACTIONS', '1') == '1' and supports_transactions(get_db())
+    return _transactions
+
+
+class LazyCollection:
+    """Stand-in for a pymongo collection that connects on the first operation."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_db()[self.name], attr)
+
+
+users_collection = LazyCollection("users")
+portfolios_collection = LazyCollection("portfolios")
+watchlists_collection = LazyCollection("watchlists")
+analyses_collection = LazyCollection("analyses")
+fundamentals_collection = LazyCollection("fundamentals")
+quotes_collection = LazyCollection("quotes")
+leases_collection = LazyCollection("leases")
+
+# Password hashing runs in its own processes so login bursts don't starve the request threads
+password_hasher = PasswordHasher(
+    method=os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000'),
+    max_workers=int(os.environ.get('PASSWORD_HASH_WORKERS', 2)),
+    max_pending=int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 16)),
+    queue_timeout=float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2.0))
+)
+
+# Every external data call goes through a per-provider guard (rate limit, retries, circuit breaker)
+yahoo_upstream = UpstreamGuard(
+    "yfinance",
+    rate=float(os.environ.get('YFINANCE_RATE_LIMIT', 10)),
+    capacity=float(os.environ.get('YFINANCE_BURST', 20)),
+    max_retries=int(os.environ.get('YFINANCE_MAX_RETRIES', 2)),
+    observer=observe_upstream
+)
+search_upstream = UpstreamGuard(
+    "duckduckgo",
+    rate=float(os.environ.get('SEARCH_RATE_LIMIT', 1)),
+    capacity=float(os.environ.get('SEARCH_BURST', 3)),
+    max_retries=int(os.environ.get('SEARCH_MAX_RETRIES', 2)),
+    observer=observe_upstream
+)
+
+
+def fetch_ticker_info(symbol):
+    import yfinance as yf
+
+    def info():
+        return yf.Ticker(symbol).info
+
+    with span("quote", symbol):
+        return yahoo_upstream.call(info)
+
+
+# Shared quote/info cache - every yf.Ticker(...).info lookup goes through this
+quote_cache = QuoteCache(
+    fetcher=fetch_ticker_info,
+    max_size=int(os.environ.get('QUOTE_CACHE_SIZE', 2000)),
+    ttls={
+        "price": float(os.environ.get('QUOTE_PRICE_TTL', 30)),
+        "profile": float(os.environ.get('QUOTE_PROFILE_TTL', 86400)),
+    },
+    max_workers=int(os.environ.get('QUOTE_FETCH_WORKERS', 16)),
+    # Every worker and host reads the quotes the others (and the refresher) fetched
+    shared=SharedQuotes(quotes_collection) if os.environ.get('SHARED_QUOTES', '1') == '1' else None
+)
+# Upper bound on how long a portfolio/watchlist request waits for quotes
+QUOTE_REQUEST_DEADLINE = float(os.environ.get('QUOTE_REQUEST_DEADLINE', 3.0))
+
+# Background refresher keeping every watched/held symbol warm in the shared quote store,
+# so the portfolio and watchlist handlers are served without upstream calls. Only the
+# process holding the lease refreshes, so UPSTREAM_REFRESH_RATE is the budget for the
+# whole deployment. Keep the open-market interval below QUOTE_PRICE_TTL so entries
+# never expire between cycles.
+market_refresher = MarketRefresher(
+    universe=lambda: symbol_universe(watchlists_collection, portfolios_collection),
+    refresh=quote_cache.refresh,
+    budget=TokenBucket(rate=float(os.environ.get('UPSTREAM_REFRESH_RATE', 5))),
+    ages=quote_cache.ages,
+    max_age=float(os.environ.get('QUOTE_PRICE_TTL', 30)),
+    open_interval=float(os.environ.get('MARKET_REFRESH_OPEN_INTERVAL', 20)),
+    closed_interval=float(os.environ.get('MARKET_REFRESH_CLOSED_INTERVAL', 900)),
+    lease=Lease(leases_collection, "market_refresher", ttl=float(os.environ.get('MARKET_REFRESH_LEASE_SECONDS', 60)))
+)
+
+# Local store of statements, profiles and news, refreshed incrementally from yfinance
+fundamentals_store = FundamentalsStore(
+    fundamentals_collection,
+    profile_fetcher=lambda symbol: quote_cache.get(symbol, "profile"),
+    statement_interval=timedelta(hours=float(os.environ.get('FUNDAMENTALS_REFRESH_HOURS', 24))),
+    profile_interval=timedelta(hours=float(os.environ.get('PROFILE_REFRESH_HOURS', 24))),
+    news_interval=timedelta(minutes=float(os.environ.get('NEWS_REFRESH_MINUTES', 15))),
+    upstream=yahoo_upstream
+)
+
+# Listed symbols and company names for validation and autocomplete, from the bundled
+# snapshot until a background refresh from the Nasdaq Trader directory has been saved
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+symbol_index = SymbolIndex(
+    snapshot_path=os.path.join(SERVER_DIR, 'data', 'symbols.csv'),
+    cache_path=os.environ.get('SYMBOL_INDEX_CACHE', os.path.join(SERVER_DIR, 'data', 'symbols.refreshed.csv'))
+)
+
+# Daily OHLCV history for charts, kept as columnar files and extended with only the new bars
+ohlcv_store = OHLCVStore(
+    directory=os.environ.get('PRICE_HISTORY_DIR', os.path.join(SERVER_DIR, 'data', 'history')),
+    refresh_interval=float(os.environ.get('PRICE_HISTORY_REFRESH_MINUTES', 60)) * 60,
+    max_cached=int(os.environ.get('PRICE_HISTORY_CACHE_SIZE', 256)),
+    upstream=yahoo_upstream
+)
+
+# Real-time price stream
+price_hub = PriceHub(
+    fetch_many=lambda symbols, deadline: quote_cache.get_many(symbols, "price", deadline=deadline),
+    interval=float(os.environ.get('PRICE_STREAM_INTERVAL', 15)),
+    # Under gunicorn.conf.py each open stream holds a worker thread, so these stay well below
+    # GUNICORN_THREADS; gunicorn_stream.conf.py raises them for its gevent workers
+    max_subscribers=int(os.environ.get('PRICE_STREAM_MAX_CONNECTIONS', 4)),
+    max_per_owner=int(os.environ.get('PRICE_STREAM_MAX_PER_USER', 2))
+)
+
+
+@jwt.token_verification_loader
+def check_token_scope(jwt_header, jwt_data):
+    # Scoped tokens (e.g. for a price stream, which travel in URLs) only work on the endpoint they were issued for
+    scope = jwt_data.get("scope")
+    return scope is None or scope == request.endpoint
+
+
+def run_analysis_job(symbol, emit=None):
+    # The crew stack is only loaded once a job actually runs
+    from analysis import get_or_run_analysis
+    return get_or_run_analysis(symbol, emit)
+
+
+analysis_jobs = AnalysisJobManager(
+    runner=run_analysis_job,
+    store=JobStore(os.environ.get('ANALYSIS_JOBS_DB', os.path.join(SERVER_DIR, 'analysis_jobs.sqlite3'))),
+    max_workers=int(os.environ.get('ANALYSIS_WORKERS', 2)),
+    max_pending=int(os.environ.get('ANALYSIS_MAX_PENDING', 20)),
+    retention=timedelta(hours=float(os.environ.get('ANALYSIS_JOB_RETENTION_HOURS', 72)))
+)
@@ -0,0 +1,90 @@
+# server/financials.py
+import math
+
+# Line items the financial analyst task actually uses (health, growth, profitability, valuation)
+INCOME_STATEMENT_ITEMS = (
+    "Total Revenue",
+    "Cost Of Revenue",
+    "Gross Profit",
+    "Research And Development",
+    "Operating Expense",
+    "Operating Income",
+    "EBITDA",
+    "Interest Expense",
+    "Pretax Income",
+    "Tax Provision",
+    "Net Income",
+    "Basic EPS",
+    "Diluted EPS",
+)
+
+BALANCE_SHEET_ITEMS = (
+    "Total Assets",
+    "Current Assets",
+    "Cash And Cash Equivalents",
+    "Total Liabilities Net Minority Interest",
+    "Current Liabilities",
+    "Total Debt",
+    "Net Debt",
+    "Working Capital",
+    "Stockholders Equity",
+    "Retained Earnings",
+    "Ordinary Shares Number",
+)
+
+# Rough size of a token in characters, good enough for budgeting prompt text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def format_number(value):
+    """Round a statement value to a short human-readable form (e.g. 383.29B)."""
+    if value is None:
+        return "-"
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if math.isnan(value):
+        return "-"
+    for scale, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if abs(value) >= scale:
+            return f"{value / scale:.2f}{suffix}"
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def compact_statement(statement, items, periods=4, token_budget=600):
+    """Encode a yfinance statement DataFrame as a small pipe-delimited table.
+
+    `statement` has line items as rows and period end dates as columns (the
+    layout of `Ticker.financials` / `Ticker.balance_sheet`). Only `items`
+    are kept, in that order, restricted to the `periods` most recent
+    columns. If the result exceeds `token_budget`, the oldest periods and
+    then the least important trailing items are dropped until it fits.
+    """
+    if statement is None or statement.empty:
+        return "No data available"
+
+    rows = [item for item in items if item in statement.index]
+    if not rows:
+        rows = list(statement.index[:len(items)])
+    columns = sorted(statement.columns, reverse=True)[:periods]
+
+    def render(rows, columns):
+        header = "Item | " + " | ".join(str(c)[:10] for c in columns)
+        lines = [header]
+        for item in rows:
+            lines.append(f"{item} | " + " | ".join(format_number(statement.at[item, c]) for c in columns))
+        return "\n".join(lines)
+
+    text = render(rows, columns)
+    while estimate_tokens(text) > token_budget and len(columns) > 1:
+        columns = columns[:-1]
+        text = render(rows, columns)
+    while estimate_tokens(text) > token_budget and len(rows) > 1:
+        rows = rows[:-1]
+        text = render(rows, columns)
+    return text
@@ -0,0 +1,125 @@
+# server/fundamentals_store.py
+import math
+from datetime import datetime, timedelta
+
+from quote_cache import SingleFlight
+
+STATEMENT_KINDS = {
+    "income_statement": lambda ticker: ticker.financials,
+    "balance_sheet": lambda ticker: ticker.balance_sheet,
+}
+
+
+def _clean(value):
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return value
+    return None if math.isnan(value) else value
+
+
+class FundamentalsStore:
+    """MongoDB-backed local copy of statements, company profiles and news per symbol.
+
+    One document per symbol holds every stored statement period, the last
+    profile payload and a rolling list of news articles. Data is served from
+    that document and only refreshed from yfinance once it is older than its
+    refresh interval; a refresh writes only the periods and articles that
+    were not stored yet. If an upstream refresh fails, the stored copy is
+    served as-is.
+    """
+
+    def __init__(self, collection, profile_fetcher, statement_interval=timedelta(hours=24),
+                 profile_interval=timedelta(hours=24), news_interval=timedelta(minutes=15), news_limit=50,
+                 upstream=None):
+        self._collection = collection
+        self._profile_fetcher = profile_fetcher
+        # Optional resilience.UpstreamGuard wrapping the yfinance calls
+        self._call = upstream.call if upstream else (lambda fn, *args: fn(*args))
+        self._intervals = {
+            "income_statement": statement_interval,
+            "balance_sheet": statement_interval,
+            "profile": profile_interval,
+            "news": news_interval,
+        }
+        self._news_limit = news_limit
+        self._flight = SingleFlight()
+
+    def get_statement(self, symbol, kind):
+        """Return the stored statement as a DataFrame (line items x period end dates)."""
+        import pandas as pd
+
+        doc = self._ensure_fresh(symbol.upper(), kind)
+        periods = (doc or {}).get(kind) or {}
+        return pd.DataFrame(periods)
+
+    def get_profile(self, symbol):
+        doc = self._ensure_fresh(symbol.upper(), "profile")
+        return (doc or {}).get("profile") or {}
+
+    def get_news(self, symbol, limit=10):
+        doc = self._ensure_fresh(symbol.upper(), "news")
+        return ((doc or {}).get("news") or [])[:limit]
+
+    def _ensure_fresh(self, symbol, kind):
+        doc = self._collection.find_one({"symbol": symbol})
+        refreshed_at = ((doc or {}).get("refreshed_at") or {}).get(kind)
+        if refreshed_at and datetime.now() - refreshed_at < self._intervals[kind]:
+            return doc
+
+        try:
+            self._flight.do((symbol, kind), lambda: self._refresh(symbol, kind, doc))
+        except Exception as e:
+            if doc is None or kind not in doc:
+                raise
+            print(f"Serving stored {kind} for {symbol}, refresh failed: {e}")
+            return doc
+        return self._collection.find_one({"symbol": symbol})
+
+    def _refresh(self, symbol, kind, doc):
+        # Only the analysis pipeline needs yfinance; keep it out of web worker startup
+        import yfinance as yf
+
+        updates = {f"refreshed_at.{kind}": datetime.now()}
+        push = None
+
+        if kind in STATEMENT_KINDS:
+            statement = self._call(STATEMENT_KINDS[kind], yf.Ticker(symbol))
+            stored_periods = set(((doc or {}).get(kind) or {}).keys())
+            for column in statement.columns:
+                period = str(column)[:10]
+                if period in stored_periods:
+                    continue
+                updates[f"{kind}.{period}"] = {
+                    str(item): _clean(value) for item, value in statement[column].items()
+                }
+        elif kind == "profile":
+            updates["profile"] = self._profile_fetcher(symbol)
+        elif kind == "news":
+            stored_links = {article.get("link") for article in (doc or {}).get("news") or []}
+            new_articles = [
+                {
+                    "title": article.get("title"),
+                    "publisher": article.get("publisher"),
+                    "link": article.get("link"),
+                    "publishedDate": datetime.fromtimestamp(article.get("providerPublishTime", 0)).strftime("%Y-%m-%d %H:%M:%S"),
+                    "type": article.get("type"),
+                    "relatedTickers": article.get("relatedTickers", []),
+                }
+                for article in self._call(lambda: yf.Ticker(symbol).news)
+                if article.get("link") not in stored_links
+            ]
+            if new_articles:
+                # Newest first, capped to a rolling window
+                push = {"news": {
+                    "$each": new_articles,
+                    "$sort": {"publishedDate": -1},
+                    "$slice": self._news_limit,
+                }}
+
+        update = {"$set": updates}
+        if push:
+            update["$push"] = push
+        self._collection.update_one({"symbol": symbol}, update, upsert=True)
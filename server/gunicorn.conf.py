@@ -0,0 +1,33 @@
+# server/gunicorn.conf.py
+# Production serving config: gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Threaded workers: each request gets its own thread, so a slow yfinance,
+# MongoDB or LLM call only blocks that request instead of the whole worker.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+# Long enough for a synchronous /api/analyze/<symbol> call; async jobs return immediately
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+# Time a stopping worker gets to drain in-flight analyses before it is killed
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 300))
+keepalive = 5
+
+# Load the app per worker so pools, caches and MongoDB clients are not shared across forks
+preload_app = False
+
+accesslog = '-'
+# Paths without query strings, which can carry stream tokens
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info')
+
+
+def worker_exit(server, worker):
+    from app import shutdown_background_workers
+    server.log.info("Draining in-flight analyses in worker %s", worker.pid)
+    shutdown_background_workers()
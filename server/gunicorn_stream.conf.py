@@ -0,0 +1,31 @@
+# server/gunicorn_stream.conf.py
+# Price stream server: gunicorn -c gunicorn_stream.conf.py wsgi:app
+# Route /api/stream/prices here and everything else to the gunicorn.conf.py server.
+import os
+
+bind = f"0.0.0.0:{os.environ.get('STREAM_PORT', 5001)}"
+
+# An open stream is an idle greenlet rather than a thread, so one process holds
+# thousands of them. One process also means one upstream poll per symbol per host.
+worker_class = 'gevent'
+workers = int(os.environ.get('STREAM_WORKERS', 1))
+worker_connections = int(os.environ.get('STREAM_WORKER_CONNECTIONS', 2000))
+
+# Read by extensions.price_hub in each worker; leave headroom below worker_connections
+os.environ.setdefault('PRICE_STREAM_MAX_CONNECTIONS', str(worker_connections - 100))
+os.environ.setdefault('PRICE_STREAM_MAX_PER_USER', '4')
+# Background refreshes and resumed analysis jobs belong to the main server
+os.environ.setdefault('MARKET_REFRESHER_ENABLED', '0')
+os.environ.setdefault('SYMBOL_INDEX_REFRESH_HOURS', '0')
+os.environ.setdefault('ANALYSIS_JOBS_RESUME', '0')
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+graceful_timeout = 10
+keepalive = 5
+preload_app = False
+
+accesslog = '-'
+# Paths without query strings, which carry stream tokens
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info')
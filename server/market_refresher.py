@@ -0,0 +1,174 @@
+# server/market_refresher.py
+import threading
+import time
+from datetime import datetime, time as dt_time
+from zoneinfo import ZoneInfo
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = dt_time(9, 30)
+MARKET_CLOSE = dt_time(16, 0)
+
+
+def market_is_open(now=None):
+    """Regular NYSE/Nasdaq session, weekdays 9:30-16:00 New York time (exchange holidays are not modelled)."""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def symbol_universe(watchlists_collection, portfolios_collection):
+    """Every symbol on any watchlist or portfolio, most popular first, as `[(symbol, holders)]`."""
+    counts = {}
+    for row in watchlists_collection.aggregate([
+        {"$unwind": "$stocks"},
+        {"$group": {"_id": "$stocks", "count": {"$sum": 1}}},
+    ]):
+        _count(counts, row)
+    for row in portfolios_collection.aggregate([
+        {"$unwind": "$stocks"},
+        {"$group": {"_id": "$stocks.symbol", "count": {"$sum": 1}}},
+    ]):
+        _count(counts, row)
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _count(counts, row):
+    # Symbols stored in different cases are the same symbol
+    if isinstance(row["_id"], str) and row["_id"]:
+        symbol = row["_id"].upper()
+        counts[symbol] = counts.get(symbol, 0) + row["count"]
+
+
+class MarketRefresher:
+    """Keeps quotes for the whole symbol universe warm in the background.
+
+    Each cycle re-reads the universe, then refreshes symbols through
+    `refresh(symbol)`, spending at most `budget` upstream calls per second.
+    Symbols go oldest first (`ages(symbols)` maps each to its age in
+    seconds, None if not cached), most popular first among equals, so when
+    the budget can't cover the whole universe in one cycle the symbols left
+    over go first in the next. Symbols whose copy will still be younger than
+    `max_age` when the next cycle starts are skipped. Cycles start every
+    `open_interval` seconds while the market is open and every
+    `closed_interval` seconds otherwise; a cycle that runs over simply
+    starts the next one late.
+
+    With a `lease` (see `db.Lease`) only the process holding it runs cycles,
+    so the universe is read and the budget spent once per deployment rather
+    than once per worker; the others retry the lease every `lease.ttl / 3`
+    seconds and take over when the holder stops or dies.
+    """
+
+    def __init__(self, universe, refresh, budget, ages=None, max_age=30, open_interval=20, closed_interval=900,
+                 lease=None):
+        self._universe = universe
+        self._refresh = refresh
+        self._budget = budget
+        self._ages = ages or (lambda symbols: {})
+        self._max_age = max_age
+        self._open_interval = open_interval
+        self._closed_interval = closed_interval
+        self._lease = lease
+        self._renewed_at = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.leader = lease is None
+        self.cycles = 0
+        self.refreshed = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_cycle = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="market-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "leader": self.leader,
+            "market_open": market_is_open(),
+            "cycles": self.cycles,
+            "refreshed": self.refreshed,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "last_cycle": self.last_cycle,
+        }
+
+    def _run(self):
+        next_cycle = 0.0
+        while not self._stop.is_set():
+            if not self._hold_lease(force=True):
+                self._stop.wait(self._lease.ttl / 3)
+                continue
+            if time.monotonic() >= next_cycle:
+                started = time.monotonic()
+                interval = self._open_interval if market_is_open() else self._closed_interval
+                try:
+                    self._cycle(deadline=started + interval, interval=interval)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Market refresh cycle failed: {e}")
+                next_cycle = started + interval
+            wait = next_cycle - time.monotonic()
+            if self._lease is not None:
+                wait = min(wait, self._lease.ttl / 3)
+            self._stop.wait(max(0.0, wait))
+        if self.leader and self._lease is not None:
+            try:
+                self._lease.release()
+            except Exception as e:
+                print(f"Could not release the market refresher lease: {e}")
+
+    def _hold_lease(self, force=False):
+        """Take or renew the lease (at most every ttl/3 seconds unless `force`); True while this process holds it."""
+        if self._lease is None:
+            return True
+        now = time.monotonic()
+        if force or self._renewed_at is None or now - self._renewed_at >= self._lease.ttl / 3:
+            try:
+                self.leader = self._lease.acquire()
+            except Exception as e:
+                print(f"Market refresher lease check failed: {e}")
+                self.leader = False
+            self._renewed_at = now
+        return self.leader
+
+    def _cycle(self, deadline, interval):
+        universe = self._universe()
+        ages = self._ages([symbol for symbol, _ in universe])
+        # Oldest first (stable, so popularity breaks ties); never-fetched symbols lead
+        queue = sorted(universe, key=lambda item: -ages[item[0]] if ages.get(item[0]) is not None else float("-inf"))
+        refreshed = skipped = 0
+        for symbol, _ in queue:
+            # A long cycle keeps renewing the lease, and stops if it was lost
+            if self._stop.is_set() or not self._hold_lease():
+                return
+            age = ages.get(symbol)
+            if age is not None and age + interval < self._max_age:
+                # Fetched recently (e.g. by a request) and still fresh at the next cycle
+                skipped += 1
+                continue
+            # Whatever doesn't fit in this cycle's budget is among the oldest next cycle
+            if not self._budget.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                break
+            try:
+                self._refresh(symbol)
+                refreshed += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Background refresh failed for {symbol}: {e}")
+        self.cycles += 1
+        self.refreshed += refreshed
+        self.skipped += skipped
+        self.last_cycle = {
+            "at": datetime.now().isoformat(),
+            "symbols": len(universe),
+            "refreshed": refreshed,
+            "skipped": skipped,
+        }
@@ -0,0 +1,220 @@
+# server/metrics.py
+"""In-process latency/usage metrics, Prometheus text exposition and per-request trace spans.
+
+Metrics are process-local; with several gunicorn workers, scrape each worker
+or aggregate in Prometheus. Tracing is opt-in per request (`X-Trace: 1`) or
+for every request with TRACE_REQUESTS=1, and reports the request's upstream
+calls in a `Server-Timing` response header.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, request
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Spans kept per traced request; further spans are only counted
+MAX_TRACE_SPANS = 50
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination."""
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {values[-1]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Flask request latency (time to first byte for streams)",
+    labels=("route", "method", "status")
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Latency of each call to an external dependency",
+    labels=("upstream", "operation", "outcome")
+)
+CREW_RUN_DURATION = Histogram(
+    "crew_run_duration_seconds", "Wall time of a full crew analysis", labels=("outcome",)
+)
+CREW_TASK_DURATION = Histogram(
+    "crew_task_duration_seconds", "Wall time of each crew task", labels=("stage", "agent")
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "LLM tokens used, by model, crew stage and kind", labels=("model", "stage", "kind")
+)
+
+METRICS = [REQUEST_LATENCY, UPSTREAM_LATENCY, CREW_RUN_DURATION, CREW_TASK_DURATION, LLM_TOKENS]
+
+# Callables returning `[(name, type, help, [(labels_dict, value), ...]), ...]`, evaluated per scrape
+_collectors = []
+
+
+def register_collector(collector):
+    _collectors.append(collector)
+    return collector
+
+
+def render_prometheus():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            families = collector()
+        except Exception as e:
+            print(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+            continue
+        for name, metric_type, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                if value is None:
+                    continue
+                lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# Per-request trace: a list of (name, seconds, description) spans, or None when not tracing
+_trace = ContextVar("trace", default=None)
+
+
+def record_span(name, seconds, description=None):
+    spans = _trace.get()
+    if spans is not None:
+        # list.append is atomic, so pool threads running in a copied context can share the list
+        spans.append((name, seconds, description))
+
+
+def observe_upstream(upstream, operation, seconds, outcome="ok"):
+    UPSTREAM_LATENCY.observe(seconds, upstream=upstream, operation=operation, outcome=outcome)
+    record_span(upstream, seconds, operation)
+
+
+@contextmanager
+def timed(upstream, operation):
+    """Time a block as one call to `upstream`; exceptions are recorded with outcome "error"."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        observe_upstream(upstream, operation, time.perf_counter() - started, outcome)
+
+
+@contextmanager
+def span(name, description=None):
+    """Record a block as a trace span only (no histogram), e.g. to tag upstream calls with a symbol."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started, description)
+
+
+def server_timing(spans):
+    """Render spans as a Server-Timing header value (durations in milliseconds)."""
+    entries = []
+    for name, seconds, description in spans[:MAX_TRACE_SPANS]:
+        entry = f"{name};dur={seconds * 1000:.1f}"
+        if description:
+            entry += ';desc="' + str(description).replace('"', "'")[:80] + '"'
+        entries.append(entry)
+    if len(spans) > MAX_TRACE_SPANS:
+        entries.append(f'truncated;desc="{len(spans) - MAX_TRACE_SPANS} more spans"')
+    return ", ".join(entries)
+
+
+def init_app(app):
+    """Record request latencies and, for traced requests, attach upstream spans as Server-Timing."""
+    trace_all = os.environ.get('TRACE_REQUESTS', '0') == '1'
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_started = time.perf_counter()
+        if trace_all or request.headers.get('X-Trace') == '1':
+            g.metrics_trace_token = _trace.set([])
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_LATENCY.observe(elapsed, route=route, method=request.method, status=response.status_code)
+
+        token = g.pop('metrics_trace_token', None)
+        if token is not None:
+            spans = _trace.get() or []
+            _trace.reset(token)
+            response.headers['Server-Timing'] = server_timing([("total", elapsed, route)] + list(spans))
+        return response
@@ -0,0 +1,308 @@
+# server/ohlcv_store.py
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import numpy as np
+
+from quote_cache import SingleFlight
+
+FIELDS = ("open", "high", "low", "close", "volume")
+# Chart ranges in calendar days back from today; "ytd" and "max" are handled separately
+RANGE_DAYS = {"1mo": 31, "3mo": 92, "6mo": 183, "1y": 366, "2y": 731, "5y": 1827, "10y": 3653}
+RANGES = tuple(RANGE_DAYS) + ("ytd", "max")
+# A re-fetched bar that moved by more than this means yfinance re-adjusted the series (split/dividend)
+ADJUSTMENT_TOLERANCE = 1e-4
+
+_UNSAFE_FILENAME_RE = re.compile(r"[^A-Z0-9.-]")
+
+
+def lttb(x, y, threshold):
+    """Indices of the `threshold` points Largest-Triangle-Three-Buckets keeps from (x, y).
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket, which preserves peaks and troughs that a
+    plain stride would drop.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Bucket i spans [edges[i], edges[i + 1]); the last point is a bucket of its own
+    edges = np.append((np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.intp) + 1, n)
+    # Average of every bucket after the first, i.e. the third triangle vertex for the bucket before it
+    counts = np.diff(edges)[1:]
+    x_avgs = (np.add.reduceat(x, edges[1:-1]) / counts).tolist()
+    y_avgs = (np.add.reduceat(y, edges[1:-1]) / counts).tolist()
+
+    # Buckets hold a handful of points each, where plain floats beat per-bucket numpy calls
+    xs, ys, edges = x.tolist(), y.tolist(), edges.tolist()
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        xa, ya = xs[a], ys[a]
+        dx, dy = xa - x_avgs[i], y_avgs[i] - ya
+        best = -1.0
+        for j in range(edges[i], edges[i + 1]):
+            area = abs(dx * (ys[j] - ya) - (xa - xs[j]) * dy)
+            if area > best:
+                best, a = area, j
+        selected.append(a)
+    selected.append(n - 1)
+    return np.array(selected, dtype=np.intp)
+
+
+def bucket_ohlc(bars, buckets):
+    """Merge consecutive bars into at most `buckets` candles (first open, max high, min low, last close)."""
+    n = len(bars["date"])
+    if buckets >= n:
+        return bars
+    starts = np.unique(np.linspace(0, n, buckets, endpoint=False).astype(np.intp))
+    ends = np.append(starts[1:], n)
+    return {
+        "date": bars["date"][starts],
+        "open": bars["open"][starts],
+        "high": np.maximum.reduceat(bars["high"], starts),
+        "low": np.minimum.reduceat(bars["low"], starts),
+        "close": bars["close"][ends - 1],
+        "volume": np.add.reduceat(bars["volume"], starts),
+    }
+
+
+def slice_range(bars, period, today=None):
+    """The bars falling inside a chart range such as "1y", "ytd" or "max"."""
+    if period == "max":
+        return bars
+    today = today or date.today()
+    start = date(today.year, 1, 1) if period == "ytd" else today - timedelta(days=RANGE_DAYS[period])
+    i = int(np.searchsorted(bars["date"], np.datetime64(start, "D")))
+    return {key: bars[key][i:] for key in ("date",) + FIELDS}
+
+
+class OHLCVStore:
+    """Daily OHLCV history per symbol, stored as columnar arrays and extended incrementally.
+
+    Each symbol's bars live in one `.npz` file of parallel arrays (date plus
+    one array per field) under `directory`, and recently used symbols stay in
+    memory. The first request for a symbol downloads its full history; once
+    the stored copy is older than `refresh_interval` seconds only the bars
+    since the last stored date are downloaded and appended. The last stored
+    bar is fetched again each time, both to replace a partial intraday bar
+    and to notice when yfinance has re-adjusted the series, in which case the
+    full history is fetched again. Stale symbols requested together are
+    refreshed with one batched download, and a failed refresh serves the
+    stored copy. Symbols with no history at all (unknown or delisted) are
+    remembered for `refresh_interval` seconds instead of being downloaded
+    again on every request.
+    """
+
+    def __init__(self, directory, refresh_interval=3600, max_cached=256, upstream=None, max_misses=4096):
+        self._directory = directory
+        self._refresh_interval = refresh_interval
+        self._max_cached = max_cached
+        # Optional resilience.UpstreamGuard wrapping the yfinance calls
+        self._call = upstream.call if upstream else (lambda fn, *args, **kwargs: fn(*args, **kwargs))
+        self._cache = OrderedDict()
+        self._misses = OrderedDict()  # symbol -> time a full download found nothing
+        self._max_misses = max_misses
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.disk_loads = 0
+        self.downloads = 0
+        self.bars_fetched = 0
+        self.full_refetches = 0
+        self.refresh_errors = 0
+        self.misses_served = 0
+
+    def get(self, symbol):
+        return self.get_many([symbol])[symbol.upper()]
+
+    def get_many(self, symbols):
+        """Map each symbol to its bars (a dict of arrays), or None if no history is available."""
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        result = {symbol: self._load(symbol) for symbol in symbols}
+
+        # One batched download per distinct start date: None (full history) or the last stored date
+        now = time.time()
+        groups = {}
+        for symbol, bars in result.items():
+            if bars is None:
+                if not self._known_missing(symbol, now):
+                    groups.setdefault(None, []).append(symbol)
+            elif now - bars["fetched_at"] >= self._refresh_interval:
+                groups.setdefault(bars["date"][-1].item(), []).append(symbol)
+
+        for start, group in groups.items():
+            try:
+                refreshed = self._flight.do((start, tuple(group)), lambda: self._refresh(group, start))
+            except Exception as e:
+                with self._lock:
+                    self.refresh_errors += 1
+                if all(result[symbol] is None for symbol in group):
+                    raise
+                print(f"Serving stored price history for {', '.join(group)}, refresh failed: {e}")
+                continue
+            result.update(refreshed)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached_symbols": len(self._cache),
+                "missing_symbols": len(self._misses),
+                "disk_loads": self.disk_loads,
+                "downloads": self.downloads,
+                "bars_fetched": self.bars_fetched,
+                "full_refetches": self.full_refetches,
+                "refresh_errors": self.refresh_errors,
+                "misses_served": self.misses_served,
+            }
+
+    def _known_missing(self, symbol, now):
+        with self._lock:
+            missed_at = self._misses.get(symbol)
+            if missed_at is None:
+                return False
+            if now - missed_at >= self._refresh_interval:
+                del self._misses[symbol]
+                return False
+            self.misses_served += 1
+            return True
+
+    def _remember_miss(self, symbol, now):
+        with self._lock:
+            self._misses[symbol] = now
+            self._misses.move_to_end(symbol)
+            while len(self._misses) > self._max_misses:
+                self._misses.popitem(last=False)
+
+    def _path(self, symbol):
+        # "^GSPC" and "EURUSD=X" aren't portable file names
+        name = _UNSAFE_FILENAME_RE.sub(lambda m: f"_{ord(m.group()):02X}", symbol)
+        return os.path.join(self._directory, f"{name}.npz")
+
+    def _load(self, symbol):
+        with self._lock:
+            bars = self._cache.get(symbol)
+            if bars is not None:
+                self._cache.move_to_end(symbol)
+                return bars
+
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as stored:
+            bars = {key: stored[key] for key in ("date",) + FIELDS}
+            bars["fetched_at"] = float(stored["fetched_at"])
+        with self._lock:
+            self.disk_loads += 1
+        self._remember(symbol, bars)
+        return bars
+
+    def _remember(self, symbol, bars):
+        with self._lock:
+            self._cache[symbol] = bars
+            self._cache.move_to_end(symbol)
+            while len(self._cache) > self._max_cached:
+                self._cache.popitem(last=False)
+
+    def _save(self, symbol, bars):
+        os.makedirs(self._directory, exist_ok=True)
+        path = self._path(symbol)
+        # Unique per writer: another thread or worker process may be saving the same symbol
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **bars)
+        os.replace(tmp_path, path)
+
+    def _refresh(self, symbols, start):
+        fetched = self._download(symbols, start)
+        fetched_at = time.time()
+        result = {}
+        refetch = []
+        for symbol in symbols:
+            new = fetched.get(symbol)
+            stored = self._load(symbol) if start is not None else None
+            if stored is None:
+                if new is None:
+                    self._remember_miss(symbol, fetched_at)
+                bars = new
+            elif new is None:
+                bars = {**stored}  # nothing new (e.g. weekend): just mark it fresh
+            elif new["date"][0] == stored["date"][-1] and not np.isclose(
+                new["close"][0], stored["close"][-1], rtol=ADJUSTMENT_TOLERANCE, atol=0
+            ):
+                refetch.append(symbol)
+                continue
+            else:
+                keep = int(np.searchsorted(stored["date"], new["date"][0]))
+                bars = {key: np.concatenate((stored[key][:keep], new[key])) for key in ("date",) + FIELDS}
+            result[symbol] = self._store(symbol, bars, fetched_at)
+
+        if refetch:
+            with self._lock:
+                self.full_refetches += len(refetch)
+            try:
+                fetched = self._download(refetch, None)
+            except Exception as e:
+                with self._lock:
+                    self.refresh_errors += 1
+                print(f"Full refetch failed for {', '.join(refetch)}: {e}")
+                fetched = {}
+            for symbol in refetch:
+                # Nothing came back (empty frame, rate limited): keep serving the stored
+                # bars, still stale, so the next request tries again
+                result[symbol] = self._store(symbol, fetched.get(symbol), fetched_at) or self._load(symbol)
+        return result
+
+    def _store(self, symbol, bars, fetched_at):
+        if bars is None or not len(bars["date"]):
+            return None
+        bars["fetched_at"] = fetched_at
+        self._save(symbol, bars)
+        self._remember(symbol, bars)
+        return bars
+
+    def _download(self, symbols, start):
+        """Bars per symbol from one yfinance download, from `start` (a date, inclusive) or the full history."""
+        import pandas as pd
+        import yfinance as yf
+
+        range_args = {"start": start.isoformat()} if start is not None else {"period": "max"}
+        data = self._call(yf.download, symbols, interval="1d", auto_adjust=True, group_by="column",
+                          threads=True, progress=False, **range_args)
+        with self._lock:
+            self.downloads += 1
+        if data is None or data.empty:
+            return {}
+
+        result = {}
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(1):
+                    continue
+                frame = data.xs(symbol, axis=1, level=1)
+            else:
+                frame = data
+            frame = frame.dropna(subset=["Close"])
+            if frame.empty:
+                continue
+            index = frame.index
+            if index.tz is not None:
+                index = index.tz_localize(None)
+            close = frame["Close"].to_numpy(dtype=float)
+            bars = {"date": index.values.astype("datetime64[D]"), "close": close}
+            for field in ("open", "high", "low"):
+                values = frame[field.capitalize()].to_numpy(dtype=float)
+                bars[field] = np.where(np.isnan(values), close, values)
+            bars["volume"] = np.nan_to_num(frame["Volume"].to_numpy(dtype=float))
+            result[symbol] = bars
+            with self._lock:
+                self.bars_fetched += len(close)
+        return result
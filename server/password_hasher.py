@@ -0,0 +1,110 @@
+# server/password_hasher.py
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+class HasherBusy(Exception):
+    """Raised when too many hashes are already queued; the caller should retry later."""
+
+
+def _hash(password, method):
+    from werkzeug.security import generate_password_hash
+    return generate_password_hash(password, method=method)
+
+
+def _verify(stored_hash, password):
+    from werkzeug.security import check_password_hash
+    return check_password_hash(stored_hash, password)
+
+
+def hash_method(stored_hash):
+    """The method and parameters a werkzeug hash was made with, e.g. "pbkdf2:sha256:600000"."""
+    return stored_hash.split("$", 1)[0]
+
+
+class PasswordHasher:
+    """Password hashing and verification in a dedicated process pool.
+
+    Key stretching is deliberately CPU-heavy and holds the GIL, so on the
+    request threads a burst of logins stalls every other route in the
+    worker. Here it runs in `max_workers` separate processes and at most
+    `max_pending` hashes may be queued or running; beyond that callers wait
+    up to `queue_timeout` seconds and then get `HasherBusy`, so an auth burst
+    is shed instead of queueing without bound.
+
+    `method` is the werkzeug method string new hashes are made with. A stored
+    hash made with different parameters still verifies, and `verify` reports
+    it so the caller can store an upgraded hash.
+
+    With `max_workers=0` everything runs inline on the calling thread.
+    """
+
+    def __init__(self, method="pbkdf2:sha256:600000", max_workers=2, max_pending=16, queue_timeout=2.0):
+        self.method = method
+        self._max_workers = max_workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._queue_timeout = queue_timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self.hashed = 0
+        self.verified = 0
+        self.rejected = 0
+
+    def hash(self, password):
+        with self._lock:
+            self.hashed += 1
+        return self._run(_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        """`(matches, needs_rehash)` for a password against its stored hash."""
+        with self._lock:
+            self.verified += 1
+        matches = self._run(_verify, stored_hash, password)
+        return matches, matches and hash_method(stored_hash) != self.method
+
+    def shutdown(self, wait=True):
+        self._discard_pool(wait=wait)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "method": self.method,
+                "workers": self._max_workers,
+                "hashed": self.hashed,
+                "verified": self.verified,
+                "rejected": self.rejected,
+            }
+
+    def _run(self, fn, *args):
+        if not self._max_workers:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self._queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy("Too many authentication requests in progress")
+        try:
+            try:
+                return self._pool().submit(fn, *args).result()
+            except BrokenProcessPool:
+                # A worker process died (e.g. OOM-killed); start a fresh pool and try once more
+                self._discard_pool()
+                return self._pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def _discard_pool(self, wait=False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawned, not forked: the server process has MongoDB and pool threads running
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
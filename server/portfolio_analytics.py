@@ -0,0 +1,147 @@
+# server/portfolio_analytics.py
+import math
+
+import numpy as np
+
+from ohlcv_store import slice_range
+from quote_cache import current_price_from
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def _json_number(value, digits=4):
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else round(value, digits)
+
+
+def value_positions(stocks, prices):
+    """Value every position in one vectorized pass.
+
+    `prices` holds the current price per position (NaN where unknown).
+    Returns per-position arrays and portfolio totals; unknown prices
+    contribute nothing to the value and gain/loss totals.
+    """
+    shares = np.array([stock['shares'] for stock in stocks], dtype=float)
+    purchase_price = np.array([stock['purchase_price'] for stock in stocks], dtype=float)
+    current_price = np.asarray(prices, dtype=float)
+
+    current_value = current_price * shares
+    gain_loss = (current_price - purchase_price) * shares
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gain_loss_percentage = np.where(purchase_price > 0, (current_price / purchase_price - 1) * 100, 0.0)
+
+    return {
+        "current_value": current_value,
+        "gain_loss": gain_loss,
+        "gain_loss_percentage": gain_loss_percentage,
+        "total_value": float(np.nansum(current_value)),
+        "total_invested": float(np.sum(purchase_price * shares)),
+        "total_gain_loss": float(np.nansum(gain_loss)),
+    }
+
+
+def closes_frame(history, period="1y"):
+    """Daily closes (dates x symbols) within `period` from `OHLCVStore.get_many` bars; symbols without history are left out."""
+    import pandas as pd
+
+    columns = {}
+    for symbol, bars in history.items():
+        if bars is None:
+            continue
+        bars = slice_range(bars, period)
+        columns[symbol] = pd.Series(bars["close"], index=pd.DatetimeIndex(bars["date"]))
+    return pd.DataFrame(columns).sort_index()
+
+
+def portfolio_analytics(stocks, quotes, closes, benchmark="SPY", include_correlation=True):
+    """Risk and allocation metrics for a portfolio.
+
+    `quotes` maps symbol -> info dict (may be None), `closes` is a DataFrame
+    of daily closes (dates x symbols) that includes the benchmark column.
+    """
+    import pandas as pd
+
+    symbols = [stock['symbol'].upper() for stock in stocks]
+    prices = [current_price_from(quotes.get(symbol) or {}, np.nan) for symbol in symbols]
+    prices = np.array([np.nan if p is None else p for p in prices], dtype=float)
+
+    # Fall back to the last close where no live quote is available
+    if not closes.empty:
+        last_closes = closes.ffill().iloc[-1].reindex(symbols).to_numpy(dtype=float)
+        prices = np.where(np.isnan(prices), last_closes, prices)
+
+    valuation = value_positions(stocks, prices)
+    values = np.nan_to_num(valuation["current_value"])
+    total_value = valuation["total_value"]
+    weights = values / total_value if total_value > 0 else np.zeros_like(values)
+
+    # Sector allocation
+    sectors = pd.Series(values, index=[(quotes.get(s) or {}).get('sector') or 'Unknown' for s in symbols])
+    sector_allocation = sectors.groupby(level=0).sum()
+    sector_allocation = {
+        sector: {"value": _json_number(value, 2), "weight": _json_number(value / total_value if total_value else 0)}
+        for sector, value in sector_allocation.sort_values(ascending=False).items()
+    }
+
+    # Daily returns of each holding, aggregated by symbol (a symbol may appear once per position).
+    # A missing close carries the previous one forward (no change that day); days before a
+    # symbol's first close have no return and count as 0.
+    holdings = closes.reindex(columns=list(dict.fromkeys(symbols))).ffill()
+    returns = holdings.pct_change(fill_method=None).iloc[1:].fillna(0.0)
+    symbol_weights = pd.Series(weights, index=symbols).groupby(level=0).sum().reindex(returns.columns).fillna(0.0)
+    portfolio_returns = returns.to_numpy() @ symbol_weights.to_numpy()
+
+    # Daily P&L from the last two closes
+    if len(holdings) >= 2:
+        change = (holdings.iloc[-1] - holdings.iloc[-2]).reindex(symbols).to_numpy(dtype=float)
+        shares = np.array([stock['shares'] for stock in stocks], dtype=float)
+        daily_pnl = float(np.nansum(change * shares))
+    else:
+        daily_pnl = None
+
+    volatility = beta = max_drawdown = None
+    if len(portfolio_returns) > 1:
+        volatility = float(np.std(portfolio_returns, ddof=1) * math.sqrt(TRADING_DAYS_PER_YEAR))
+        cumulative = np.cumprod(1 + portfolio_returns)
+        max_drawdown = float(np.min(cumulative / np.maximum.accumulate(cumulative) - 1))
+        if benchmark in closes.columns:
+            benchmark_returns = closes[benchmark].ffill().pct_change(fill_method=None).iloc[1:].fillna(0.0).to_numpy()
+            benchmark_variance = np.var(benchmark_returns, ddof=1)
+            if benchmark_variance > 0:
+                beta = float(np.cov(portfolio_returns, benchmark_returns, ddof=1)[0, 1] / benchmark_variance)
+
+    result = {
+        "positions": [
+            {
+                "symbol": symbol,
+                "current_price": _json_number(price, 2),
+                "current_value": _json_number(value, 2),
+                "gain_loss": _json_number(gain, 2),
+                "gain_loss_percentage": _json_number(pct, 2),
+                "weight": _json_number(weight),
+            }
+            for symbol, price, value, gain, pct, weight in zip(
+                symbols, prices, valuation["current_value"], valuation["gain_loss"],
+                valuation["gain_loss_percentage"], weights
+            )
+        ],
+        "total_value": _json_number(total_value, 2),
+        "total_invested": _json_number(valuation["total_invested"], 2),
+        "total_gain_loss": _json_number(valuation["total_gain_loss"], 2),
+        "daily_pnl": _json_number(daily_pnl, 2),
+        "sector_allocation": sector_allocation,
+        "volatility": _json_number(volatility),
+        "beta": _json_number(beta),
+        "benchmark": benchmark,
+        "max_drawdown": _json_number(max_drawdown),
+        "observations": int(len(portfolio_returns)),
+    }
+    if include_correlation and len(returns.columns) > 1:
+        correlation = returns.corr().round(4)
+        result["correlation"] = {
+            "symbols": list(correlation.columns),
+            "matrix": [[_json_number(v) for v in row] for row in correlation.to_numpy()],
+        }
+    return result
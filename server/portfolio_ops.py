@@ -0,0 +1,108 @@
+# server/portfolio_ops.py
+"""Atomic MongoDB updates for portfolio positions.
+
+Each trade is expressed as a single update on the portfolio document so
+it applies server-side in one round-trip, without reading the stocks array
+first, and concurrent edits from several tabs cannot overwrite each other.
+"""
+import math
+from datetime import datetime
+
+# Positions whose share count drops to this or below are removed
+SHARES_EPSILON = 1e-9
+
+
+def parse_trade(data):
+    """Validate a trade payload; returns ("buy", stock) or ("sell", symbol, shares).
+
+    Raises ValueError with a client-facing message for bad input.
+    """
+    if not isinstance(data, dict) or not data.get('symbol'):
+        raise ValueError("Stock symbol is required")
+    symbol = str(data['symbol']).upper()
+    side = str(data.get('side', 'buy')).lower()
+
+    if side not in ('buy', 'sell'):
+        raise ValueError(f"Unknown trade side: {side}")
+
+    shares = _number(data.get('shares'), "Shares")
+    if side == 'sell':
+        # Zero (or no shares field) sells the whole position; the price is not used
+        return "sell", symbol, shares
+    price = _number(data.get('purchase_price'), "Purchase price")
+    if shares <= 0 or price <= 0:
+        raise ValueError("Missing required fields")
+
+    return "buy", {
+        "symbol": symbol,
+        "shares": shares,
+        "purchase_price": price,
+        "purchase_date": data.get('purchase_date', datetime.now().isoformat()),
+        "notes": data.get('notes', '')
+    }
+
+
+def _number(value, name):
+    # float() also accepts "nan", "inf" and "1e309", which would corrupt the averaged price for good
+    try:
+        number = float(value or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a finite number")
+    return number
+
+
+def buy_update(stock):
+    """Pipeline update that adds to an existing position (re-averaging its price) or appends a new one."""
+    symbol = {"$literal": stock['symbol']}
+    shares = stock['shares']
+    cost = stock['shares'] * stock['purchase_price']
+    return [{"$set": {
+        "stocks": {"$cond": [
+            {"$in": [symbol, "$stocks.symbol"]},
+            {"$map": {"input": "$stocks", "as": "s", "in": {"$cond": [
+                {"$eq": ["$$s.symbol", symbol]},
+                {"$mergeObjects": ["$$s", {
+                    "shares": {"$add": ["$$s.shares", shares]},
+                    "purchase_price": {"$divide": [
+                        {"$add": [{"$multiply": ["$$s.shares", "$$s.purchase_price"]}, cost]},
+                        {"$add": ["$$s.shares", shares]}
+                    ]}
+                }]},
+                "$$s"
+            ]}}},
+            {"$concatArrays": ["$stocks", [{"$literal": stock}]]}
+        ]},
+        "updated_at": datetime.now()
+    }}]
+
+
+def sell_update(symbol, shares):
+    """Update that sells `shares` of a position, removing it when nothing is left.
+
+    `shares <= 0` means "sell everything" and is a conditional `$pull`;
+    partial sells subtract in a pipeline and drop the position if the
+    result is not positive.
+    """
+    if shares <= 0:
+        return {
+            "$pull": {"stocks": {"symbol": symbol}},
+            "$set": {"updated_at": datetime.now()}
+        }
+    return [{"$set": {
+        "stocks": {"$filter": {
+            "input": {"$map": {"input": "$stocks", "as": "s", "in": {"$cond": [
+                {"$eq": ["$$s.symbol", {"$literal": symbol}]},
+                {"$mergeObjects": ["$$s", {"shares": {"$subtract": ["$$s.shares", shares]}}]},
+                "$$s"
+            ]}}},
+            "as": "s",
+            "cond": {"$gt": ["$$s.shares", SHARES_EPSILON]}
+        }},
+        "updated_at": datetime.now()
+    }}]
+
+
+def sell_filter(user_email, symbol):
+    return {"user_email": user_email, "stocks.symbol": symbol}
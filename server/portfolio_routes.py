@@ -0,0 +1,511 @@
+# server/portfolio_routes.py
+"""Portfolio, watchlist and live price routes - served from the quote cache, no analysis stack."""
+import os
+import re
+import json
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import (
+    create_access_token, get_jwt, get_jwt_identity, get_jwt_request_location, jwt_required
+)
+from pymongo import UpdateOne
+
+from dashboard import DashboardSnapshots, row_delta, row_hashes
+from extensions import (
+    QUOTE_REQUEST_DEADLINE, ohlcv_store, portfolios_collection, price_hub, quote_cache, symbol_index,
+    watchlists_collection
+)
+from ohlcv_store import RANGES, bucket_ohlc, lttb, slice_range
+from portfolio_analytics import closes_frame, portfolio_analytics, value_positions
+from portfolio_ops import buy_update, parse_trade, sell_filter, sell_update
+from price_stream import StreamLimitReached
+from quote_cache import current_price_from
+from responses import dumps, etag_for, json_response
+
+portfolio_bp = Blueprint('portfolio', __name__)
+
+MAX_BULK_TRADES = int(os.environ.get('MAX_BULK_TRADES', 5000))
+ANALYTICS_PERIODS = ('1mo', '3mo', '6mo', '1y', '2y', '5y')
+
+def portfolio_view(stocks, quotes):
+    """Priced positions and totals for `stocks` from a `quote_cache.get_many` result."""
+    # Value all positions in one vectorized pass; missing quotes are NaN
+    quote_rows = [quotes[stock['symbol'].upper()] for stock in stocks]
+    prices = [
+        float('nan') if info is None else current_price_from(info, 0)
+        for info, _ in quote_rows
+    ]
+    valuation = value_positions(stocks, prices)
+    
+    portfolio_with_data = []
+    for i, (stock, (info, quote_status)) in enumerate(zip(stocks, quote_rows)):
+        if info is None:
+            # No quote available in time, just add the stock without current data
+            portfolio_with_data.append({**stock, "quote_status": quote_status})
+            continue
+        
+        portfolio_with_data.append({
+            **stock,
+            "current_price": prices[i],
+            "current_value": float(valuation["current_value"][i]),
+            "gain_loss": float(valuation["gain_loss"][i]),
+            "gain_loss_percentage": float(valuation["gain_loss_percentage"][i]),
+            "quote_status": quote_status
+        })
+    
+    return {
+        "portfolio": portfolio_with_data,
+        "total_value": valuation["total_value"],
+        "total_invested": valuation["total_invested"],
+        "total_gain_loss": valuation["total_gain_loss"]
+    }
+
+def watchlist_view(symbols, quotes):
+    """Watchlist rows for `symbols` from a `quote_cache.get_many` result."""
+    watchlist_with_data = []
+    for symbol in symbols:
+        info, quote_status = quotes[symbol.upper()]
+        if info is None:
+            # If there's no data available in time, just add the symbol
+            watchlist_with_data.append({"symbol": symbol, "error": "Quote unavailable", "quote_status": quote_status})
+            continue
+        
+        watchlist_with_data.append({
+            "symbol": symbol,
+            "name": info.get('shortName', symbol),
+            "current_price": current_price_from(info, 0),
+            "price_change": info.get('regularMarketChange', 0),
+            "price_change_percent": info.get('regularMarketChangePercent', 0),
+            "sector": info.get('sector', ''),
+            "pe_ratio": info.get('trailingPE', 0),
+            "quote_status": quote_status
+        })
+    return watchlist_with_data
+
+@portfolio_bp.route('/api/portfolio', methods=['GET'])
+@jwt_required()
+def get_portfolio():
+    user_email = get_jwt_identity()
+    
+    portfolio = portfolios_collection.find_one({"user_email": user_email})
+    if not portfolio:
+        return jsonify({"error": "Portfolio not found"}), 404
+    
+    # Get current price data for all portfolio stocks in one concurrent batch
+    quotes = quote_cache.get_many(
+        [stock['symbol'] for stock in portfolio['stocks']], "price", deadline=QUOTE_REQUEST_DEADLINE
+    )
+    
+    return jsonify(portfolio_view(portfolio['stocks'], quotes)), 200
+
+@portfolio_bp.route('/api/portfolio/analytics', methods=['GET'])
+@jwt_required()
+def get_portfolio_analytics():
+    user_email = get_jwt_identity()
+    
+    portfolio = portfolios_collection.find_one({"user_email": user_email})
+    if not portfolio:
+        return jsonify({"error": "Portfolio not found"}), 404
+    if not portfolio['stocks']:
+        return jsonify({"error": "Portfolio is empty"}), 400
+    
+    period = request.args.get('period', '1y')
+    if period not in ANALYTICS_PERIODS:
+        return jsonify({"error": f"Unsupported period: {period}"}), 400
+    benchmark = request.args.get('benchmark', 'SPY').upper()
+    include_correlation = request.args.get('correlation', '1') != '0'
+    
+    symbols = [stock['symbol'].upper() for stock in portfolio['stocks']]
+    quotes = quote_cache.get_many(symbols, "price", deadline=QUOTE_REQUEST_DEADLINE)
+    try:
+        # Daily bars come from the shared OHLCV store, refreshed incrementally and one batched download for stale symbols
+        closes = closes_frame(ohlcv_store.get_many(symbols + [benchmark]), period)
+    except Exception as e:
+        return jsonify({"error": f"Error fetching price history: {str(e)}"}), 502
+    
+    return jsonify(portfolio_analytics(
+        portfolio['stocks'],
+        {symbol: info for symbol, (info, _) in quotes.items()},
+        closes,
+        benchmark=benchmark,
+        include_correlation=include_correlation
+    )), 200
+
+@portfolio_bp.route('/api/portfolio/add', methods=['POST'])
+@jwt_required()
+def add_to_portfolio():
+    user_email = get_jwt_identity()
+    data = request.get_json()
+    
+    # Validate input
+    if not data or not data.get('symbol') or not data.get('shares') or not data.get('purchase_price'):
+        return jsonify({"error": "Missing required fields"}), 400
+    
+    try:
+        _, new_stock = parse_trade({**data, "side": "buy"})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Add to the existing position (re-averaging its price) or append a new one, atomically
+    result = portfolios_collection.update_one({"user_email": user_email}, buy_update(new_stock))
+    if result.matched_count == 0:
+        return jsonify({"error": "Portfolio not found"}), 404
+    
+    return jsonify({"message": "Stock added to portfolio"}), 200
+
+@portfolio_bp.route('/api/portfolio/remove', methods=['POST'])
+@jwt_required()
+def remove_from_portfolio():
+    user_email = get_jwt_identity()
+    data = request.get_json()
+    
+    # Validate input
+    if not data or not data.get('symbol'):
+        return jsonify({"error": "Stock symbol is required"}), 400
+    
+    try:
+        _, symbol, shares_to_remove = parse_trade({**data, "side": "sell"})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Partially reduce or remove the position in one atomic update
+    result = portfolios_collection.update_one(sell_filter(user_email, symbol), sell_update(symbol, shares_to_remove))
+    
+    if result.matched_count == 0:
+        if not portfolios_collection.count_documents({"user_email": user_email}, limit=1):
+            return jsonify({"error": "Portfolio not found"}), 404
+        return jsonify({"error": f"Stock {symbol} not found in portfolio"}), 404
+    
+    return jsonify({"message": f"Stock {symbol} updated in portfolio"}), 200
+
+@portfolio_bp.route('/api/portfolio/bulk', methods=['POST'])
+@jwt_required()
+def bulk_portfolio_trades():
+    user_email = get_jwt_identity()
+    data = request.get_json()
+    
+    # Validate input
+    trades = (data or {}).get('trades')
+    if not isinstance(trades, list) or not trades:
+        return jsonify({"error": "A non-empty list of trades is required"}), 400
+    if len(trades) > MAX_BULK_TRADES:
+        return jsonify({"error": f"At most {MAX_BULK_TRADES} trades per request"}), 400
+    
+    operations = []
+    for index, trade in enumerate(trades):
+        try:
+            parsed = parse_trade(trade)
+        except ValueError as e:
+            return jsonify({"error": f"Trade {index}: {e}"}), 400
+        if parsed[0] == "buy":
+            operations.append(UpdateOne({"user_email": user_email}, buy_update(parsed[1])))
+        else:
+            operations.append(UpdateOne(sell_filter(user_email, parsed[1]), sell_update(parsed[1], parsed[2])))
+    
+    # Ordered, so trades apply in the sequence given (e.g. a brokerage history)
+    result = portfolios_collection.bulk_write(operations, ordered=True)
+    if result.matched_count == 0 and not portfolios_collection.count_documents({"user_email": user_email}, limit=1):
+        return jsonify({"error": "Portfolio not found"}), 404
+    
+    return jsonify({
+        "message": f"Applied {result.matched_count} of {len(operations)} trades",
+        "applied": result.matched_count,
+        "skipped": len(operations) - result.matched_count
+    }), 200
+
+# Watchlist routes
+@portfolio_bp.route('/api/watchlist', methods=['GET'])
+@jwt_required()
+def get_watchlist():
+    user_email = get_jwt_identity()
+    
+    watchlist = watchlists_collection.find_one({"user_email": user_email})
+    if not watchlist:
+        return jsonify({"error": "Watchlist not found"}), 404
+    
+    # Get current data for all watchlist stocks in one concurrent batch
+    quotes = quote_cache.get_many(watchlist['stocks'], "price", deadline=QUOTE_REQUEST_DEADLINE)
+    
+    return jsonify({"watchlist": watchlist_view(watchlist['stocks'], quotes)}), 200
+
+# Dashboard - portfolio and watchlist from one quote snapshot, for polling clients
+dashboard_snapshots = DashboardSnapshots(
+    versions_per_user=int(os.environ.get('DASHBOARD_VERSIONS_PER_USER', 4)),
+    max_users=int(os.environ.get('DASHBOARD_SNAPSHOT_USERS', 5000))
+)
+
+@portfolio_bp.route('/api/dashboard', methods=['GET'])
+@jwt_required()
+def get_dashboard():
+    user_email = get_jwt_identity()
+    
+    portfolio = portfolios_collection.find_one({"user_email": user_email}, {"stocks": 1}) or {"stocks": []}
+    watchlist = watchlists_collection.find_one({"user_email": user_email}, {"stocks": 1}) or {"stocks": []}
+    
+    # One concurrent batch for the symbols of both views, so they are priced from the same snapshot
+    symbols = [stock['symbol'] for stock in portfolio['stocks']] + watchlist['stocks']
+    quotes = quote_cache.get_many(symbols, "price", deadline=QUOTE_REQUEST_DEADLINE)
+    
+    payload = portfolio_view(portfolio['stocks'], quotes)
+    payload["watchlist"] = watchlist_view(watchlist['stocks'], quotes)
+    
+    # The version identifies the content, so unchanged dashboards are answered with 304
+    sections = {"portfolio": row_hashes(payload["portfolio"]), "watchlist": row_hashes(payload["watchlist"])}
+    totals = {key: payload[key] for key in ("total_value", "total_invested", "total_gain_loss")}
+    version = etag_for(dumps([totals, sections["portfolio"], sections["watchlist"]]))
+    since = request.args.get('since')
+    previous = dashboard_snapshots.get(user_email, since) if since and since != version else None
+    dashboard_snapshots.remember(user_email, version, sections)
+    if previous is not None:
+        dashboard_snapshots.served(delta=True)
+        return json_response({
+            **totals,
+            "delta": True,
+            "since": since,
+            "version": version,
+            "portfolio": row_delta(previous["portfolio"], sections["portfolio"], payload["portfolio"]),
+            "watchlist": row_delta(previous["watchlist"], sections["watchlist"], payload["watchlist"])
+        }, etag=version)
+    
+    dashboard_snapshots.served(delta=False)
+    return json_response({**payload, "delta": False, "version": version}, etag=version, client_version=since)
+
+# Yahoo symbol forms the US symbol directory doesn't cover: exchange suffixes (SHOP.TO), ^GSPC, BTC-USD, EURUSD=X
+UPSTREAM_SYMBOL_RE = re.compile(r"[.^=]|-[A-Z]{3}$")
+
+@portfolio_bp.route('/api/watchlist/add', methods=['POST'])
+@jwt_required()
+def add_to_watchlist():
+    user_email = get_jwt_identity()
+    data = request.get_json()
+    
+    # Validate input
+    if not data or not data.get('symbol'):
+        return jsonify({"error": "Stock symbol is required"}), 400
+    
+    symbol = data['symbol'].upper()
+    
+    # Check if symbol is valid - symbols in the local index need no upstream lookup. Others
+    # (foreign listings, indices, crypto, or anything while only the bundled snapshot is
+    # loaded) are looked up upstream; once the full directory is loaded, plain US-style
+    # symbols missing from it are rejected locally.
+    if symbol not in symbol_index:
+        invalid = {
+            "error": f"Invalid stock symbol: {symbol}",
+            "suggestions": symbol_index.search(symbol, limit=5)
+        }
+        if symbol_index.complete and not UPSTREAM_SYMBOL_RE.search(symbol):
+            return jsonify(invalid), 400
+        try:
+            info = quote_cache.get(symbol, "profile")
+            if not info or 'symbol' not in info:
+                return jsonify(invalid), 400
+        except Exception as e:
+            return jsonify({"error": f"Error validating symbol: {str(e)}"}), 400
+    
+    # Add to watchlist if not already there
+    result = watchlists_collection.update_one(
+        {"user_email": user_email, "stocks": {"$ne": symbol}},
+        {
+            "$push": {"stocks": symbol},
+            "$set": {"updated_at": datetime.now()}
+        }
+    )
+    
+    if result.modified_count == 0:
+        return jsonify({"message": f"Stock {symbol} already in watchlist"}), 200
+    
+    return jsonify({"message": f"Stock {symbol} added to watchlist"}), 200
+
+@portfolio_bp.route('/api/watchlist/remove', methods=['POST'])
+@jwt_required()
+def remove_from_watchlist():
+    user_email = get_jwt_identity()
+    data = request.get_json()
+    
+    # Validate input
+    if not data or not data.get('symbol'):
+        return jsonify({"error": "Stock symbol is required"}), 400
+    
+    symbol = data['symbol'].upper()
+    
+    watchlists_collection.update_one(
+        {"user_email": user_email},
+        {
+            "$pull": {"stocks": symbol},
+            "$set": {"updated_at": datetime.now()}
+        }
+    )
+    
+    return jsonify({"message": f"Stock {symbol} removed from watchlist"}), 200
+
+# Symbol autocomplete
+MAX_SYMBOL_RESULTS = 25
+
+@portfolio_bp.route('/api/symbols/search', methods=['GET'])
+def search_symbols():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"results": []}), 200
+    try:
+        limit = min(int(request.args.get('limit', 10)), MAX_SYMBOL_RESULTS)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify({"results": symbol_index.search(query, limit=limit)}), 200
+
+# Price history for charts - served from the local OHLCV store and downsampled to the chart width
+MAX_HISTORY_SYMBOLS = 20
+MAX_HISTORY_POINTS = 5000
+HISTORY_SYMBOL_RE = re.compile(r"^[A-Z0-9.^=-]{1,15}$")
+
+def history_series(symbol, bars, period, points, mode):
+    bars = slice_range(bars, period)
+    source_points = len(bars["date"])
+    if mode == "ohlc":
+        bars = bucket_ohlc(bars, points)
+        fields = ("open", "high", "low", "close")
+    else:
+        keep = lttb(bars["date"].astype("int64"), bars["close"], points)
+        bars = {"date": bars["date"][keep], "close": bars["close"][keep], "volume": bars["volume"][keep]}
+        fields = ("close",)
+    series = {
+        "symbol": symbol,
+        "range": period,
+        "interval": "1d",
+        "source_points": source_points,
+        "points": len(bars["date"]),
+        "dates": bars["date"].astype(str).tolist(),
+        "volume": bars["volume"].astype("int64").tolist(),
+    }
+    for field in fields:
+        series[field] = bars[field].round(4).tolist()
+    return series
+
+def history_args():
+    """(range, mode, points) from the query string; raises ValueError on bad input."""
+    period = request.args.get('range', '1y')
+    if period not in RANGES:
+        raise ValueError(f"Unsupported range: {period}")
+    mode = request.args.get('mode', 'line')
+    if mode not in ('line', 'ohlc'):
+        raise ValueError(f"Unsupported mode: {mode}")
+    try:
+        points = int(request.args.get('points', 500))
+    except ValueError:
+        raise ValueError("points must be an integer")
+    return period, mode, max(3, min(points, MAX_HISTORY_POINTS))
+
+@portfolio_bp.route('/api/history/<symbol>', methods=['GET'])
+@jwt_required()
+def get_price_history(symbol):
+    symbol = symbol.upper()
+    if not HISTORY_SYMBOL_RE.match(symbol):
+        return jsonify({"error": f"Invalid stock symbol: {symbol}"}), 400
+    try:
+        period, mode, points = history_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        bars = ohlcv_store.get(symbol)
+    except Exception as e:
+        return jsonify({"error": f"Error fetching price history: {str(e)}"}), 502
+    if bars is None:
+        return jsonify({"error": f"No price history for {symbol}"}), 404
+    
+    response = jsonify(history_series(symbol, bars, period, points, mode))
+    response.headers['Cache-Control'] = 'private, max-age=60'
+    return response, 200
+
+@portfolio_bp.route('/api/history', methods=['GET'])
+@jwt_required()
+def get_price_histories():
+    # Several symbols (e.g. a comparison chart) in one request and, when stale, one batched download
+    symbols = list(dict.fromkeys(s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()))
+    if not symbols:
+        return jsonify({"error": "At least one symbol is required"}), 400
+    if len(symbols) > MAX_HISTORY_SYMBOLS:
+        return jsonify({"error": f"At most {MAX_HISTORY_SYMBOLS} symbols per request"}), 400
+    invalid = [symbol for symbol in symbols if not HISTORY_SYMBOL_RE.match(symbol)]
+    if invalid:
+        return jsonify({"error": f"Invalid stock symbol: {invalid[0]}"}), 400
+    try:
+        period, mode, points = history_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        history = ohlcv_store.get_many(symbols)
+    except Exception as e:
+        return jsonify({"error": f"Error fetching price history: {str(e)}"}), 502
+    
+    response = jsonify({
+        "series": [
+            history_series(symbol, history[symbol], period, points, mode)
+            for symbol in symbols if history[symbol] is not None
+        ],
+        "missing": [symbol for symbol in symbols if history[symbol] is None]
+    })
+    response.headers['Cache-Control'] = 'private, max-age=60'
+    return response, 200
+
+# Real-time price stream
+PRICE_STREAM_HEARTBEAT = 15
+PRICE_STREAM_TOKEN_TTL = timedelta(seconds=int(os.environ.get('PRICE_STREAM_TOKEN_TTL', 60)))
+MAX_STREAM_SYMBOLS = int(os.environ.get('PRICE_STREAM_MAX_SYMBOLS', 500))
+
+@portfolio_bp.route('/api/stream/token', methods=['POST'])
+@jwt_required()
+def create_stream_token():
+    # EventSource can't set headers, so the stream takes this short-lived token as ?jwt= instead of the access token
+    token = create_access_token(
+        identity=get_jwt_identity(),
+        expires_delta=PRICE_STREAM_TOKEN_TTL,
+        additional_claims={"scope": "portfolio.stream_prices"}
+    )
+    return jsonify({"token": token, "expires_in": int(PRICE_STREAM_TOKEN_TTL.total_seconds())}), 200
+
+@portfolio_bp.route('/api/stream/prices', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_prices():
+    user_email = get_jwt_identity()
+    if get_jwt_request_location() == 'query_string' and get_jwt().get('scope') != request.endpoint:
+        return jsonify({"error": "Use a stream token from /api/stream/token in the URL"}), 401
+    
+    # Explicit ?symbols=AAPL,MSFT, otherwise everything on the user's watchlist and portfolio
+    if request.args.get('symbols'):
+        symbols = {s.strip().upper() for s in request.args['symbols'].split(',') if s.strip()}
+        invalid = sorted(symbol for symbol in symbols if not HISTORY_SYMBOL_RE.match(symbol))
+        if invalid:
+            return jsonify({"error": f"Invalid stock symbol: {invalid[0]}"}), 400
+    else:
+        watchlist = watchlists_collection.find_one({"user_email": user_email}, {"stocks": 1}) or {}
+        portfolio = portfolios_collection.find_one({"user_email": user_email}, {"stocks.symbol": 1}) or {}
+        symbols = set(watchlist.get('stocks', [])) | {stock['symbol'] for stock in portfolio.get('stocks', [])}
+    if not symbols:
+        return jsonify({"error": "No symbols to stream"}), 400
+    if len(symbols) > MAX_STREAM_SYMBOLS:
+        return jsonify({"error": f"At most {MAX_STREAM_SYMBOLS} symbols per stream"}), 400
+    
+    try:
+        subscription = price_hub.subscribe(symbols, owner=user_email)
+    except StreamLimitReached as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": str(PRICE_STREAM_HEARTBEAT)}
+    
+    def generate():
+        try:
+            yield f"event: subscribed\ndata: {json.dumps(sorted(subscription.symbols))}\n\n"
+            while True:
+                updates = subscription.get(timeout=PRICE_STREAM_HEARTBEAT)
+                if not updates:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: prices\ndata: {json.dumps(updates)}\n\n"
+        finally:
+            price_hub.unsubscribe(subscription)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
@@ -0,0 +1,139 @@
+# server/price_stream.py
+import threading
+import time
+
+# Quote fields pushed to clients; a symbol is re-sent only when one of these changes
+STREAM_FIELDS = {
+    "price": lambda info: info.get('regularMarketPrice', info.get('currentPrice')),
+    "price_change": lambda info: info.get('regularMarketChange'),
+    "price_change_percent": lambda info: info.get('regularMarketChangePercent'),
+}
+
+
+class StreamLimitReached(Exception):
+    """Raised when a new subscription would exceed the hub's connection limits."""
+
+
+class Subscription:
+    """A client's view of the hub: the latest pending update per symbol.
+
+    Updates are coalesced rather than queued, so a slow client only ever
+    receives the newest price for each symbol instead of a growing backlog.
+    """
+
+    def __init__(self, symbols, owner=None):
+        self.symbols = frozenset(symbols)
+        self.owner = owner
+        self._pending = {}
+        self._changed = threading.Condition()
+
+    def push(self, updates):
+        with self._changed:
+            self._pending.update(updates)
+            self._changed.notify()
+
+    def get(self, timeout=None):
+        """Wait for updates; returns `{symbol: snapshot}` (empty on timeout)."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._pending, timeout=timeout)
+            updates, self._pending = self._pending, {}
+        return updates
+
+
+class PriceHub:
+    """Shares one upstream poll per symbol across every connected client.
+
+    A single background thread polls the union of all subscribed symbols
+    every `interval` seconds through `fetch_many(symbols, deadline)` and fans
+    out only the symbols whose price fields changed, and only to the
+    subscriptions that include them. The poller starts with the first
+    subscriber and stops when the last one leaves.
+
+    Every open stream holds a server thread for as long as it is
+    connected, so at most `max_subscribers` streams are open per process
+    and `max_per_owner` per user; beyond that `subscribe` raises
+    `StreamLimitReached`.
+    """
+
+    def __init__(self, fetch_many, interval=15, max_subscribers=4, max_per_owner=2):
+        self._fetch_many = fetch_many
+        self._interval = interval
+        self._max_subscribers = max_subscribers
+        self._max_per_owner = max_per_owner
+        self._subscriptions = set()
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.polls = 0
+        self.rejected = 0
+
+    def subscribe(self, symbols, owner=None):
+        subscription = Subscription((s.upper() for s in symbols), owner)
+        with self._lock:
+            if len(self._subscriptions) >= self._max_subscribers:
+                self.rejected += 1
+                raise StreamLimitReached("Too many open price streams, try again later")
+            if owner is not None and sum(s.owner == owner for s in self._subscriptions) >= self._max_per_owner:
+                self.rejected += 1
+                raise StreamLimitReached(f"At most {self._max_per_owner} open price streams per user")
+            self._subscriptions.add(subscription)
+            known = {s: self._snapshots[s] for s in subscription.symbols if s in self._snapshots}
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._poll_loop, name="price-hub", daemon=True)
+                self._thread.start()
+        # New clients get the current picture straight away
+        if known:
+            subscription.push(known)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscriptions),
+                "max_subscribers": self._max_subscribers,
+                "symbols": len(set().union(*(s.symbols for s in self._subscriptions))) if self._subscriptions else 0,
+                "polls": self.polls,
+                "rejected": self.rejected,
+            }
+
+    def _poll_loop(self):
+        while True:
+            with self._lock:
+                if not self._subscriptions:
+                    self._thread = None
+                    return
+                symbols = set().union(*(s.symbols for s in self._subscriptions))
+
+            started = time.monotonic()
+            try:
+                self._poll(symbols)
+            except Exception as e:
+                print(f"Price hub poll failed: {e}")
+            time.sleep(max(0.0, self._interval - (time.monotonic() - started)))
+
+    def _poll(self, symbols):
+        quotes = self._fetch_many(symbols, self._interval)
+        self.polls += 1
+
+        changed = {}
+        with self._lock:
+            for symbol, (info, status) in quotes.items():
+                if info is None:
+                    continue
+                fields = {name: field(info) for name, field in STREAM_FIELDS.items()}
+                previous = self._snapshots.get(symbol, {})
+                if any(previous.get(name) != value for name, value in fields.items()):
+                    self._snapshots[symbol] = {**fields, "quote_status": status, "at": time.time()}
+                    changed[symbol] = self._snapshots[symbol]
+            subscriptions = list(self._subscriptions)
+
+        if not changed:
+            return
+        for subscription in subscriptions:
+            updates = {s: changed[s] for s in subscription.symbols if s in changed}
+            if updates:
+                subscription.push(updates)
@@ -0,0 +1,260 @@
+# server/quote_cache.py
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+def current_price_from(info, default=None):
+    return info.get('regularMarketPrice', info.get('currentPrice', default))
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key onto a single execution.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is still running wait for it and receive the same result (or exception).
+    """
+
+    class _Call:
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+
+class SharedQuotes:
+    """The latest quote payload per symbol in a MongoDB collection, shared by every worker and host."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def load(self, symbol):
+        """`(info, age_seconds)` of the shared copy, or `(None, None)`."""
+        doc = self._collection.find_one({"_id": symbol})
+        if doc is None:
+            return None, None
+        return doc["info"], max(0.0, time.time() - doc["fetched_at"])
+
+    def ages(self, symbols):
+        """`{symbol: age_seconds}` for the symbols that have a shared copy."""
+        now = time.time()
+        return {
+            doc["_id"]: max(0.0, now - doc["fetched_at"])
+            for doc in self._collection.find({"_id": {"$in": list(symbols)}}, {"fetched_at": 1})
+        }
+
+    def save(self, symbol, info):
+        self._collection.replace_one({"_id": symbol}, {"_id": symbol, "info": info, "fetched_at": time.time()}, upsert=True)
+
+
+class QuoteCache:
+    """Process-wide cache of `yf.Ticker(symbol).info` payloads.
+
+    A single upstream fetch returns both fast-moving price fields and slow
+    company profile fields, so entries are stored once per symbol and the
+    caller decides how old a payload may be by asking for a `kind`:
+    "price" reads use a short TTL, "profile" reads a long one.
+
+    With `shared` (a `SharedQuotes`), every upstream fetch is also written
+    there, and a local miss first takes the shared copy if it is young
+    enough, so a payload fetched by one worker (or the background
+    refresher) serves all of them.
+    """
+
+    DEFAULT_TTLS = {
+        "price": 30,        # seconds
+        "profile": 86400,   # one day
+    }
+
+    def __init__(self, fetcher, max_size=1000, ttls=None, max_workers=8, shared=None):
+        self._fetcher = fetcher
+        self._shared = shared
+        self._max_size = max_size
+        self._ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self._entries = OrderedDict()  # symbol -> (fetched_at, info)
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quote-fetch")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fetch_errors = 0
+        self.stale_served = 0
+        self.shared_hits = 0
+
+    def get(self, symbol, kind="price"):
+        """Return the info dict for `symbol`, fetching it if the cached copy is too old for `kind`."""
+        symbol = symbol.upper()
+        ttl = self._ttls[kind]
+
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None and time.monotonic() - entry[0] < ttl:
+                self._entries.move_to_end(symbol)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        try:
+            return self._flight.do(symbol, lambda: self._load(symbol, max_age=ttl))
+        except Exception:
+            # Upstream failing (or its circuit open): an old payload beats an error
+            info, _ = self.peek(symbol)
+            if info is None:
+                raise
+            with self._lock:
+                self.stale_served += 1
+            return info
+
+    def get_many(self, symbols, kind="price", deadline=None):
+        """Resolve many symbols at once, fetching misses concurrently on a bounded pool.
+
+        Returns `{symbol: (info, status)}` where status is "fresh", "stale"
+        (the fetch missed `deadline` seconds or failed, so the last cached
+        payload is returned) or "missing" (nothing usable, info is None).
+        Symbols still fetching when the deadline passes keep running in the
+        background and populate the cache for the next request.
+        """
+        results = {}
+        futures = {}
+        for symbol in dict.fromkeys(s.upper() for s in symbols):
+            info, age = self.peek(symbol)
+            if info is not None and age < self._ttls[kind]:
+                with self._lock:
+                    self.hits += 1
+                results[symbol] = (info, "fresh")
+            else:
+                # Run in the caller's context so request-scoped tracing sees the fetch
+                futures[self._pool.submit(contextvars.copy_context().run, self.get, symbol, kind)] = symbol
+
+        done, _ = wait(futures, timeout=deadline)
+        for future, symbol in futures.items():
+            if future in done and future.exception() is None:
+                results[symbol] = (future.result(), "fresh")
+                continue
+            info, _ = self.peek(symbol)
+            results[symbol] = (info, "stale") if info is not None else (None, "missing")
+        return results
+
+    def refresh(self, symbol):
+        """Fetch `symbol` now regardless of age (background refreshers use this to keep entries warm)."""
+        symbol = symbol.upper()
+        return self._flight.do(symbol, lambda: self._load(symbol))
+
+    def peek(self, symbol):
+        """Return `(info, age_seconds)` for a cached symbol without fetching, or `(None, None)`."""
+        with self._lock:
+            entry = self._entries.get(symbol.upper())
+        if entry is None:
+            return None, None
+        return entry[1], time.monotonic() - entry[0]
+
+    def ages(self, symbols):
+        """`{symbol: age_seconds}` of the youngest local or shared copy, None where neither exists."""
+        ages = {}
+        if self._shared is not None:
+            try:
+                ages = self._shared.ages([s.upper() for s in symbols])
+            except Exception as e:
+                print(f"Shared quote lookup failed: {e}")
+        result = {}
+        for symbol in symbols:
+            symbol = symbol.upper()
+            local = self.peek(symbol)[1]
+            known = [age for age in (local, ages.get(symbol)) if age is not None]
+            result[symbol] = min(known) if known else None
+        return result
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(symbol.upper(), None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "fetch_errors": self.fetch_errors,
+                "stale_served": self.stale_served,
+                "shared_hits": self.shared_hits,
+                "ttls": dict(self._ttls),
+            }
+
+    def _load(self, symbol, max_age=None):
+        """Fetch `symbol` upstream, or take the shared copy if it is younger than `max_age`."""
+        if self._shared is not None and max_age is not None:
+            try:
+                info, age = self._shared.load(symbol)
+            except Exception as e:
+                print(f"Shared quote lookup failed for {symbol}: {e}")
+                info = None
+            if info is not None and age < max_age:
+                with self._lock:
+                    self.shared_hits += 1
+                self._store(symbol, info, age)
+                return info
+
+        try:
+            info = self._fetcher(symbol) or {}
+        except Exception:
+            with self._lock:
+                self.fetch_errors += 1
+            raise
+
+        self._store(symbol, info, 0.0)
+        if self._shared is not None:
+            try:
+                self._shared.save(symbol, info)
+            except Exception as e:
+                print(f"Shared quote write failed for {symbol}: {e}")
+        return info
+
+    def _store(self, symbol, info, age):
+        with self._lock:
+            self._entries[symbol] = (time.monotonic() - age, info)
+            self._entries.move_to_end(symbol)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
@@ -0,0 +1,165 @@
+# server/recommendation_parser.py
+import json
+import re
+
+ACTIONS = {"buy": "Buy", "hold": "Hold", "sell": "Sell"}
+TIME_HORIZONS = {"short": "Short-term", "medium": "Medium-term", "mid": "Medium-term", "long": "Long-term"}
+RISK_LEVELS = {"low": "Low", "medium": "Medium", "moderate": "Medium", "high": "High"}
+
+# Markdown decoration that can surround a label ("**Recommendation:**", "1. Target Price -")
+_PREFIX = r"^[\s>#*_\-\d.)]*"
+_SEPARATOR = r"[*_\s]*[:\-–—][*_\s]*"
+
+ACTION_LINE_RE = re.compile(_PREFIX + r"(?:investment\s+|final\s+)?recommendation[^:\-–—\n]*?" + _SEPARATOR + r"(.*)$", re.IGNORECASE)
+ACTION_HEADING_RE = re.compile(_PREFIX + r"(?:investment\s+|final\s+)?recommendation[*_\s]*:?[*_\s]*$", re.IGNORECASE)
+ACTION_WORD_RE = re.compile(r"\b(?:strong\s+)?(buy|hold|sell)\b", re.IGNORECASE)
+TARGET_LINE_RE = re.compile(_PREFIX + r"(?:12[\s-]month\s+)?target\s+price(?:\s+range)?[^:\-–—\n]*?" + _SEPARATOR + r"(.*)$", re.IGNORECASE)
+PRICE_RE = re.compile(r"\$?\s*(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)")
+HORIZON_LINE_RE = re.compile(_PREFIX + r"(?:recommended\s+)?(?:time\s*frame|time\s+horizon)[^:\-–—\n]*?" + _SEPARATOR + r"(.*)$", re.IGNORECASE)
+# "Long-term", "medium term" or just "Long"; a "short" or "long" elsewhere on a timeframe line isn't a horizon
+HORIZON_WORD_RE = re.compile(r"\b(short|medium|mid|long)(?:[\s-]*term\b|[\s*_.]*$)", re.IGNORECASE)
+RISK_LINE_RE = re.compile(_PREFIX + r"risk(?:\s+level|\s+assessment|\s+rating)?" + _SEPARATOR + r"(.*)$", re.IGNORECASE)
+RISK_WORD_RE = re.compile(r"\b(low|medium|moderate|high)\b", re.IGNORECASE)
+JSON_BLOCK_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL | re.IGNORECASE)
+
+# Appended to the investment advisor's task so its output can be validated instead of guessed at
+RECOMMENDATION_JSON_INSTRUCTIONS = """
+        Finish your answer with a fenced ```json block matching exactly this schema:
+        {"action": "Buy" | "Hold" | "Sell",
+         "target_price_low": number, "target_price_high": number,
+         "time_horizon": "Short-term" | "Medium-term" | "Long-term",
+         "risk_level": "Low" | "Medium" | "High"}
+"""
+
+
+def validate_recommendation(data):
+    """Validate a JSON recommendation block; return the normalized fields or None if unusable."""
+    if not isinstance(data, dict):
+        return None
+    action = ACTIONS.get(str(data.get("action", "")).strip().lower())
+    if not action:
+        return None
+
+    result = {"action": action}
+    low, high = data.get("target_price_low"), data.get("target_price_high")
+    prices = [float(p) for p in (low, high) if isinstance(p, (int, float)) and not isinstance(p, bool) and p > 0]
+    if prices:
+        result["target_price"] = min(prices)
+        if len(prices) == 2:
+            result["target_price_range"] = sorted(prices)
+    horizon = HORIZON_WORD_RE.search(str(data.get("time_horizon", "")))
+    if horizon:
+        result["time_horizon"] = TIME_HORIZONS[horizon.group(1).lower()]
+    risk = RISK_WORD_RE.search(str(data.get("risk_level", "")))
+    if risk:
+        result["risk_level"] = RISK_LEVELS[risk.group(1).lower()]
+    return result
+
+
+class RecommendationParser:
+    """Single-pass, incremental extraction of the structured recommendation.
+
+    Feed the crew output in chunks as it arrives; complete lines are parsed
+    immediately, so `result` fills in as soon as each labelled line
+    ("Recommendation:", "Target Price:", "Time Horizon:", "Risk Level:") has
+    been seen. The first occurrence of each label wins. A fenced JSON block
+    that validates overrides the text-derived fields.
+    """
+
+    def __init__(self):
+        self.result = {}
+        self._text_fields = {}
+        self._json_fields = None
+        self._pending = ""
+        self._full_text = []
+        self._expect_action = False
+        # End of the previous chunk, so a fence split across two chunks is still noticed
+        self._tail = ""
+
+    def feed(self, chunk):
+        self._full_text.append(chunk)
+        lines = (self._pending + chunk).split("\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._parse_line(line)
+        if "```" in self._tail + chunk:
+            self._parse_json("".join(self._full_text))
+        self._tail = (self._tail + chunk)[-2:]
+        self._update_result()
+        return self.result
+
+    def close(self):
+        if self._pending:
+            self._parse_line(self._pending)
+            self._pending = ""
+        self._parse_json("".join(self._full_text))
+        self._update_result()
+        return self.result
+
+    def _parse_line(self, line):
+        fields = self._text_fields
+        if not line.strip():
+            return
+
+        if self._expect_action:
+            self._expect_action = False
+            match = ACTION_WORD_RE.search(line)
+            if match and "action" not in fields:
+                fields["action"] = ACTIONS[match.group(1).lower()]
+                return
+
+        if "action" not in fields:
+            if ACTION_HEADING_RE.match(line):
+                self._expect_action = True
+                return
+            match = ACTION_LINE_RE.match(line)
+            if match:
+                word = ACTION_WORD_RE.search(match.group(1))
+                if word:
+                    fields["action"] = ACTIONS[word.group(1).lower()]
+                else:
+                    self._expect_action = not match.group(1).strip()
+                return
+
+        if "target_price" not in fields:
+            match = TARGET_LINE_RE.match(line)
+            if match:
+                prices = [float(p.replace(",", "")) for p in PRICE_RE.findall(match.group(1))[:2]]
+                if prices:
+                    fields["target_price"] = prices[0]
+                    if len(prices) == 2:
+                        fields["target_price_range"] = sorted(prices)
+                return
+
+        if "time_horizon" not in fields:
+            match = HORIZON_LINE_RE.match(line)
+            if match:
+                word = HORIZON_WORD_RE.search(match.group(1))
+                if word:
+                    fields["time_horizon"] = TIME_HORIZONS[word.group(1).lower()]
+                return
+
+        if "risk_level" not in fields:
+            match = RISK_LINE_RE.match(line)
+            if match:
+                word = RISK_WORD_RE.search(match.group(1))
+                if word:
+                    fields["risk_level"] = RISK_LEVELS[word.group(1).lower()]
+
+    def _parse_json(self, text):
+        for block in JSON_BLOCK_RE.findall(text):
+            try:
+                validated = validate_recommendation(json.loads(block))
+            except ValueError:
+                continue
+            if validated:
+                self._json_fields = validated
+
+    def _update_result(self):
+        self.result = {**self._text_fields, **(self._json_fields or {})}
+
+
+def parse_recommendation(text):
+    parser = RecommendationParser()
+    parser.feed(text)
+    return parser.close()
@@ -0,0 +1,228 @@
+# server/resilience.py
+"""Rate limiting, retries and circuit breaking for upstream data providers (yfinance, DuckDuckGo)."""
+import random
+import re
+import threading
+import time
+
+
+class UpstreamUnavailable(Exception):
+    """Raised without calling the provider, because its circuit is open or its rate budget is exhausted."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursting up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until `tokens` are available; returns False if `timeout` passes first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and fails fast for `reset_timeout` seconds.
+
+    After the timeout one trial call is let through (half-open); its
+    success closes the circuit again, its failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.opened = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """Give back a half-open trial that never reached the provider."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+def is_throttle_error(error):
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in ("429", "too many requests", "rate limit", "ratelimit", "ratelimited"))
+
+
+_TRANSIENT_MARKERS = (
+    "timeout", "timed out", "connection", "temporarily unavailable", "service unavailable",
+    "bad gateway", "gateway time", "internal server error",
+)
+_SERVER_ERROR_RE = re.compile(r"\b5\d\d\b")
+
+
+def is_transient_error(error):
+    """Whether a failed call is worth retrying: network errors, timeouts, throttling and 5xx responses.
+
+    Anything else (no data for a symbol, an invalid ticker, a parse error)
+    fails the same way on every attempt and says nothing about the
+    provider's health.
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)) or is_throttle_error(error):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status >= 500
+    if isinstance(error, OSError):  # socket errors; requests' exceptions derive from it too
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in _TRANSIENT_MARKERS) or bool(_SERVER_ERROR_RE.search(text))
+
+
+class UpstreamGuard:
+    """Wraps every call to one provider with a token-bucket rate limit, retries and a circuit breaker.
+
+    `call(fn)` waits up to `max_wait` seconds for rate budget, then runs
+    `fn`, retrying transient failures (see `is_transient_error`) up to
+    `max_retries` times with jittered exponential backoff. Other errors are
+    raised straight away and don't count against the provider. A call whose
+    retries all failed counts as one circuit-breaker failure, and calls are
+    rejected with `UpstreamUnavailable` while the circuit is open so callers
+    can fall back to cached data. `observer(name, operation, seconds,
+    outcome)` is told the duration of every attempt that reached the
+    provider.
+    """
+
+    def __init__(self, name, rate, capacity=None, max_wait=5.0, max_retries=2,
+                 backoff_base=0.5, backoff_max=8.0, breaker=None, observer=None, transient=is_transient_error):
+        self.name = name
+        self.bucket = TokenBucket(rate, capacity)
+        self.breaker = breaker or CircuitBreaker()
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._observer = observer
+        self._transient = transient
+        self._lock = threading.Lock()
+        self._counters = {
+            "calls": 0,
+            "failures": 0,
+            "retries": 0,
+            "throttled": 0,        # provider told us to slow down (HTTP 429 etc.)
+            "rate_limited": 0,     # our own budget ran out before the call was made
+            "short_circuited": 0,  # rejected because the breaker was open
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.5)
+
+    def call(self, fn, *args, **kwargs):
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise UpstreamUnavailable(f"{self.name} circuit is open")
+
+        for attempt in range(self.max_retries + 1):
+            if not self.bucket.acquire(timeout=self.max_wait):
+                self._count("rate_limited")
+                if attempt:
+                    # Out of budget for another retry: the call failed
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release()
+                raise UpstreamUnavailable(f"{self.name} rate budget exhausted")
+
+            self._count("calls")
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                throttled = is_throttle_error(e)
+                self._observe(fn, started, "throttled" if throttled else "error")
+                self._count("failures")
+                if throttled:
+                    self._count("throttled")
+                if not self._transient(e):
+                    # The provider answered; the request itself is bad (e.g. an unknown symbol)
+                    self.breaker.record_success()
+                    raise
+                if attempt == self.max_retries:
+                    self.breaker.record_failure()
+                    raise
+                self._count("retries")
+                time.sleep(self.backoff(attempt))
+                continue
+            self._observe(fn, started, "ok")
+            self.breaker.record_success()
+            return result
+
+    def _observe(self, fn, started, outcome):
+        if self._observer is None:
+            return
+        operation = getattr(fn, "__name__", "call")
+        self._observer(self.name, "call" if operation == "<lambda>" else operation, time.perf_counter() - started, outcome)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        return {**counters, "circuit": self.breaker.state, "circuit_opened": self.breaker.opened}
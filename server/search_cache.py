@@ -0,0 +1,139 @@
+# server/search_cache.py
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+from quote_cache import SingleFlight
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.&'][a-z0-9]+)*")
+
+# Words that don't change what a web search returns
+STOP_WORDS = frozenset({
+    "a", "an", "the", "of", "for", "and", "in", "on", "to", "about", "is", "are", "what", "latest", "recent",
+    "inc", "corp", "corporation", "co", "ltd", "plc", "llc",
+})
+
+
+class SearchBudgetExceeded(Exception):
+    """Raised when the current crew has used up its upstream search queries."""
+
+
+class SearchBudget:
+    """Upstream search queries allowed for one crew run, plus its company-name aliases.
+
+    `aliases` maps names the agents may use for the company ("Apple Inc")
+    to its symbol, so "Apple Inc earnings" and "AAPL earnings" share a
+    cache entry.
+    """
+
+    def __init__(self, limit, aliases=None):
+        self.limit = limit
+        self.used = 0
+        self.aliases = {}
+        for name, symbol in (aliases or {}).items():
+            tokens = tuple(t for t in _TOKEN_RE.findall(name.lower()) if t not in STOP_WORDS)
+            if tokens:
+                self.aliases[tokens] = symbol.lower()
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            if self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+
+_current_budget = ContextVar("search_budget", default=None)
+
+
+@contextmanager
+def search_budget(limit, aliases=None):
+    """Apply a query budget to every cached search made in this context (one crew run)."""
+    budget = SearchBudget(limit, aliases)
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+def normalize_query(query, aliases=None):
+    """Cache key for a search query: case, punctuation, word order, filler words and the current year are ignored."""
+    tokens = [t for t in _TOKEN_RE.findall(query.lower()) if t not in STOP_WORDS and t != str(datetime.now().year)]
+    for name, symbol in (aliases or {}).items():
+        i = 0
+        while i <= len(tokens) - len(name):
+            if tuple(tokens[i:i + len(name)]) == name:
+                tokens[i:i + len(name)] = [symbol]
+            i += 1
+    return " ".join(sorted(set(tokens))) or query.strip().lower()
+
+
+class SearchCache:
+    """Process-wide TTL/LRU cache of web search results keyed by normalized query.
+
+    Shared by every agent and every analysis. Identical queries that arrive
+    while one is in flight wait for it instead of going upstream again.
+    Only upstream queries count against the caller's `SearchBudget`; cache
+    hits are free. Failed searches are not cached.
+    """
+
+    def __init__(self, search, ttl=3600, max_size=1000):
+        self._search = search
+        self._ttl = ttl
+        self._max_size = max_size
+        self._entries = OrderedDict()  # key -> (fetched_at, result)
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.upstream_queries = 0
+        self.budget_exhausted = 0
+
+    def search(self, query):
+        budget = _current_budget.get()
+        key = normalize_query(query, budget.aliases if budget else None)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self._ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        if budget is not None and not self._flight.in_flight(key) and not budget.take():
+            with self._lock:
+                self.budget_exhausted += 1
+            raise SearchBudgetExceeded(f"search budget of {budget.limit} queries used up")
+        return self._flight.do(key, lambda: self._load(key, query))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "ttl": self._ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "upstream_queries": self.upstream_queries,
+                "budget_exhausted": self.budget_exhausted,
+            }
+
+    def _load(self, key, query):
+        with self._lock:
+            self.upstream_queries += 1
+        result = self._search(query)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+        return result
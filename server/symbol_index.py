@@ -0,0 +1,191 @@
+# server/symbol_index.py
+import bisect
+import csv
+import io
+import os
+import re
+import threading
+import time
+import urllib.request
+
+# Nasdaq Trader symbol directory: every Nasdaq-listed and other-exchange-listed US security
+NASDAQ_LISTED_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt"
+OTHER_LISTED_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt"
+OTHER_EXCHANGES = {"A": "NYSE American", "N": "NYSE", "P": "NYSE ARCA", "Z": "CBOE BZX", "V": "IEX"}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _to_yahoo(symbol):
+    # Share classes are "BRK.B" in the directory but "BRK-B" on Yahoo
+    return symbol.strip().upper().replace(".", "-").replace("$", "-P")
+
+
+def parse_symbol_directory(nasdaq_listed, other_listed):
+    """Rows of `(symbol, name, exchange)` from the two pipe-delimited directory files, test issues excluded."""
+    rows = []
+    for text, symbol_column, exchange_of in (
+        (nasdaq_listed, "Symbol", lambda row: "NASDAQ"),
+        (other_listed, "ACT Symbol", lambda row: OTHER_EXCHANGES.get(row.get("Exchange"), row.get("Exchange"))),
+    ):
+        lines = [line for line in text.splitlines() if line and not line.startswith("File Creation Time")]
+        for row in csv.DictReader(lines, delimiter="|"):
+            if row.get("Test Issue") == "Y" or not row.get(symbol_column):
+                continue
+            # "Apple Inc. - Common Stock" -> "Apple Inc."
+            name = row["Security Name"].split(" - ")[0].strip()
+            rows.append((_to_yahoo(row[symbol_column]), name, exchange_of(row)))
+    return rows
+
+
+class SymbolIndex:
+    """In-memory index of listed symbols and company names for validation and autocomplete.
+
+    Symbols are kept in one sorted array and the words of every company name
+    in another, so both exact lookups and prefix searches are a binary
+    search. The arrays are rebuilt off to the side and swapped in on refresh,
+    so readers never see a partial index.
+
+    The bundled snapshot only covers widely held symbols, so until a full
+    directory has been downloaded (`complete`) a symbol missing from the
+    index doesn't mean it isn't listed.
+    """
+
+    def __init__(self, snapshot_path, cache_path=None):
+        self._snapshot_path = snapshot_path
+        self._cache_path = cache_path
+        self._state = ([], [], [])  # sorted symbols, parallel (name, exchange), sorted (name word, symbol index)
+        self._stop = threading.Event()
+        self._thread = None
+        self.complete = False
+        self.refreshed = 0
+        self.refresh_errors = 0
+        self.load()
+
+    def load(self):
+        """Load the refreshed copy if one was saved, otherwise the bundled snapshot."""
+        path = self._snapshot_path
+        if self._cache_path and os.path.exists(self._cache_path):
+            path = self._cache_path
+        with open(path, newline="") as f:
+            self._build((row["symbol"], row["name"], row["exchange"]) for row in csv.DictReader(f))
+        self.complete = path != self._snapshot_path
+
+    def __len__(self):
+        return len(self._state[0])
+
+    def get(self, symbol):
+        symbols, details, _ = self._state
+        symbol = symbol.strip().upper()
+        i = bisect.bisect_left(symbols, symbol)
+        if i < len(symbols) and symbols[i] == symbol:
+            return {"symbol": symbol, "name": details[i][0], "exchange": details[i][1]}
+        return None
+
+    def __contains__(self, symbol):
+        return self.get(symbol) is not None
+
+    def search(self, query, limit=10):
+        """Symbols starting with `query` first (exact match, then shortest), then company-name word matches."""
+        symbols, details, words = self._state
+        query = query.strip()
+        if not query:
+            return []
+
+        prefix = query.upper()
+        matches = []
+        i = bisect.bisect_left(symbols, prefix)
+        while i < len(symbols) and symbols[i].startswith(prefix) and len(matches) < limit * 5:
+            matches.append(i)
+            i += 1
+        matches.sort(key=lambda j: (symbols[j] != prefix, len(symbols[j]), symbols[j]))
+
+        # Every word of the query must prefix-match some word of the name; the last word may be partial
+        query_words = _WORD_RE.findall(query.lower())
+        if query_words and len(matches) < limit:
+            seen = set(matches)
+            candidates = None
+            for word in query_words:
+                found = set()
+                j = bisect.bisect_left(words, (word,))
+                while j < len(words) and words[j][0].startswith(word):
+                    found.add(words[j][1])
+                    j += 1
+                candidates = found if candidates is None else candidates & found
+            for j in sorted(candidates - seen, key=lambda j: (len(details[j][0]), symbols[j])):
+                matches.append(j)
+
+        return [
+            {"symbol": symbols[j], "name": details[j][0], "exchange": details[j][1]}
+            for j in matches[:limit]
+        ]
+
+    def refresh(self, timeout=30):
+        """Download the current symbol directory, swap it in and save it as the local copy."""
+        texts = []
+        for url in (NASDAQ_LISTED_URL, OTHER_LISTED_URL):
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                texts.append(response.read().decode("utf-8", errors="replace"))
+        rows = parse_symbol_directory(*texts)
+        if len(rows) < len(self) // 2:
+            raise ValueError(f"symbol directory looks truncated ({len(rows)} rows)")
+        self._build(rows)
+        self.complete = True
+        if self._cache_path:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(["symbol", "name", "exchange"])
+            writer.writerows(sorted(rows))
+            tmp_path = f"{self._cache_path}.tmp"
+            with open(tmp_path, "w", newline="") as f:
+                f.write(buffer.getvalue())
+            os.replace(tmp_path, self._cache_path)
+        self.refreshed += 1
+        return len(rows)
+
+    def start(self, interval):
+        """Refresh from the symbol directory every `interval` seconds in the background."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,), name="symbol-index", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "symbols": len(self),
+            "complete": self.complete,
+            "refreshed": self.refreshed,
+            "refresh_errors": self.refresh_errors,
+        }
+
+    def _run(self, interval):
+        # Refresh right away unless a saved directory is still current (e.g. another worker just saved it)
+        wait = 0
+        if self._cache_path and os.path.exists(self._cache_path):
+            wait = max(0, interval - (time.time() - os.path.getmtime(self._cache_path)))
+        while not self._stop.wait(wait):
+            try:
+                self.refresh()
+                wait = interval
+            except Exception as e:
+                self.refresh_errors += 1
+                print(f"Symbol index refresh failed, keeping the current index: {e}")
+                # Retry sooner while only the partial snapshot is loaded
+                wait = interval if self.complete else min(interval, 900)
+
+    def _build(self, rows):
+        by_symbol = {}
+        for symbol, name, exchange in rows:
+            by_symbol.setdefault(symbol, (name, exchange))
+        symbols = sorted(by_symbol)
+        details = [by_symbol[symbol] for symbol in symbols]
+        words = sorted(
+            (word, i)
+            for i, (name, _) in enumerate(details)
+            for word in set(_WORD_RE.findall(name.lower()))
+        )
+        self._state = (symbols, details, words)
@@ -0,0 +1,67 @@
+# server/tests/test_agent_pool.py
+import threading
+import time
+
+import pytest
+
+from agent_pool import AgentPool, AgentPoolExhausted
+
+
+def make_pool(max_size=1, reset=None):
+    built = []
+
+    def factory():
+        built.append(object())
+        return built[-1]
+    return AgentPool(factory, max_size=max_size, reset=reset), built
+
+
+def test_sets_are_reused():
+    pool, built = make_pool()
+    with pool.checkout() as first:
+        pass
+    with pool.checkout() as second:
+        pass
+    assert first is second and len(built) == 1
+    assert pool.stats() == {"created": 1, "idle": 1, "max_size": 1, "reused": 1}
+
+
+def test_times_out_when_all_sets_are_busy():
+    pool, _ = make_pool()
+    with pool.checkout():
+        with pytest.raises(AgentPoolExhausted):
+            with pool.checkout(timeout=0.05):
+                pass
+
+
+def test_waiter_builds_a_replacement_when_a_run_raises():
+    pool, built = make_pool()
+    waiting = threading.Event()
+    got = []
+
+    def waiter():
+        waiting.set()
+        with pool.checkout(timeout=5) as agents:
+            got.append(agents)
+
+    with pytest.raises(RuntimeError):
+        with pool.checkout() as failed:
+            thread = threading.Thread(target=waiter)
+            thread.start()
+            waiting.wait()
+            time.sleep(0.05)  # let the waiter block on the busy pool
+            raise RuntimeError("crew failed")
+    thread.join(5)
+    assert not thread.is_alive()
+    assert got and got[0] is not failed and len(built) == 2
+    assert pool.stats()["created"] == 1
+
+
+def test_failed_reset_discards_the_set():
+    def reset(agents):
+        raise RuntimeError("reset failed")
+    pool, built = make_pool(reset=reset)
+    with pytest.raises(RuntimeError):
+        with pool.checkout():
+            pass
+    assert pool.stats()["created"] == 0 and pool.stats()["idle"] == 0
@@ -0,0 +1,123 @@
+# server/tests/test_analysis_jobs.py
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+
+from analysis_jobs import AnalysisJobManager, JobQueueFull, JobStore
+
+
+def fake_runner(symbol, emit):
+    for stage in ("data_collection", "analysis", "recommendation"):
+        emit("stage", {"stage": stage, "status": "running"})
+        emit("output", {"stage": stage, "text": f"{symbol} {stage}"})
+        emit("stage", {"stage": stage, "status": "completed"})
+    return {"symbol": symbol}
+
+
+def wait_for(manager, job_id, status="completed"):
+    deadline = time.monotonic() + 5
+    while manager.get(job_id)["status"] != status:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return manager.get(job_id)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_job_runs_and_records_progress(store):
+    manager = AnalysisJobManager(fake_runner, store)
+    job = manager.submit("aapl")
+    assert job["symbol"] == "AAPL" and job["status"] in ("queued", "running", "completed")
+
+    done = wait_for(manager, job["job_id"])
+    assert done["result"] == {"symbol": "AAPL"}
+    assert set(done["progress"].values()) == {"completed"}
+    assert manager.stats()["pending"] == 0
+    manager.shutdown()
+
+
+def test_events_replay_from_last_seen(store):
+    manager = AnalysisJobManager(fake_runner, store)
+    job_id = manager.submit("AAPL")["job_id"]
+    wait_for(manager, job_id)
+
+    events = list(manager.events(job_id))
+    assert [seq for seq, _, _ in events] == list(range(1, len(events) + 1))
+    assert events[-1][1:] == ("status", {"status": "completed"})
+    # A reconnecting client resumes after the last event it saw
+    assert list(manager.events(job_id, last_seq=events[-3][0])) == events[-2:]
+    manager.shutdown()
+
+
+def test_failed_runs_are_reported(store):
+    def failing(symbol, emit):
+        raise RuntimeError("no data")
+    manager = AnalysisJobManager(failing, store)
+    job = wait_for(manager, manager.submit("AAPL")["job_id"], "failed")
+    assert "no data" in job["error"]
+    manager.shutdown()
+
+
+def test_queue_is_bounded(store):
+    release = threading.Event()
+
+    def blocked(symbol, emit):
+        release.wait(5)
+        return {}
+    manager = AnalysisJobManager(blocked, store, max_workers=1, max_pending=2)
+    manager.submit("A")
+    manager.submit("B")
+    with pytest.raises(JobQueueFull):
+        manager.submit("C")
+    assert manager.stats()["rejected"] == 1
+    release.set()
+    manager.shutdown()
+
+
+def test_orphaned_jobs_are_claimed_once(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    dead = JobStore(path)
+    dead.owner = "gone-host:1"
+    job_id = dead.create("AAPL")
+
+    first, second = JobStore(path), JobStore(path)
+    second.owner = "other-host:2"
+    assert first.claim_orphaned() == [(job_id, "AAPL")]
+    # Now owned by a live process (the first store's), so nobody else takes it
+    assert second.claim_orphaned() == []
+    assert first.claim_orphaned() == []
+
+
+def test_stream_follows_a_job_run_by_another_process(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    runner_store, follower_store = JobStore(path), JobStore(path)
+    runner_store.owner = "elsewhere:1"
+    job_id = runner_store.create("AAPL")
+    follower = AnalysisJobManager(fake_runner, follower_store)
+
+    def run_elsewhere():
+        time.sleep(0.1)
+        runner_store.append_event(job_id, "output", {"text": "hello"})
+        runner_store.update(job_id, status="completed")
+
+    thread = threading.Thread(target=run_elsewhere)
+    thread.start()
+    started = time.monotonic()
+    events = list(follower.events(job_id, heartbeat=15, poll_interval=0.05))
+    thread.join()
+    assert events == [(1, "output", {"text": "hello"})]
+    assert time.monotonic() - started < 2
+
+
+def test_expired_finished_jobs_are_pruned(store):
+    manager = AnalysisJobManager(fake_runner, store, retention=timedelta(0))
+    job_id = manager.submit("AAPL")["job_id"]
+    wait_for(manager, job_id)
+    assert manager.prune(force=True) == 1
+    assert manager.get(job_id) is None
+    manager.shutdown()
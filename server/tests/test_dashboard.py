@@ -0,0 +1,53 @@
+# server/tests/test_dashboard.py
+from dashboard import DashboardSnapshots, row_delta, row_hashes
+
+
+def rows(*items):
+    return [{"symbol": symbol, "price": price} for symbol, price in items]
+
+
+def delta(old, new):
+    return row_delta(row_hashes(old), row_hashes(new), new)
+
+
+def apply(old, change):
+    # What the frontend does with a delta
+    by_symbol = {row["symbol"]: row for row in old}
+    for symbol in change["removed"]:
+        del by_symbol[symbol]
+    for row in change["changed"]:
+        by_symbol[row["symbol"]] = row
+    order = change.get("order") or list(by_symbol)
+    return [by_symbol[symbol] for symbol in order]
+
+
+def test_unchanged_rows_are_not_sent():
+    old = rows(("AAPL", 1), ("MSFT", 2))
+    assert delta(old, old) == {"changed": [], "removed": []}
+
+
+def test_changed_added_and_removed_rows():
+    old = rows(("AAPL", 1), ("MSFT", 2), ("NVDA", 3))
+    new = rows(("AAPL", 1), ("NVDA", 4), ("TSLA", 5))
+    change = delta(old, new)
+    assert change == {"changed": rows(("NVDA", 4), ("TSLA", 5)), "removed": ["MSFT"]}
+    assert apply(old, change) == new
+
+
+def test_order_only_sent_when_rearranged():
+    old = rows(("AAPL", 1), ("MSFT", 2))
+    new = rows(("MSFT", 2), ("AAPL", 1))
+    change = delta(old, new)
+    assert change["order"] == ["MSFT", "AAPL"]
+    assert apply(old, change) == new
+
+
+def test_snapshots_keep_the_last_versions_per_user():
+    snapshots = DashboardSnapshots(versions_per_user=2, max_users=1)
+    for version in ("v1", "v2", "v3"):
+        snapshots.remember("a@example.com", version, {"portfolio": version})
+    assert snapshots.get("a@example.com", "v1") is None
+    assert snapshots.get("a@example.com", "v3") == {"portfolio": "v3"}
+
+    snapshots.remember("b@example.com", "v1", {})
+    assert snapshots.get("a@example.com", "v3") is None
@@ -0,0 +1,101 @@
+# server/tests/test_market_refresher.py
+import time
+
+import mongomock
+import pytest
+
+from db import Lease
+from market_refresher import MarketRefresher, symbol_universe
+from quote_cache import QuoteCache, SharedQuotes
+
+
+class Budget:
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def acquire(self, timeout=None):
+        if self.tokens <= 0:
+            return False
+        self.tokens -= 1
+        return True
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+def make_refresher(universe, ages=None, tokens=100, **kwargs):
+    refreshed = []
+    refresher = MarketRefresher(
+        universe=lambda: universe,
+        refresh=refreshed.append,
+        budget=Budget(tokens),
+        ages=lambda symbols: ages or {},
+        **kwargs
+    )
+    return refresher, refreshed
+
+
+def test_symbol_universe_counts_holders(db):
+    db.watchlists.insert_many([{"stocks": ["AAPL", "msft"]}, {"stocks": ["AAPL"]}])
+    db.portfolios.insert_one({"stocks": [{"symbol": "MSFT"}, {"symbol": "NVDA"}]})
+    assert symbol_universe(db.watchlists, db.portfolios) == [("AAPL", 2), ("MSFT", 2), ("NVDA", 1)]
+
+
+def test_cycle_goes_oldest_first_and_skips_fresh_symbols():
+    universe = [("AAPL", 3), ("MSFT", 2), ("NVDA", 1), ("TSLA", 1)]
+    refresher, refreshed = make_refresher(universe, ages={"AAPL": 5, "MSFT": 100, "TSLA": 50}, max_age=30)
+    refresher._cycle(deadline=time.monotonic() + 1, interval=20)
+    # NVDA was never fetched, AAPL is still fresh at the next cycle
+    assert refreshed == ["NVDA", "MSFT", "TSLA"]
+    assert refresher.last_cycle["skipped"] == 1
+
+
+def test_cycle_stops_when_the_budget_runs_out():
+    universe = [("AAPL", 2), ("MSFT", 1), ("NVDA", 1)]
+    refresher, refreshed = make_refresher(universe, tokens=2)
+    refresher._cycle(deadline=time.monotonic(), interval=20)
+    assert refreshed == ["AAPL", "MSFT"]
+
+
+def test_only_the_lease_holder_refreshes(db):
+    first = Lease(db.leases, "market_refresher", ttl=60)
+    assert first.acquire() and first.acquire()
+
+    other = Lease(db.leases, "market_refresher", ttl=60)
+    other_owner = "elsewhere:1"
+    db.leases.update_one({"_id": "market_refresher"}, {"$set": {"owner": other_owner}})
+    assert not first.acquire()
+    assert other.holder() == other_owner
+
+    refresher, refreshed = make_refresher([("AAPL", 1)], lease=first)
+    assert not refresher._hold_lease(force=True)
+    assert refresher.stats()["leader"] is False
+
+    # The other holder's lease lapses and this process takes over
+    db.leases.update_one({"_id": "market_refresher"}, {"$set": {"expires_at": time.time() - 1}})
+    assert refresher._hold_lease(force=True)
+    first.release()
+    assert db.leases.count_documents({}) == 0
+
+
+def test_quotes_fetched_by_one_worker_serve_the_others(db):
+    shared = SharedQuotes(db.quotes)
+    calls = []
+
+    def fetch(symbol):
+        calls.append(symbol)
+        return {"regularMarketPrice": 100}
+
+    leader = QuoteCache(fetch, shared=shared)
+    worker = QuoteCache(fetch, shared=shared)
+    leader.refresh("AAPL")
+    assert worker.get("AAPL")["regularMarketPrice"] == 100
+    assert calls == ["AAPL"] and worker.stats()["shared_hits"] == 1
+    assert worker.ages(["AAPL", "MSFT"])["MSFT"] is None
+
+    # Too old for a price read: fetched upstream again
+    db.quotes.update_one({"_id": "AAPL"}, {"$set": {"fetched_at": time.time() - 600}})
+    QuoteCache(fetch, shared=shared).get("AAPL")
+    assert calls == ["AAPL", "AAPL"]
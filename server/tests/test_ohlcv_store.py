@@ -0,0 +1,138 @@
+# server/tests/test_ohlcv_store.py
+import time
+from datetime import date
+
+import numpy as np
+
+from ohlcv_store import OHLCVStore, bucket_ohlc, lttb, slice_range
+
+
+def lttb_reference(x, y, threshold):
+    """Straightforward LTTB, one bucket at a time."""
+    n = len(y)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = np.mean(x[next_start:next_end]), np.mean(y[next_start:next_end])
+        areas = [abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a])) for j in range(start, end)]
+        a = start + int(np.argmax(areas))
+        selected.append(a)
+    selected.append(n - 1)
+    return selected
+
+
+def bars(n):
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.normal(size=n))
+    return {
+        "date": np.arange(np.datetime64("2020-01-01"), np.datetime64("2020-01-01") + n),
+        "open": close - 0.5,
+        "high": close + 1,
+        "low": close - 1,
+        "close": close,
+        "volume": np.full(n, 10.0),
+    }
+
+
+def test_lttb_matches_reference():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 25) + np.random.default_rng(1).normal(scale=0.1, size=1000)
+    assert lttb(x, y, 100).tolist() == lttb_reference(x, y, 100)
+
+
+def test_lttb_keeps_endpoints_and_short_series():
+    y = np.arange(50, dtype=float)
+    kept = lttb(np.arange(50), y, 10)
+    assert len(kept) == 10 and kept[0] == 0 and kept[-1] == 49
+    assert lttb(np.arange(5), np.arange(5), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_bucket_ohlc_merges_candles():
+    data = bars(10)
+    merged = bucket_ohlc(data, 5)
+    assert len(merged["date"]) == 5
+    assert merged["open"][0] == data["open"][0]
+    assert merged["close"][0] == data["close"][1]
+    assert merged["high"][0] == max(data["high"][:2])
+    assert merged["low"][0] == min(data["low"][:2])
+    assert merged["volume"].sum() == data["volume"].sum()
+
+
+def test_slice_range():
+    data = bars(400)
+    sliced = slice_range(data, "1mo", today=date(2021, 2, 1))
+    assert sliced["date"][0] == np.datetime64("2021-01-01")
+    assert len(sliced["date"]) == len(sliced["close"]) == 34
+    assert slice_range(data, "ytd", today=date(2021, 2, 1))["date"][0] == np.datetime64("2021-01-01")
+    assert slice_range(data, "max") is data
+
+
+class FakeDownloads:
+    """Stands in for OHLCVStore._download: full histories and increments from `series`."""
+
+    def __init__(self, series):
+        self.series = series
+        self.calls = []
+
+    def __call__(self, symbols, start):
+        self.calls.append((tuple(symbols), start))
+        result = {}
+        for symbol in symbols:
+            bars = self.series.get(symbol)
+            if bars is None:
+                continue
+            keep = bars["date"] >= np.datetime64(start, "D") if start is not None else slice(None)
+            result[symbol] = {key: values[keep].copy() for key, values in bars.items()}
+        return result
+
+
+def make_store(tmp_path, series):
+    store = OHLCVStore(str(tmp_path), refresh_interval=3600)
+    store._download = FakeDownloads(series)
+    return store
+
+
+def test_store_extends_stale_history_incrementally(tmp_path):
+    data = bars(30)
+    store = make_store(tmp_path, {"AAPL": {key: values[:20] for key, values in data.items()}})
+    assert len(store.get("AAPL")["date"]) == 20
+
+    store._download.series["AAPL"] = data
+    store.get("AAPL")["fetched_at"] -= 7200
+    assert len(store.get("AAPL")["date"]) == 30
+    assert store._download.calls[-1][1] == data["date"][19].item()
+
+
+def test_failed_full_refetch_keeps_the_stored_bars(tmp_path):
+    data = bars(30)
+    store = make_store(tmp_path, {"AAPL": data})
+    stored = store.get("AAPL")
+    stored["fetched_at"] -= 7200
+
+    # The last bar changed (a re-adjustment), but the full refetch returns nothing
+    adjusted = bars(30)
+    adjusted["close"][-1] *= 2
+
+    def download(symbols, start):
+        store._download.calls.append((tuple(symbols), start))
+        if start is None:
+            return {}
+        return {"AAPL": {key: values[-1:] for key, values in adjusted.items()}}
+    download.calls = store._download.calls
+    store._download = download
+
+    served = store.get("AAPL")
+    assert served is not None and len(served["date"]) == 30
+    assert time.time() - served["fetched_at"] >= 3600  # still stale, so retried next time
+    assert store.stats()["full_refetches"] == 1
+
+
+def test_unknown_symbols_are_remembered(tmp_path):
+    store = make_store(tmp_path, {})
+    assert store.get("NOPE") is None
+    assert store.get("NOPE") is None
+    assert len(store._download.calls) == 1
+    assert store.stats()["misses_served"] == 1
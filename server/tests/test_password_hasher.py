@@ -0,0 +1,46 @@
+# server/tests/test_password_hasher.py
+import pytest
+
+from password_hasher import HasherBusy, PasswordHasher, hash_method
+
+# Cheap parameters keep the tests fast; the behaviour doesn't depend on the cost
+FAST = "pbkdf2:sha256:1000"
+
+
+def test_hash_and_verify_round_trip():
+    hasher = PasswordHasher(method=FAST, max_workers=0)
+    stored = hasher.hash("s3cret")
+    assert hash_method(stored) == FAST
+    assert hasher.verify(stored, "s3cret") == (True, False)
+    assert hasher.verify(stored, "wrong") == (False, False)
+    assert hasher.stats()["hashed"] == 1 and hasher.stats()["verified"] == 2
+
+
+def test_older_hashes_are_flagged_for_rehash():
+    old = PasswordHasher(method="pbkdf2:sha256:500", max_workers=0).hash("s3cret")
+    hasher = PasswordHasher(method=FAST, max_workers=0)
+    assert hasher.verify(old, "s3cret") == (True, True)
+    # A wrong password never asks for a rehash
+    assert hasher.verify(old, "wrong") == (False, False)
+
+    upgraded = hasher.hash("s3cret")
+    assert hasher.verify(upgraded, "s3cret") == (True, False)
+
+
+def test_round_trip_through_the_process_pool():
+    hasher = PasswordHasher(method=FAST, max_workers=1)
+    try:
+        assert hasher.verify(hasher.hash("s3cret"), "s3cret") == (True, False)
+    finally:
+        hasher.shutdown()
+
+
+def test_full_queue_is_rejected():
+    hasher = PasswordHasher(method=FAST, max_workers=1, max_pending=1, queue_timeout=0)
+    # Hold the only slot, as a hash in progress would
+    hasher._slots.acquire()
+    with pytest.raises(HasherBusy):
+        hasher.hash("s3cret")
+    assert hasher.stats()["rejected"] == 1
+    hasher._slots.release()
+    hasher.shutdown()
@@ -0,0 +1,34 @@
+# server/tests/test_portfolio_analytics.py
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio_analytics import portfolio_analytics
+
+
+def closes(**columns):
+    dates = pd.date_range("2024-01-01", periods=len(next(iter(columns.values()))), freq="B")
+    return pd.DataFrame(columns, index=dates, dtype=float)
+
+
+def test_gaps_are_handled_without_warnings():
+    frame = closes(
+        AAPL=[100, np.nan, 110, 121],
+        NEW=[np.nan, np.nan, 50, 55],  # listed partway through the window
+        SPY=[400, 404, np.nan, 412],
+    )
+    stocks = [{"symbol": "AAPL", "shares": 1, "purchase_price": 100}, {"symbol": "NEW", "shares": 0, "purchase_price": 50}]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = portfolio_analytics(stocks, {}, frame, include_correlation=True)
+
+    # AAPL is fully weighted: the gap day is flat, then +10% twice
+    assert result["observations"] == 3
+    assert result["positions"][0]["current_price"] == 121
+    assert result["daily_pnl"] == pytest.approx(11)
+    assert result["max_drawdown"] == 0
+    assert result["beta"] is not None
+    # Days before NEW's first close count as no change, not as a gap in the matrix
+    assert all(v is not None for row in result["correlation"]["matrix"] for v in row)
@@ -0,0 +1,125 @@
+# server/tests/test_portfolio_ops.py
+import pytest
+
+from portfolio_ops import buy_update, parse_trade, sell_update
+
+OPERATORS = {
+    "$add": lambda a, b: a + b,
+    "$subtract": lambda a, b: a - b,
+    "$multiply": lambda a, b: a * b,
+    "$divide": lambda a, b: a / b,
+    "$eq": lambda a, b: a == b,
+    "$gt": lambda a, b: a > b,
+    "$in": lambda a, b: a in b,
+    "$concatArrays": lambda *arrays: [item for array in arrays for item in array],
+    "$mergeObjects": lambda *objects: {key: value for obj in objects for key, value in obj.items()},
+}
+
+
+def evaluate(expr, doc, variables):
+    """Just enough of MongoDB's aggregation expressions to run the portfolio pipelines."""
+    if isinstance(expr, str) and expr.startswith("$$"):
+        name, _, path = expr[2:].partition(".")
+        value = variables[name]
+        return value[path] if path else value
+    if isinstance(expr, str) and expr.startswith("$"):
+        path = expr[1:].split(".")
+        value = doc[path[0]]
+        return [item[path[1]] for item in value] if len(path) > 1 else value
+    if isinstance(expr, list):
+        return [evaluate(item, doc, variables) for item in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if len(expr) == 1:
+        (op, args), = expr.items()
+        if op == "$literal":
+            return args
+        if op == "$cond":
+            condition, then, otherwise = args
+            return evaluate(then if evaluate(condition, doc, variables) else otherwise, doc, variables)
+        if op in ("$map", "$filter"):
+            results = []
+            for item in evaluate(args["input"], doc, variables):
+                scope = {**variables, args["as"]: item}
+                if op == "$map":
+                    results.append(evaluate(args["in"], doc, scope))
+                elif evaluate(args["cond"], doc, scope):
+                    results.append(item)
+            return results
+        if op in OPERATORS:
+            return OPERATORS[op](*evaluate(args, doc, variables))
+    return {key: evaluate(value, doc, variables) for key, value in expr.items()}
+
+
+def apply(update, doc):
+    if isinstance(update, dict):
+        # The $pull form of sell_update
+        symbol = update["$pull"]["stocks"]["symbol"]
+        return {**doc, "stocks": [s for s in doc["stocks"] if s["symbol"] != symbol]}
+    for stage in update:
+        doc = {**doc, **{key: evaluate(value, doc, {}) for key, value in stage["$set"].items()}}
+    return doc
+
+
+def portfolio(*positions):
+    return {"stocks": [{"symbol": symbol, "shares": shares, "purchase_price": price} for symbol, shares, price in positions]}
+
+
+def test_parse_buy():
+    side, stock = parse_trade({"symbol": "aapl", "shares": "10", "purchase_price": 150, "notes": "x"})
+    assert side == "buy"
+    assert (stock["symbol"], stock["shares"], stock["purchase_price"], stock["notes"]) == ("AAPL", 10.0, 150.0, "x")
+
+
+@pytest.mark.parametrize("shares, price", [
+    ("nan", 100), ("inf", 100), ("1e309", 100), (10, "nan"), (10, "-inf"), (0, 100), (10, 0), ("ten", 100), (10, [1]),
+])
+def test_parse_buy_rejects_bad_numbers(shares, price):
+    with pytest.raises(ValueError):
+        parse_trade({"symbol": "AAPL", "shares": shares, "purchase_price": price})
+
+
+def test_parse_sell_ignores_the_price():
+    assert parse_trade({"symbol": "aapl", "side": "sell", "shares": 5, "purchase_price": "junk"}) == ("sell", "AAPL", 5.0)
+    assert parse_trade({"symbol": "AAPL", "side": "sell"}) == ("sell", "AAPL", 0.0)
+    with pytest.raises(ValueError):
+        parse_trade({"symbol": "AAPL", "side": "sell", "shares": "nan"})
+
+
+def test_parse_rejects_missing_symbol_and_unknown_side():
+    with pytest.raises(ValueError):
+        parse_trade({"shares": 1, "purchase_price": 1})
+    with pytest.raises(ValueError):
+        parse_trade({"symbol": "AAPL", "side": "short", "shares": 1, "purchase_price": 1})
+
+
+def test_buy_appends_a_new_position():
+    _, stock = parse_trade({"symbol": "MSFT", "shares": 2, "purchase_price": 300})
+    doc = apply(buy_update(stock), portfolio(("AAPL", 10, 100)))
+    assert [s["symbol"] for s in doc["stocks"]] == ["AAPL", "MSFT"]
+    assert doc["stocks"][1]["shares"] == 2
+
+
+def test_buy_reaverages_an_existing_position():
+    _, stock = parse_trade({"symbol": "AAPL", "shares": 10, "purchase_price": 200})
+    doc = apply(buy_update(stock), portfolio(("AAPL", 10, 100), ("MSFT", 1, 300)))
+    assert doc["stocks"][0] == {"symbol": "AAPL", "shares": 20, "purchase_price": 150}
+    assert doc["stocks"][1] == {"symbol": "MSFT", "shares": 1, "purchase_price": 300}
+
+
+def test_buy_symbol_is_literal():
+    # A symbol starting with "$" must not be read as a field path
+    _, stock = parse_trade({"symbol": "$stocks", "shares": 1, "purchase_price": 1})
+    doc = apply(buy_update(stock), portfolio(("AAPL", 10, 100)))
+    assert doc["stocks"][-1]["symbol"] == "$STOCKS"
+
+
+def test_partial_sell_keeps_the_rest():
+    doc = apply(sell_update("AAPL", 4), portfolio(("AAPL", 10, 100), ("MSFT", 1, 300)))
+    assert doc["stocks"][0] == {"symbol": "AAPL", "shares": 6, "purchase_price": 100}
+
+
+def test_selling_everything_removes_the_position():
+    for shares in (10, 12, 0):
+        doc = apply(sell_update("AAPL", shares), portfolio(("AAPL", 10, 100), ("MSFT", 1, 300)))
+        assert [s["symbol"] for s in doc["stocks"]] == ["MSFT"]
@@ -0,0 +1,84 @@
+# server/tests/test_price_stream.py
+import threading
+
+import pytest
+
+from price_stream import PriceHub, StreamLimitReached
+
+
+class FakeQuotes:
+    def __init__(self, prices):
+        self.prices = dict(prices)
+        self.calls = []
+        self.polled = threading.Event()
+
+    def fetch_many(self, symbols, deadline):
+        self.calls.append(set(symbols))
+        self.polled.set()
+        return {s: ({"regularMarketPrice": self.prices[s]}, "fresh") for s in symbols if s in self.prices}
+
+
+def make_hub(quotes, **kwargs):
+    hub = PriceHub(quotes.fetch_many, interval=60, **kwargs)
+    # Drive polls by hand instead of through the background thread
+    hub._thread = "manual"
+    return hub
+
+
+def test_one_poll_fans_out_to_every_subscriber():
+    quotes = FakeQuotes({"AAPL": 100, "MSFT": 200})
+    hub = make_hub(quotes, max_subscribers=1000, max_per_owner=1)
+    subscriptions = [hub.subscribe(["aapl"], owner=f"user{i}") for i in range(999)]
+    other = hub.subscribe(["MSFT"], owner="other")
+
+    hub._poll({"AAPL", "MSFT"})
+    assert len(quotes.calls) == 1
+    assert all(s.get(timeout=0)["AAPL"]["price"] == 100 for s in subscriptions)
+    assert list(other.get(timeout=0)) == ["MSFT"]
+
+
+def test_only_changed_symbols_are_pushed():
+    quotes = FakeQuotes({"AAPL": 100, "MSFT": 200})
+    hub = make_hub(quotes)
+    subscription = hub.subscribe(["AAPL", "MSFT"])
+    hub._poll({"AAPL", "MSFT"})
+    subscription.get(timeout=0)
+
+    quotes.prices["MSFT"] = 201
+    hub._poll({"AAPL", "MSFT"})
+    assert list(subscription.get(timeout=0)) == ["MSFT"]
+    hub._poll({"AAPL", "MSFT"})
+    assert subscription.get(timeout=0) == {}
+
+
+def test_new_subscribers_get_known_prices_straight_away():
+    quotes = FakeQuotes({"AAPL": 100})
+    hub = make_hub(quotes)
+    hub.subscribe(["AAPL"])
+    hub._poll({"AAPL"})
+    assert hub.subscribe(["AAPL"]).get(timeout=0)["AAPL"]["price"] == 100
+
+
+def test_connection_caps():
+    hub = make_hub(FakeQuotes({}), max_subscribers=3, max_per_owner=2)
+    first = hub.subscribe(["AAPL"], owner="a")
+    hub.subscribe(["AAPL"], owner="a")
+    with pytest.raises(StreamLimitReached):
+        hub.subscribe(["AAPL"], owner="a")
+    hub.subscribe(["AAPL"], owner="b")
+    with pytest.raises(StreamLimitReached):
+        hub.subscribe(["AAPL"], owner="c")
+    hub.unsubscribe(first)
+    hub.subscribe(["AAPL"], owner="c")
+    assert hub.stats()["rejected"] == 2
+
+
+def test_poller_stops_with_the_last_subscriber():
+    quotes = FakeQuotes({"AAPL": 100})
+    hub = PriceHub(quotes.fetch_many, interval=0.01)
+    subscription = hub.subscribe(["AAPL"])
+    assert quotes.polled.wait(2)
+    thread = hub._thread
+    hub.unsubscribe(subscription)
+    thread.join(2)
+    assert hub._thread is None
@@ -0,0 +1,85 @@
+# server/tests/test_recommendation_parser.py
+from recommendation_parser import RecommendationParser, parse_recommendation
+
+REPORT = """
+## Financial Analysis
+Revenue growth slowed; some analysts would sell on weakness, others buy the dip.
+Timeframe of the data: last four quarters.
+
+## Investment Recommendation
+**Recommendation:** Strong Buy
+**Target Price:** $1,250.50 - $1,400
+**Time Horizon:** Long-term (3-5 years)
+**Risk Level:** Moderate
+"""
+
+
+def test_labelled_lines():
+    assert parse_recommendation(REPORT) == {
+        "action": "Buy",
+        "target_price": 1250.5,
+        "target_price_range": [1250.5, 1400.0],
+        "time_horizon": "Long-term",
+        "risk_level": "Medium",
+    }
+
+
+def test_stray_action_words_are_ignored():
+    result = parse_recommendation("We would not sell here.\nIt is no buy either.\nRecommendation: Hold\n")
+    assert result["action"] == "Hold"
+
+
+def test_horizon_requires_a_horizon_label():
+    # The old loop's `"TIMEFRAME" in line or "TIME HORIZON" in line and ...` precedence bug
+    # let any line mentioning a timeframe set the horizon
+    result = parse_recommendation("Timeframe of the data: short history\nTime Horizon: Medium-term\n")
+    assert result["time_horizon"] == "Medium-term"
+    assert "time_horizon" not in parse_recommendation("Revenue over a long timeframe grew.\n")
+
+
+def test_first_label_wins():
+    result = parse_recommendation("Recommendation: Sell\nRecommendation: Buy\nRisk Level: High\nRisk Level: Low\n")
+    assert result["action"] == "Sell"
+    assert result["risk_level"] == "High"
+
+
+def test_action_on_the_line_after_a_heading():
+    assert parse_recommendation("### Final Recommendation\n\nBUY\n")["action"] == "Buy"
+
+
+def test_incremental_feed_matches_single_pass():
+    parser = RecommendationParser()
+    for i in range(0, len(REPORT), 7):
+        parser.feed(REPORT[i:i + 7])
+    assert parser.close() == parse_recommendation(REPORT)
+
+
+def test_fields_available_before_close():
+    parser = RecommendationParser()
+    parser.feed("Recommendation: Sell\nTarget Pri")
+    assert parser.result == {"action": "Sell"}
+
+
+def test_valid_json_block_overrides_text():
+    text = REPORT + '```json\n{"action": "hold", "target_price_low": 900, "target_price_high": 1000, ' \
+                    '"time_horizon": "Short-term", "risk_level": "High"}\n```\n'
+    assert parse_recommendation(text) == {
+        "action": "Hold",
+        "target_price": 900.0,
+        "target_price_range": [900.0, 1000.0],
+        "time_horizon": "Short-term",
+        "risk_level": "High",
+    }
+
+
+def test_invalid_json_block_falls_back_to_text():
+    text = REPORT + '```json\n{"action": "maybe"}\n```\n```json\n{not json}\n```\n'
+    assert parse_recommendation(text) == parse_recommendation(REPORT)
+
+
+def test_json_fence_split_across_chunks():
+    parser = RecommendationParser()
+    parser.feed('Recommendation: Hold\n```json\n{"action": "Buy", "risk_level": "Low"}\n`')
+    assert parser.result["action"] == "Hold"
+    parser.feed("``\n")
+    assert parser.result == {"action": "Buy", "risk_level": "Low"}
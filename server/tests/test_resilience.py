@@ -0,0 +1,86 @@
+# server/tests/test_resilience.py
+import pytest
+
+from resilience import CircuitBreaker, TokenBucket, UpstreamGuard, UpstreamUnavailable, is_transient_error
+
+
+class HTTPError(OSError):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = type("Response", (), {"status_code": status_code})()
+
+
+def guard(**kwargs):
+    return UpstreamGuard("test", rate=1000, backoff_base=0, breaker=CircuitBreaker(failure_threshold=2), **kwargs)
+
+
+def failing(error):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise error
+    return fn, calls
+
+
+@pytest.mark.parametrize("error, transient", [
+    (ConnectionError("reset"), True),
+    (TimeoutError(), True),
+    (Exception("429 Too Many Requests"), True),
+    (HTTPError(503), True),
+    (HTTPError(404), False),
+    (ValueError("No data found, symbol may be delisted"), False),
+    (KeyError("regularMarketPrice"), False),
+])
+def test_is_transient_error(error, transient):
+    assert is_transient_error(error) is transient
+
+
+def test_permanent_errors_are_not_retried_and_keep_the_circuit_closed():
+    upstream = guard(max_retries=2)
+    fn, calls = failing(ValueError("No data found"))
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            upstream.call(fn)
+    assert len(calls) == 5
+    assert upstream.breaker.state == "closed"
+
+
+def test_transient_errors_are_retried_and_count_once_per_call():
+    upstream = guard(max_retries=2)
+    fn, calls = failing(ConnectionError("reset"))
+    with pytest.raises(ConnectionError):
+        upstream.call(fn)
+    assert len(calls) == 3
+    assert upstream.breaker.state == "closed"
+
+    with pytest.raises(ConnectionError):
+        upstream.call(fn)
+    assert upstream.breaker.state == "open"
+    with pytest.raises(UpstreamUnavailable):
+        upstream.call(lambda: "ok")
+
+
+def test_half_open_trial_closes_the_circuit():
+    upstream = guard(max_retries=0)
+    upstream.breaker.reset_timeout = 0
+    fn, _ = failing(ConnectionError("reset"))
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            upstream.call(fn)
+    assert upstream.call(lambda: "ok") == "ok"
+    assert upstream.breaker.state == "closed"
+
+
+def test_token_bucket_rejects_non_positive_rates():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+    with pytest.raises(ValueError):
+        TokenBucket(-1)
+
+
+def test_token_bucket_capacity():
+    bucket = TokenBucket(rate=0.001, capacity=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert not bucket.acquire(timeout=0.01)
@@ -0,0 +1,115 @@
+// src/components/Charts/PriceChart.jsx
+import React, { useState, useEffect, useRef } from 'react';
+import { AlertCircle } from 'lucide-react';
+
+const RANGES = ['1mo', '3mo', '6mo', 'ytd', '1y', '5y', '10y', 'max'];
+const HEIGHT = 220;
+
+const PriceChart = ({ symbol, service }) => {
+  const containerRef = useRef(null);
+  const [range, setRange] = useState('1y');
+  const [width, setWidth] = useState(600);
+  const [history, setHistory] = useState(null);
+  const [loading, setLoading] = useState(true);
+  const [error, setError] = useState('');
+
+  // Ask the server for about one point per pixel of chart width
+  useEffect(() => {
+    if (!containerRef.current) return undefined;
+    const observer = new ResizeObserver(([entry]) => {
+      setWidth(Math.max(200, Math.round(entry.contentRect.width)));
+    });
+    observer.observe(containerRef.current);
+    return () => observer.disconnect();
+  }, []);
+
+  useEffect(() => {
+    let cancelled = false;
+    const fetchHistory = async () => {
+      try {
+        setLoading(true);
+        setError('');
+        const data = await service.getHistory(symbol, { range, points: width });
+        if (!cancelled) setHistory(data);
+      } catch (err) {
+        if (!cancelled) setError(err.error || err.message || 'Failed to load price history');
+      } finally {
+        if (!cancelled) setLoading(false);
+      }
+    };
+
+    // Resizing fires in bursts; only refetch once it settles
+    const timer = setTimeout(fetchHistory, 200);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [symbol, range, width]);
+
+  const renderChart = () => {
+    const close = history?.close || [];
+    if (close.length < 2) {
+      return <p className="text-sm text-gray-500">No price history available.</p>;
+    }
+
+    const min = Math.min(...close);
+    const max = Math.max(...close);
+    const span = max - min || 1;
+    const points = close
+      .map((value, i) => `${(i / (close.length - 1)) * width},${HEIGHT - ((value - min) / span) * HEIGHT}`)
+      .join(' ');
+    const isPositive = close[close.length - 1] >= close[0];
+
+    return (
+      <div>
+        <svg width="100%" height={HEIGHT} viewBox={`0 0 ${width} ${HEIGHT}`} preserveAspectRatio="none">
+          <polyline
+            points={points}
+            fill="none"
+            stroke={isPositive ? '#16a34a' : '#dc2626'}
+            strokeWidth="1.5"
+            vectorEffect="non-scaling-stroke"
+          />
+        </svg>
+        <div className="flex justify-between text-xs text-gray-500 mt-1">
+          <span>{history.dates[0]}</span>
+          <span>Low ${min.toFixed(2)} · High ${max.toFixed(2)}</span>
+          <span>{history.dates[history.dates.length - 1]}</span>
+        </div>
+      </div>
+    );
+  };
+
+  return (
+    <div ref={containerRef} className="bg-gray-50 p-4 rounded-lg">
+      <div className="flex space-x-1 mb-3">
+        {RANGES.map((item) => (
+          <button
+            key={item}
+            onClick={() => setRange(item)}
+            className={`px-2 py-1 text-xs font-medium rounded ${
+              range === item ? 'bg-blue-600 text-white' : 'text-gray-600 hover:bg-gray-200'
+            }`}
+          >
+            {item.toUpperCase()}
+          </button>
+        ))}
+      </div>
+
+      {error ? (
+        <div className="flex items-center text-sm text-red-600">
+          <AlertCircle className="h-4 w-4 mr-2" />
+          {error}
+        </div>
+      ) : loading && !history ? (
+        <div className="flex justify-center items-center" style={{ height: HEIGHT }}>
+          <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-blue-500"></div>
+        </div>
+      ) : (
+        renderChart()
+      )}
+    </div>
+  );
+};
+
+export default PriceChart;
@@ -1,5 +1,5 @@
 // src/components/Portfolio/AddStockForm.jsx
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import { usePortfolio } from '../../context/PortfolioContext';
 import { X, AlertCircle } from 'lucide-react';
 
@@ -10,8 +10,30 @@ const AddStockForm = ({ onClose }) => {
   const [purchaseDate, setPurchaseDate] = useState('');
   const [notes, setNotes] = useState('');
   const [error, setError] = useState('');
+  const [suggestions, setSuggestions] = useState([]);
   
-  const { addToPortfolio, loading } = usePortfolio();
+  const { addToPortfolio, searchSymbols, loading } = usePortfolio();
+  
+  // Suggest matching symbols as the user types (debounced)
+  useEffect(() => {
+    if (!symbol) {
+      setSuggestions([]);
+      return undefined;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const results = await searchSymbols(symbol, 8);
+        if (!cancelled) setSuggestions(results);
+      } catch {
+        if (!cancelled) setSuggestions([]);
+      }
+    }, 150);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [symbol]);
   
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -80,8 +102,15 @@ const AddStockForm = ({ onClose }) => {
             onChange={(e) => setSymbol(e.target.value.toUpperCase())}
             className="mt-1 block w-full border border-gray-300 rounded-md shadow-sm py-2 px-3 focus:outline-none focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
             placeholder="AAPL"
+            list="symbol-suggestions"
+            autoComplete="off"
             required
           />
+          <datalist id="symbol-suggestions">
+            {suggestions.map((item) => (
+              <option key={item.symbol} value={item.symbol}>{item.name}</option>
+            ))}
+          </datalist>
         </div>
         
         <div className="mb-4">
@@ -1,5 +1,5 @@
 // src/context/PortfolioContext.jsx
-import React, { createContext, useState, useEffect, useContext } from 'react';
+import React, { createContext, useState, useEffect, useContext, useCallback, useMemo, useRef } from 'react';
 import stockService from '../services/stockService';
 import mockStockService from '../services/mockStockService';
 import { useAuth } from './AuthContext';
@@ -9,6 +9,36 @@ const service = import.meta.env.VITE_API_URL ? stockService : mockStockService;
 
 const PortfolioContext = createContext();
 
+// Apply a dashboard delta ({ changed, removed, order? }) to rows keyed by symbol
+const applyDelta = (rows, { changed, removed, order }) => {
+  const bySymbol = new Map(rows.map((row) => [row.symbol, row]));
+  removed.forEach((symbol) => bySymbol.delete(symbol));
+  changed.forEach((row) => bySymbol.set(row.symbol, row));
+  return order ? order.map((symbol) => bySymbol.get(symbol)) : [...bySymbol.values()];
+};
+
+// Apply streamed prices ({ SYMBOL: { price, price_change, price_change_percent } }) to rows keyed by symbol
+const applyPrices = (rows, updates, reprice) => rows.map((row) => {
+  const update = updates[row.symbol.toUpperCase()];
+  return update && update.price != null ? reprice(row, update) : row;
+});
+
+// Same arithmetic as the server's value_positions
+const repricePosition = (row, { price }) => ({
+  ...row,
+  current_price: price,
+  current_value: price * row.shares,
+  gain_loss: (price - row.purchase_price) * row.shares,
+  gain_loss_percentage: row.purchase_price > 0 ? (price / row.purchase_price - 1) * 100 : 0
+});
+
+const repriceWatchlistRow = (row, update) => ({
+  ...row,
+  current_price: update.price,
+  price_change: update.price_change ?? row.price_change,
+  price_change_percent: update.price_change_percent ?? row.price_change_percent
+});
+
 export const PortfolioProvider = ({ children }) => {
   const { isAuthenticated } = useAuth();
   
@@ -21,12 +51,65 @@ export const PortfolioProvider = ({ children }) => {
   });
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  // Version of the last dashboard response, so polls only transfer what changed
+  const dashboardVersion = useRef(null);
 
   // Load portfolio data when authenticated
   useEffect(() => {
     if (isAuthenticated()) {
-      fetchPortfolio();
-      fetchWatchlist();
+      fetchDashboard();
+    }
+  }, [isAuthenticated]);
+
+  // Live prices for every symbol on screen, pushed by the server instead of polled
+  const portfolioRef = useRef(portfolio);
+  portfolioRef.current = portfolio;
+  const streamSymbols = useMemo(
+    () => [...new Set([...portfolio, ...watchlist].map((row) => row.symbol.toUpperCase()))].sort().join(','),
+    [portfolio, watchlist]
+  );
+
+  useEffect(() => {
+    if (!streamSymbols || !service.subscribePrices || !isAuthenticated()) return undefined;
+    
+    const onPrices = (updates) => {
+      const rows = applyPrices(portfolioRef.current, updates, repricePosition);
+      setPortfolio(rows);
+      setPortfolioStats((stats) => ({
+        ...stats,
+        totalValue: rows.reduce((sum, row) => sum + (row.current_value ?? 0), 0),
+        totalGainLoss: rows.reduce((sum, row) => sum + (row.gain_loss ?? 0), 0)
+      }));
+      setWatchlist((current) => applyPrices(current, updates, repriceWatchlistRow));
+    };
+    return service.subscribePrices(onPrices, streamSymbols.split(','));
+  }, [streamSymbols, isAuthenticated]);
+
+  // Portfolio and watchlist in one request; safe to call on an interval
+  const fetchDashboard = useCallback(async () => {
+    if (!isAuthenticated()) return;
+    
+    try {
+      setError(null);
+      const data = await service.getDashboard(dashboardVersion.current);
+      if (!data) return; // unchanged
+      
+      if (data.delta) {
+        setPortfolio((rows) => applyDelta(rows, data.portfolio));
+        setWatchlist((rows) => applyDelta(rows, data.watchlist));
+      } else {
+        setPortfolio(data.portfolio);
+        setWatchlist(data.watchlist);
+      }
+      setPortfolioStats({
+        totalValue: data.total_value,
+        totalInvested: data.total_invested,
+        totalGainLoss: data.total_gain_loss
+      });
+      dashboardVersion.current = data.version;
+    } catch (err) {
+      setError(err.message || 'Failed to fetch dashboard');
+      console.error(err);
     }
   }, [isAuthenticated]);
 
@@ -37,6 +120,7 @@ export const PortfolioProvider = ({ children }) => {
       setLoading(true);
       setError(null);
       const data = await service.getPortfolio();
+      dashboardVersion.current = null;
       setPortfolio(data.portfolio);
       setPortfolioStats({
         totalValue: data.total_value,
@@ -58,6 +142,7 @@ export const PortfolioProvider = ({ children }) => {
       setLoading(true);
       setError(null);
       const data = await service.getWatchlist();
+      dashboardVersion.current = null;
       setWatchlist(data.watchlist);
     } catch (err) {
       setError(err.message || 'Failed to fetch watchlist');
@@ -123,18 +208,22 @@ export const PortfolioProvider = ({ children }) => {
     }
   };
 
+  const searchSymbols = (query, limit) => service.searchSymbols(query, limit);
+
   const value = {
     portfolio,
     watchlist,
     portfolioStats,
     loading,
     error,
+    fetchDashboard,
     fetchPortfolio,
     fetchWatchlist,
     addToPortfolio,
     removeFromPortfolio,
     addToWatchlist,
-    removeFromWatchlist
+    removeFromWatchlist,
+    searchSymbols
   };
 
   return <PortfolioContext.Provider value={value}>{children}</PortfolioContext.Provider>;
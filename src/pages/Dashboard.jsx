@@ -2,7 +2,6 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
-import { usePortfolio } from '../context/PortfolioContext';
 import Header from '../components/Layout/Header';
 import PortfolioSummary from '../components/Portfolio/PortfolioSummary';
 import WatchList from '../components/Portfolio/WatchList';
@@ -16,7 +15,6 @@ const service = import.meta.env.VITE_API_URL ? stockService : mockStockService;
 
 const Dashboard = () => {
   const { currentUser, isAuthenticated } = useAuth();
-  const { fetchPortfolio, fetchWatchlist } = usePortfolio();
   const navigate = useNavigate();
   
   const [searchQuery, setSearchQuery] = useState('');
@@ -25,15 +23,12 @@ const Dashboard = () => {
   const [searchError, setSearchError] = useState('');
   const [showAddStockModal, setShowAddStockModal] = useState(false);
   
-  // Redirect if not logged in
+  // Redirect if not logged in; PortfolioContext loads the dashboard and keeps its prices current
   useEffect(() => {
     if (!isAuthenticated()) {
       navigate('/login');
-    } else {
-      fetchPortfolio();
-      fetchWatchlist();
     }
-  }, [isAuthenticated, navigate, fetchPortfolio, fetchWatchlist]);
+  }, [isAuthenticated, navigate]);
   
   const handleSearch = async (e) => {
     e.preventDefault();
@@ -4,6 +4,7 @@ import { useParams, useNavigate } from 'react-router-dom';
 import { usePortfolio } from '../context/PortfolioContext';
 import Header from '../components/Layout/Header';
 import AddStockForm from '../components/Portfolio/AddStockForm';
+import PriceChart from '../components/Charts/PriceChart';
 import stockService from '../services/stockService';
 import mockStockService from '../services/mockStockService';
 import { Eye, Plus, Star, AlertCircle, TrendingUp, TrendingDown, DollarSign, BarChart2, Clock, Info } from 'lucide-react';
@@ -275,6 +276,15 @@ const StockDetail = () => {
           
           <div className="p-6">
             {activeTab === 'overview' && (
+              <>
+              <div className="mb-6">
+                <h3 className="text-lg font-medium text-gray-900 mb-4 flex items-center">
+                  <TrendingUp className="h-5 w-5 mr-2 text-blue-500" />
+                  Price History
+                </h3>
+                <PriceChart symbol={stockSymbol} service={service} />
+              </div>
+              
               <div className="grid grid-cols-1 md:grid-cols-2 gap-6">
                 <div>
                   <h3 className="text-lg font-medium text-gray-900 mb-4 flex items-center">
@@ -348,6 +358,7 @@ const StockDetail = () => {
                   </div>
                 </div>
               </div>
+              </>
             )}
             
             {activeTab === 'financials' && (
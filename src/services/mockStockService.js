@@ -193,6 +193,48 @@ const STORAGE_KEYS = {
       };
     },
     
+    // Daily price history (mock implementation): a random walk ending at the sample price
+    getHistory: async (symbol, { range = '1y', points = 500 } = {}) => {
+      await new Promise(resolve => setTimeout(resolve, 300)); // Simulate API delay
+      
+      const upperSymbol = symbol.toUpperCase();
+      if (!SAMPLE_STOCK_DATA[upperSymbol]) {
+        throw new Error(`Stock not found: ${symbol}`);
+      }
+      
+      const days = { '1mo': 21, '3mo': 63, '6mo': 126, 'ytd': 200, '1y': 252, '2y': 504, '5y': 1260, '10y': 2520, 'max': 2520 }[range] || 252;
+      const count = Math.min(days, points);
+      const step = days / count;
+      const close = [SAMPLE_STOCK_DATA[upperSymbol].current_price];
+      for (let i = 1; i < count; i++) {
+        close.unshift(+(close[0] * (1 + (Math.random() - 0.5) * 0.03 * Math.sqrt(step))).toFixed(2));
+      }
+      const dates = close.map((_, i) => {
+        const date = new Date(Date.now() - Math.round((count - 1 - i) * step * 1.45) * 86400000);
+        return date.toISOString().slice(0, 10);
+      });
+      
+      return {
+        symbol: upperSymbol,
+        range,
+        interval: '1d',
+        source_points: days,
+        points: count,
+        dates,
+        close,
+        volume: close.map(() => Math.round(1e6 + Math.random() * 1e7))
+      };
+    },
+    
+    // Portfolio and watchlist together (mock implementation: always the full dashboard)
+    getDashboard: async () => {
+      const [portfolio, watchlist] = await Promise.all([
+        mockStockService.getPortfolio(),
+        mockStockService.getWatchlist()
+      ]);
+      return { ...portfolio, ...watchlist, delta: false, version: null };
+    },
+    
     // Get portfolio data
     getPortfolio: async () => {
       initializeStorage();
@@ -351,6 +393,16 @@ const STORAGE_KEYS = {
       return { message: `Stock ${upperSymbol} added to watchlist` };
     },
     
+    // Autocomplete symbols and company names from the sample data
+    searchSymbols: async (query, limit = 10) => {
+      const q = query.trim().toUpperCase();
+      if (!q) return [];
+      return Object.entries(SAMPLE_STOCK_DATA)
+        .filter(([symbol, data]) => symbol.startsWith(q) || data.name.toUpperCase().includes(q))
+        .slice(0, limit)
+        .map(([symbol, data]) => ({ symbol, name: data.name, exchange: '' }));
+    },
+    
     // Remove stock from watchlist
     removeFromWatchlist: async (symbol) => {
       initializeStorage();
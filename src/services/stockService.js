@@ -13,6 +13,78 @@ const stockService = {
     }
   },
   
+  // Analyze many symbols in one batch. onEvent(type, data) is called for each streamed
+  // event ("batch", "progress", "result", "error" and finally "summary").
+  analyzeBatch: async (symbols, onEvent, { concurrency = 2, refresh = false } = {}) => {
+    const response = await fetch(`${api.defaults.baseURL}/analyze/batch`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Authorization: `Bearer ${localStorage.getItem('token') || ''}`,
+      },
+      body: JSON.stringify({ symbols, concurrency, refresh }),
+    });
+    if (!response.ok) {
+      throw await response.json().catch(() => new Error('Failed to start batch analysis'));
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let summary = null;
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const messages = buffer.split('\n\n');
+      buffer = messages.pop();
+      for (const message of messages) {
+        const type = message.match(/^event: (.*)$/m);
+        const data = message.match(/^data: (.*)$/m);
+        if (!type || !data) continue;
+        const payload = JSON.parse(data[1]);
+        if (type[1] === 'summary') summary = payload;
+        onEvent(type[1], payload);
+      }
+    }
+    return summary;
+  },
+
+  // Daily price history for charts, downsampled on the server to about `points` points
+  // (mode 'line' keeps the shape of the close series, 'ohlc' merges bars into candles)
+  getHistory: async (symbol, { range = '1y', points = 500, mode = 'line' } = {}) => {
+    try {
+      const response = await api.get(`/history/${symbol}`, { params: { range, points, mode } });
+      return response.data;
+    } catch (error) {
+      throw error.response ? error.response.data : new Error(`Failed to fetch price history: ${symbol}`);
+    }
+  },
+  
+  // Price history for several symbols in one request (e.g. a comparison chart)
+  getHistories: async (symbols, { range = '1y', points = 500, mode = 'line' } = {}) => {
+    try {
+      const response = await api.get('/history', { params: { symbols: symbols.join(','), range, points, mode } });
+      return response.data;
+    } catch (error) {
+      throw error.response ? error.response.data : new Error('Failed to fetch price history');
+    }
+  },
+  
+  // Portfolio and watchlist in one request. Pass the `version` of the last response as `since`
+  // to get only what changed (`delta: true`); returns null when nothing changed at all.
+  getDashboard: async (since = null) => {
+    try {
+      const response = await api.get('/dashboard', {
+        params: since ? { since } : {},
+        validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+      });
+      return response.status === 304 ? null : response.data;
+    } catch (error) {
+      throw error.response ? error.response.data : new Error('Failed to fetch dashboard data');
+    }
+  },
+  
   // Get portfolio data
   getPortfolio: async () => {
     try {
@@ -43,6 +115,62 @@ const stockService = {
     }
   },
   
+  // Apply many trades (e.g. an imported brokerage history) in one request
+  applyTrades: async (trades) => {
+    try {
+      const response = await api.post('/portfolio/bulk', { trades });
+      return response.data;
+    } catch (error) {
+      throw error.response ? error.response.data : new Error('Failed to apply trades');
+    }
+  },
+  
+  // Subscribe to live price updates for the user's watchlist and portfolio (or the given symbols).
+  // EventSource can't send the Authorization header, so each connection uses a short-lived
+  // stream token in the URL instead of the access token. Returns a function that closes the stream.
+  subscribePrices: (onUpdate, symbols = null) => {
+    let source = null;
+    let retryTimer = null;
+    let closed = false;
+    
+    const connect = async () => {
+      try {
+        const { data } = await api.post('/stream/token');
+        if (closed) return;
+        const params = new URLSearchParams({ jwt: data.token });
+        if (symbols && symbols.length) {
+          params.set('symbols', symbols.join(','));
+        }
+        source = new EventSource(`${api.defaults.baseURL}/stream/prices?${params}`);
+        source.addEventListener('prices', (event) => onUpdate(JSON.parse(event.data)));
+        source.onerror = () => {
+          // The browser retries with the same (possibly expired) token; reconnect with a new one instead
+          source.close();
+          if (!closed) retryTimer = setTimeout(connect, 15000);
+        };
+      } catch (error) {
+        if (!closed) retryTimer = setTimeout(connect, 15000);
+      }
+    };
+    
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
+  },
+  
+  // Autocomplete symbols and company names from the server's local symbol index
+  searchSymbols: async (query, limit = 10) => {
+    try {
+      const response = await api.get('/symbols/search', { params: { q: query, limit } });
+      return response.data.results;
+    } catch (error) {
+      throw error.response ? error.response.data : new Error('Failed to search symbols');
+    }
+  },
+  
   // Get watchlist data
   getWatchlist: async () => {
     try {